@@ -0,0 +1,23 @@
+from django.contrib import admin
+from .models import FSMRecord, ReminderShard, VoiceFile
+
+
+@admin.register(ReminderShard)
+class ReminderShardAdmin(admin.ModelAdmin):
+    list_display = ['date', 'shard', 'user_id_from', 'user_id_to', 'cursor', 'sent', 'failed', 'finished_at']
+    list_filter = ['date']
+    readonly_fields = ['created_at', 'finished_at']
+
+
+@admin.register(FSMRecord)
+class FSMRecordAdmin(admin.ModelAdmin):
+    list_display = ['key', 'state', 'expires_at']
+    search_fields = ['key']
+    list_filter = ['state']
+
+
+@admin.register(VoiceFile)
+class VoiceFileAdmin(admin.ModelAdmin):
+    list_display = ['word', 'language', 'file_id', 'created_at']
+    search_fields = ['word', 'key']
+    list_filter = ['language']
@@ -5,3 +5,5 @@ class BotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bot'
 
+    def ready(self):
+        import bot.signals  # noqa
@@ -5,6 +5,7 @@ import os
 import asyncio
 import django
 import logging
+from datetime import datetime
 
 # Настройка Django перед импортом моделей
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'linguatrack.settings')
@@ -14,24 +15,28 @@ from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from django.conf import settings
 from django.contrib.auth.models import User
-from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from bot.review import BotReviewSession
+from bot.storage import get_fsm_storage
+from bot.user_cache import user_cache
+from bot.voice import send_word_voice
+from linguatrack.async_db import db_async
 from cards.models import Card
 from cards.services import CardService
-from cards.tts import TTSService
+from cards.tts import TTSError
 from schedules.services import SM2Service
 from stats.services import StatsService
-from stats.models import Stats, UserProfile
+from stats.models import UserProfile, validate_timezone
 
 logger = logging.getLogger('bot')
 
 
 # Инициализация бота
 bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-storage = MemoryStorage()
+storage = get_fsm_storage()
 dp = Dispatcher(storage=storage)
 
 
@@ -68,22 +73,28 @@ def get_main_keyboard():
     return keyboard
 
 
-@sync_to_async
+@db_async
 def get_or_create_user(telegram_id: int, username: str = None) -> User:
     """
     Получает или создает пользователя Django по Telegram ID.
+
+    Повторные обращения обслуживаются из кэша процесса без запросов к БД.
     
     Args:
         telegram_id: ID пользователя в Telegram
         username: Имя пользователя в Telegram
     
     Returns:
-        User: Пользователь Django
+        User: Облегченный пользователь Django (заполнены только pk и username)
     """
-    try:
-        profile = UserProfile.objects.get(telegram_id=telegram_id)
+    user = user_cache.get(telegram_id)
+    if user is not None:
+        return user
+
+    profile = UserProfile.objects.select_related('user').filter(telegram_id=telegram_id).first()
+    if profile is not None:
         user = profile.user
-    except UserProfile.DoesNotExist:
+    else:
         # Создаем пользователя
         user = User.objects.create_user(
             username=f"tg_{telegram_id}",
@@ -100,68 +111,47 @@ def get_or_create_user(telegram_id: int, username: str = None) -> User:
             telegram_username=username
         )
     
-    return user
-
-
-@sync_to_async
-def get_cards_for_today(user):
-    """Получить карточки на сегодня."""
-    return SM2Service.get_cards_for_today(user)
-
-
-@sync_to_async
-def get_card_by_id(card_id):
-    """Получить карточку по ID."""
-    return Card.objects.get(pk=card_id)
-
-
-@sync_to_async
-def update_card_schedule(card, quality):
-    """Обновить расписание карточки."""
-    return SM2Service.update_schedule(card, quality)
-
-
-@sync_to_async
-def get_or_create_stats(user):
-    """Получить или создать статистику."""
-    return Stats.objects.get_or_create(user=user)
+    return user_cache.set(telegram_id, user)
 
 
-@sync_to_async
-def save_stats(stats):
-    """Сохранить статистику."""
-    stats.save()
+@db_async
+def get_card_by_id(card_id, user):
+    """Получить карточку пользователя по ID (None, если карточка чужая или удалена)."""
+    return Card.objects.filter(pk=card_id, user=user).first()
 
 
-@sync_to_async
+@db_async
 def get_user_cards(user, limit=10):
     """Получить карточки пользователя."""
     return list(CardService.get_user_cards(user)[:limit])
 
 
-@sync_to_async
+@db_async
 def get_user_cards_count(user):
     """Получить количество карточек пользователя."""
     return Card.objects.filter(user=user).count()
 
 
-@sync_to_async
-def create_card(user, word, translation):
-    """Создать карточку."""
-    try:
-        card = CardService.create_card(user, word, translation)
-        # Принудительно обновляем объект из БД
-        card.refresh_from_db()
-        return card
-    except Exception as e:
-        logger.error(f"Error in create_card: {e}", exc_info=True)
-        raise
+@db_async
+def get_user_profile(telegram_id: int):
+    """Получить профиль пользователя по Telegram ID."""
+    return UserProfile.objects.get(telegram_id=telegram_id)
+
 
+@db_async
+def set_reminder_time(profile, reminder_time, tz_name=None):
+    """
+    Сохраняет время (и часовой пояс) напоминания и пересчитывает следующее.
 
-@sync_to_async
-def get_user_stats_data(user):
-    """Получить статистику пользователя."""
-    return StatsService.get_user_stats(user)
+    Raises:
+        ValidationError: Если часовой пояс неизвестен
+    """
+    profile.reminder_time = reminder_time
+    if tz_name:
+        validate_timezone(tz_name)
+        profile.timezone = tz_name
+    profile.next_reminder_at = profile.get_next_reminder_at()
+    profile.save(update_fields=['reminder_time', 'timezone', 'next_reminder_at', 'updated_at'])
 
 
 @dp.message(Command("start"))
@@ -180,7 +170,7 @@ async def cmd_start(message: Message):
 async def cmd_today(message: Message):
     """Команда /today - карточки на сегодня"""
     user = await get_or_create_user(message.from_user.id)
-    cards = await get_cards_for_today(user)
+    cards = await SM2Service.aget_due_queue(user)
     
     if not cards:
         await message.answer(
@@ -204,41 +194,56 @@ async def cmd_today(message: Message):
 
 
 @dp.message(lambda m: m.text == "🧪 Тест")
-async def button_test(message: Message):
+async def button_test(message: Message, state: FSMContext):
     """Обработка кнопки 'Тест'"""
-    await cmd_test(message)
+    await cmd_test(message, state)
+
+
+def get_question_keyboard(card_id: int):
+    """Клавиатура под вопросом теста."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="👁 Показать ответ", callback_data=f"test_show_{card_id}")]
+    ])
 
 
 @dp.message(Command("test"))
-async def cmd_test(message: Message):
+async def cmd_test(message: Message, state: FSMContext):
     """Команда /test - быстрый тест"""
-    user = await get_or_create_user(message.from_user.id)
-    cards = await get_cards_for_today(user)
+    await start_test(message, message.from_user, state)
+
+
+async def start_test(message: Message, from_user, state: FSMContext):
+    """Начинает тест: пачка карточек сохраняется в данных FSM."""
+    user = await get_or_create_user(from_user.id)
+    card = await BotReviewSession(state, user).start()
     
-    if not cards:
+    if not card:
         await message.answer(
             "Нет карточек для тестирования. Добавь карточки через кнопку '➕ Добавить карточку'",
             reply_markup=get_main_keyboard()
         )
         return
     
-    card = cards[0]
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👁 Показать ответ", callback_data=f"test_show_{card.pk}")]
-    ])
-    
     await message.answer(
-        f"❓ Как переводится слово:\n\n<b>{card.word}</b>",
-        reply_markup=keyboard,
+        f"❓ Как переводится слово:\n\n<b>{card['word']}</b>",
+        reply_markup=get_question_keyboard(card['id']),
         parse_mode="HTML"
     )
 
 
 @dp.callback_query(lambda c: c.data.startswith("test_show_"))
-async def test_show_answer(callback: CallbackQuery):
+async def test_show_answer(callback: CallbackQuery, state: FSMContext):
     """Показать ответ в тесте"""
     card_id = int(callback.data.split("_")[-1])
-    card = await get_card_by_id(card_id)
+    user = await get_or_create_user(callback.from_user.id)
+    # Карточка обычно есть в сессии теста; в БД идем только для старых сообщений
+    card = await BotReviewSession(state, user).get_card(card_id)
+    if card is None:
+        card_obj = await get_card_by_id(card_id, user)
+        if card_obj is None:
+            await callback.answer("Карточка не найдена", show_alert=True)
+            return
+        card = {'word': card_obj.word, 'translation': card_obj.translation, 'example': card_obj.example}
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -251,9 +256,9 @@ async def test_show_answer(callback: CallbackQuery):
         ]
     ])
     
-    text = f"<b>{card.word}</b> = {card.translation}\n\n"
-    if card.example:
-        text += f"Пример: {card.example}\n\n"
+    text = f"<b>{card['word']}</b> = {card['translation']}\n\n"
+    if card['example']:
+        text += f"Пример: {card['example']}\n\n"
     text += "Насколько хорошо ты знал это слово?"
     
     await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -261,35 +266,24 @@ async def test_show_answer(callback: CallbackQuery):
 
 
 @dp.callback_query(lambda c: c.data.startswith("quality_"))
-async def test_submit_quality(callback: CallbackQuery):
+async def test_submit_quality(callback: CallbackQuery, state: FSMContext):
     """Обработка качества ответа"""
     parts = callback.data.split("_")
     card_id = int(parts[1])
-    quality = int(parts[2])
+    quality = max(0, min(5, int(parts[2])))
     
-    card = await get_card_by_id(card_id)
     user = await get_or_create_user(callback.from_user.id)
+    try:
+        # Ответ только записывается; следующая карточка берется из сессии
+        next_card = await BotReviewSession(state, user).answer(card_id, quality)
+    except Card.DoesNotExist:
+        await callback.answer("Карточка не найдена", show_alert=True)
+        return
     
-    # Обновляем расписание
-    await update_card_schedule(card, quality)
-    
-    # Обновляем статистику
-    stats, _ = await get_or_create_stats(user)
-    stats.total_reviews += 1
-    if quality < 3:
-        stats.wrong_answers += 1
-    await save_stats(stats)
-    
-    # Получаем следующую карточку
-    cards = await get_cards_for_today(user)
-    if cards:
-        next_card = cards[0]
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="👁 Показать ответ", callback_data=f"test_show_{next_card.pk}")]
-        ])
+    if next_card:
         await callback.message.edit_text(
-            f"✅ Ответ сохранен!\n\n❓ Следующее слово:\n\n<b>{next_card.word}</b>",
-            reply_markup=keyboard,
+            f"✅ Ответ сохранен!\n\n❓ Следующее слово:\n\n<b>{next_card['word']}</b>",
+            reply_markup=get_question_keyboard(next_card['id']),
             parse_mode="HTML"
         )
     else:
@@ -299,9 +293,9 @@ async def test_submit_quality(callback: CallbackQuery):
 
 
 @dp.callback_query(lambda c: c.data == "test_start")
-async def test_start_callback(callback: CallbackQuery):
+async def test_start_callback(callback: CallbackQuery, state: FSMContext):
     """Начать тест из кнопки"""
-    await cmd_test(callback.message)
+    await start_test(callback.message, callback.from_user, state)
     await callback.answer()
 
 
@@ -315,7 +309,7 @@ async def button_progress(message: Message):
 async def cmd_progress(message: Message):
     """Команда /progress - статистика"""
     user = await get_or_create_user(message.from_user.id)
-    stats_data = await get_user_stats_data(user)
+    stats_data = await StatsService.aget_user_stats(user)
     stats = stats_data['stats']
     
     text = (
@@ -331,6 +325,38 @@ async def cmd_progress(message: Message):
     await message.answer(text, parse_mode="HTML", reply_markup=get_main_keyboard())
 
 
+@dp.message(Command("remind"))
+async def cmd_remind(message: Message):
+    """Команда /remind [ЧЧ:ММ] [часовой пояс] - время ежедневного напоминания"""
+    await get_or_create_user(message.from_user.id, message.from_user.username)
+    profile = await get_user_profile(message.from_user.id)
+    args = message.text.split()[1:]
+
+    if not args:
+        await message.answer(
+            f"⏰ Напоминание приходит в {profile.reminder_time:%H:%M} ({profile.timezone}).\n\n"
+            "Изменить: <code>/remind 20:30</code> или <code>/remind 20:30 Europe/Berlin</code>",
+            parse_mode="HTML"
+        )
+        return
+
+    try:
+        reminder_time = datetime.strptime(args[0], "%H:%M").time()
+    except ValueError:
+        await message.answer("❌ Укажи время в формате ЧЧ:ММ, например: /remind 20:30")
+        return
+
+    try:
+        await set_reminder_time(profile, reminder_time, args[1] if len(args) > 1 else None)
+    except ValidationError:
+        await message.answer("❌ Неизвестный часовой пояс. Пример: Europe/Moscow")
+        return
+
+    await message.answer(
+        f"✅ Буду напоминать каждый день в {reminder_time:%H:%M} ({profile.timezone})."
+    )
+
+
 @dp.message(lambda m: m.text == "📝 Мои карточки")
 async def button_cards(message: Message):
     """Обработка кнопки 'Мои карточки'"""
@@ -387,12 +413,13 @@ async def process_say_word(message: Message, word: str):
     """Обработка озвучки слова"""
     
     try:
-        audio_path = TTSService.generate_audio(word)
-        if audio_path.exists():
-            await message.answer_voice(voice=types.FSInputFile(audio_path))
+        # Повторно отправляем по file_id; синтез - в пуле потоков
+        if await send_word_voice(message, word):
             await message.answer(f"✅ Слово '{word}' озвучено!", reply_markup=get_main_keyboard())
         else:
             await message.answer("Не удалось создать аудио", reply_markup=get_main_keyboard())
+    except TTSError as e:
+        await message.answer(f"⏳ {e}", reply_markup=get_main_keyboard())
     except Exception as e:
         await message.answer(f"Ошибка: {str(e)}", reply_markup=get_main_keyboard())
 
@@ -401,7 +428,8 @@ async def process_say_word(message: Message, word: str):
 async def handle_say_word_state(message: Message, state: FSMContext):
     """Обработка слова для озвучки в состоянии ожидания"""
     word = message.text.strip()
-    await state.clear()
+    # Сбрасываем только состояние: данные FSM хранят сессию теста
+    await state.set_state(None)
     
     if len(word.split()) == 1:  # Если одно слово
         await process_say_word(message, word)
@@ -459,7 +487,7 @@ async def button_add_prompt(message: Message, state: FSMContext):
 async def handle_add_card_state(message: Message, state: FSMContext):
     """Обработка добавления карточки в состоянии ожидания"""
     logger.debug(f"handle_add_card_state вызван с текстом: {message.text}")
-    await state.clear()
+    await state.set_state(None)
     await process_add_card(message, message.text)
 
 
@@ -511,7 +539,7 @@ async def process_add_card(message: Message, text: str):
         logger.debug(f"Создаем карточку: word={word}, translation={translation}")
         user = await get_or_create_user(message.from_user.id)
         logger.debug(f"Пользователь получен: {user.username}")
-        card = await create_card(user, word, translation)
+        card = await CardService.acreate_card(user, word, translation)
         logger.debug(f"Карточка создана: {card.pk if card else None}")
         
         # Проверяем, что карточка действительно создана
@@ -553,6 +581,8 @@ async def handle_add_card(message: Message):
 
 async def main():
     """Запуск бота"""
+    # Telegram не отдает обновления через getUpdates, пока установлен webhook
+    await bot.delete_webhook()
     await dp.start_polling(bot)
 
 
@@ -3,23 +3,94 @@ Django management команда для запуска Telegram-бота.
 """
 import asyncio
 import os
+import re
 import django
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'linguatrack.settings')
 django.setup()
 
-from bot.bot import main
+from bot.bot import bot, dp, main
+
+# Допустимый секретный токен webhook по правилам Bot API
+SECRET_TOKEN_RE = re.compile(r'[A-Za-z0-9_-]{1,256}')
 
 
 class Command(BaseCommand):
     """Команда для запуска бота через manage.py"""
-    help = 'Запускает Telegram-бота'
-    
+    help = 'Запускает Telegram-бота (long polling или webhook)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--webhook',
+            action='store_true',
+            help='Принимать обновления через webhook (ASGI-сервер uvicorn)'
+        )
+        parser.add_argument(
+            '--host',
+            default=getattr(settings, 'TELEGRAM_WEBHOOK_HOST', '0.0.0.0'),
+            help='Адрес, на котором слушает webhook-сервер'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=getattr(settings, 'TELEGRAM_WEBHOOK_PORT', 8081),
+            help='Порт webhook-сервера'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'TELEGRAM_WEBHOOK_WORKERS', 1),
+            help='Количество процессов webhook-сервера'
+        )
+
     def handle(self, *args, **options):
         """Запуск бота"""
+        if options['webhook']:
+            self.run_webhook(options['host'], options['port'], options['workers'])
+            return
+
         self.stdout.write(self.style.SUCCESS('Запуск Telegram-бота...'))
         try:
             asyncio.run(main())
         except KeyboardInterrupt:
             self.stdout.write(self.style.WARNING('Бот остановлен'))
+
+    def run_webhook(self, host: str, port: int, workers: int):
+        """Регистрирует webhook в Telegram и запускает ASGI-сервер."""
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('Для режима webhook установите uvicorn: pip install uvicorn')
+
+        base_url = getattr(settings, 'TELEGRAM_WEBHOOK_URL', '')
+        if not base_url:
+            raise CommandError('Не задан TELEGRAM_WEBHOOK_URL (публичный адрес бота)')
+        secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+        if not secret:
+            raise CommandError('Не задан TELEGRAM_WEBHOOK_SECRET (секретный токен webhook)')
+        if not SECRET_TOKEN_RE.fullmatch(secret):
+            raise CommandError('TELEGRAM_WEBHOOK_SECRET: 1-256 символов A-Z, a-z, 0-9, _ и -')
+        if workers > 1 and getattr(settings, 'BOT_FSM_STORAGE', 'db') == 'memory':
+            self.stdout.write(self.style.WARNING(
+                'Состояния FSM хранятся в памяти процесса и не видны другим воркерам'
+            ))
+
+        url = base_url.rstrip('/') + getattr(settings, 'TELEGRAM_WEBHOOK_PATH', '/telegram/webhook')
+        asyncio.run(self.set_webhook(url))
+        self.stdout.write(self.style.SUCCESS(
+            f'Webhook {url}: слушаем {host}:{port}, процессов: {workers}'
+        ))
+        uvicorn.run('bot.webhook:app', host=host, port=port, workers=workers, log_level='info')
+
+    @staticmethod
+    async def set_webhook(url: str):
+        try:
+            await bot.set_webhook(
+                url,
+                secret_token=settings.TELEGRAM_WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        finally:
+            await bot.session.close()
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата рассылки')),
+                ('shard', models.PositiveIntegerField(verbose_name='Номер шарда')),
+                ('user_id_from', models.BigIntegerField(verbose_name='ID пользователя от')),
+                ('user_id_to', models.BigIntegerField(verbose_name='ID пользователя до')),
+                ('cursor', models.BigIntegerField(default=0, verbose_name='Последний обработанный ID')),
+                ('lease_owner', models.CharField(blank=True, max_length=255, verbose_name='Владелец аренды')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Аренда до')),
+                ('sent', models.IntegerField(default=0, verbose_name='Отправлено')),
+                ('failed', models.IntegerField(default=0, verbose_name='Ошибок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Шард рассылки',
+                'verbose_name_plural': 'Шарды рассылки',
+                'ordering': ['-date', 'shard'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='remindershard',
+            constraint=models.UniqueConstraint(fields=('date', 'shard'), name='bot_reminder_shard_date_shard'),
+        ),
+    ]
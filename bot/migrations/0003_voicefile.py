@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0002_fsmrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoiceFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=200, verbose_name='Слово')),
+                ('language', models.CharField(max_length=10, verbose_name='Язык')),
+                ('file_id', models.CharField(max_length=255, verbose_name='Telegram file_id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Голосовой файл',
+                'verbose_name_plural': 'Голосовые файлы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='voicefile',
+            constraint=models.UniqueConstraint(fields=('word', 'language'), name='bot_voice_file_word_language'),
+        ),
+    ]
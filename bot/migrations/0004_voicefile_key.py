@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+def fill_keys(apps, schema_editor):
+    from cards.tts_cache import cache_key
+
+    VoiceFile = apps.get_model('bot', 'VoiceFile')
+    seen = set()
+    for voice in VoiceFile.objects.order_by('-created_at').iterator():
+        key = cache_key(voice.word, voice.language)
+        if key in seen:
+            # После нормализации слова совпали: оставляем более свежий file_id
+            voice.delete()
+            continue
+        seen.add(key)
+        voice.key = key
+        voice.save(update_fields=['key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0003_voicefile'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='voicefile',
+            name='bot_voice_file_word_language',
+        ),
+        migrations.AddField(
+            model_name='voicefile',
+            name='key',
+            field=models.CharField(max_length=64, null=True, verbose_name='Ключ'),
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='voicefile',
+            name='key',
+            field=models.CharField(max_length=64, unique=True, verbose_name='Ключ'),
+        ),
+    ]
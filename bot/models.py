@@ -0,0 +1,77 @@
+from django.db import models
+
+
+class ReminderShard(models.Model):
+    """
+    Шард ежедневной рассылки напоминаний: диапазон ID пользователей,
+    обрабатываемый одной задачей Celery.
+
+    Аренда (lease) не дает двум воркерам обрабатывать шард одновременно,
+    а курсор позволяет продолжить рассылку после падения воркера.
+    """
+    date = models.DateField(verbose_name='Дата рассылки')
+    shard = models.PositiveIntegerField(verbose_name='Номер шарда')
+    user_id_from = models.BigIntegerField(verbose_name='ID пользователя от')
+    user_id_to = models.BigIntegerField(verbose_name='ID пользователя до')
+    cursor = models.BigIntegerField(default=0, verbose_name='Последний обработанный ID')
+    lease_owner = models.CharField(max_length=255, blank=True, verbose_name='Владелец аренды')
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name='Аренда до')
+    sent = models.IntegerField(default=0, verbose_name='Отправлено')
+    failed = models.IntegerField(default=0, verbose_name='Ошибок')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+
+    class Meta:
+        verbose_name = 'Шард рассылки'
+        verbose_name_plural = 'Шарды рассылки'
+        ordering = ['-date', 'shard']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'shard'], name='bot_reminder_shard_date_shard'),
+        ]
+
+    def __str__(self):
+        return f"Reminders {self.date} shard {self.shard} [{self.user_id_from}-{self.user_id_to}]"
+
+
+class FSMRecord(models.Model):
+    """
+    Состояние и данные FSM aiogram для одного чата/пользователя.
+
+    Хранится в БД, поэтому видно всем процессам бота и переживает
+    перезапуск; устаревшие записи удаляются пачками (bot.storage.cleanup_expired).
+    """
+    key = models.CharField(max_length=255, primary_key=True, verbose_name='Ключ')
+    state = models.CharField(max_length=255, null=True, blank=True, verbose_name='Состояние')
+    data = models.JSONField(default=dict, blank=True, verbose_name='Данные')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Истекает')
+
+    class Meta:
+        verbose_name = 'Состояние FSM'
+        verbose_name_plural = 'Состояния FSM'
+
+    def __str__(self):
+        return f"{self.key}: {self.state}"
+
+
+class VoiceFile(models.Model):
+    """
+    file_id голосового сообщения Telegram для озвученного слова.
+
+    После первой загрузки mp3 Telegram возвращает file_id, по которому
+    тот же файл можно отправлять повторно без загрузки. Ключ тот же, что
+    у кэша озвучки (cards.tts_cache.cache_key), поэтому длина слова
+    не ограничена, а слова, различающиеся только регистром или пробелами,
+    делят один файл.
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name='Ключ')
+    word = models.CharField(max_length=200, verbose_name='Слово')
+    language = models.CharField(max_length=10, verbose_name='Язык')
+    file_id = models.CharField(max_length=255, verbose_name='Telegram file_id')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Голосовой файл'
+        verbose_name_plural = 'Голосовые файлы'
+
+    def __str__(self):
+        return f"{self.word} ({self.language})"
@@ -0,0 +1,593 @@
+"""
+Рассылка напоминаний о карточках на сегодня.
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter,
+)
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from schedules.models import Schedule
+from stats.models import UserProfile
+from .models import ReminderShard
+
+logger = logging.getLogger('bot')
+
+
+REMINDER_TEXT = (
+    "📚 Напоминание!\n\n"
+    "У тебя {count} карточек для повторения сегодня.\n\n"
+    "Используй /today чтобы посмотреть список или /test для быстрого теста!"
+)
+
+
+def get_due_counts_chunk(after_user_id: int = 0, limit: int = 1000, now=None,
+                         user_id_to: int = None, not_reminded_on=None) -> list:
+    """
+    Получает количество карточек к повторению для пачки пользователей с Telegram.
+
+    Один сгруппированный запрос на пачку; пачки идут по возрастанию ID
+    пользователя (keyset-пагинация), поэтому выборку можно читать потоком.
+
+    Args:
+        after_user_id: ID пользователя, после которого начинается пачка
+        limit: Размер пачки
+        now: Момент, на который считаются карточки (по умолчанию текущий)
+        user_id_to: Последний ID пользователя диапазона (включительно)
+        not_reminded_on: Дата; пользователи, уже получившие напоминание
+            в этот день, пропускаются
+
+    Returns:
+        list: Список кортежей (user_id, telegram_id, количество карточек)
+    """
+    schedules = Schedule.objects.filter(
+        next_review_at__lte=now or timezone.now(),
+        card__user_id__gt=after_user_id,
+        card__user__profile__telegram_id__isnull=False,
+    )
+    if user_id_to is not None:
+        schedules = schedules.filter(card__user_id__lte=user_id_to)
+    if not_reminded_on is not None:
+        schedules = schedules.filter(
+            Q(card__user__profile__last_reminder_date__isnull=True) |
+            Q(card__user__profile__last_reminder_date__lt=not_reminded_on)
+        )
+    rows = (
+        schedules
+        .values('card__user_id', 'card__user__profile__telegram_id')
+        .annotate(due=Count('id'))
+        .order_by('card__user_id')[:limit]
+    )
+    return [
+        (row['card__user_id'], row['card__user__profile__telegram_id'], row['due'])
+        for row in rows
+    ]
+
+
+def claim_reminders(due_counts: list, day, now=None, lease_seconds: float = None) -> list:
+    """
+    Забирает пользователей для отправки напоминания за день.
+
+    Захват - условный UPDATE, который ставит reminder_claimed_at, только
+    если напоминание за день еще не отправлено и пользователя не держит
+    другой воркер. Дата напоминания записывается после успешной отправки
+    (confirm_reminders), а при ошибке захват снимается (release_reminders),
+    поэтому ни сбой отправки, ни падение воркера не оставляют пользователя
+    без напоминания: захват упавшего воркера истекает через lease_seconds.
+
+    Args:
+        due_counts: Список кортежей (user_id, telegram_id, количество карточек)
+        day: Дата рассылки
+        now: Текущий момент (по умолчанию timezone.now())
+        lease_seconds: Через сколько секунд захват считается брошенным
+
+    Returns:
+        list: Кортежи только для пользователей, которых удалось забрать
+    """
+    now = now or timezone.now()
+    lease_seconds = lease_seconds or getattr(settings, 'REMINDER_LEASE_SECONDS', 300)
+    expired = now - timedelta(seconds=lease_seconds)
+    claimed = []
+    with transaction.atomic():
+        for row in due_counts:
+            updated = UserProfile.objects.filter(
+                Q(last_reminder_date__isnull=True) | Q(last_reminder_date__lt=day),
+                Q(reminder_claimed_at__isnull=True) | Q(reminder_claimed_at__lt=expired),
+                user_id=row[0],
+            ).update(reminder_claimed_at=now)
+            if updated:
+                claimed.append(row)
+    return claimed
+
+
+def confirm_reminders(user_ids: list, day):
+    """Записывает дату напоминания пользователям, которым оно отправлено."""
+    if user_ids:
+        UserProfile.objects.filter(user_id__in=user_ids).update(
+            last_reminder_date=day, reminder_claimed_at=None,
+        )
+
+
+def release_reminders(user_ids: list):
+    """Снимает захват с пользователей, которым не удалось отправить напоминание."""
+    if user_ids:
+        UserProfile.objects.filter(user_id__in=user_ids).update(reminder_claimed_at=None)
+
+
+def claim_due_profiles(now=None, limit: int = 1000, lease_seconds: float = None) -> list:
+    """
+    Забирает пользователей, у которых наступило время напоминания.
+
+    Выборка идет по индексу next_reminder_at и касается только пользователей
+    текущей минуты. Каждый профиль забирается условным UPDATE, который
+    ставит reminder_claimed_at: параллельные тики не заберут одного
+    пользователя дважды. next_reminder_at и дата напоминания меняются
+    только после отправки (confirm_due_profiles); захват упавшего воркера
+    истекает через lease_seconds, и пользователя забирает следующий тик.
+
+    Args:
+        now: Текущий момент (по умолчанию timezone.now())
+        limit: Максимум пользователей за вызов
+        lease_seconds: Через сколько секунд захват считается брошенным
+
+    Returns:
+        list: Забранные профили (UserProfile)
+    """
+    now = now or timezone.now()
+    lease_seconds = lease_seconds or getattr(settings, 'REMINDER_LEASE_SECONDS', 300)
+    expired = now - timedelta(seconds=lease_seconds)
+    not_claimed = Q(reminder_claimed_at__isnull=True) | Q(reminder_claimed_at__lt=expired)
+    profiles = (
+        UserProfile.objects
+        .filter(not_claimed, next_reminder_at__lte=now, telegram_id__isnull=False)
+        .order_by('next_reminder_at')
+        .only('pk', 'user_id', 'reminder_time', 'timezone', 'next_reminder_at')[:limit]
+    )
+
+    claimed = []
+    for profile in profiles:
+        updated = UserProfile.objects.filter(
+            not_claimed, pk=profile.pk, next_reminder_at=profile.next_reminder_at,
+        ).update(reminder_claimed_at=now)
+        if updated:
+            claimed.append(profile)
+    return claimed
+
+
+def confirm_due_profiles(profiles: list, now=None):
+    """
+    Переносит напоминание на следующий день пользователям, которые его получили.
+
+    Если пользователь успел сменить время напоминания, его новое
+    next_reminder_at не перезаписывается, снимается только захват.
+
+    Args:
+        profiles: Профили из claim_due_profiles
+        now: Момент тика (по умолчанию timezone.now())
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        for profile in profiles:
+            local_date = profile.next_reminder_at.astimezone(ZoneInfo(profile.timezone)).date()
+            updated = UserProfile.objects.filter(
+                pk=profile.pk, next_reminder_at=profile.next_reminder_at,
+            ).update(
+                next_reminder_at=profile.get_next_reminder_at(now),
+                last_reminder_date=local_date,
+                reminder_claimed_at=None,
+            )
+            if not updated:
+                UserProfile.objects.filter(pk=profile.pk).update(reminder_claimed_at=None)
+
+
+def get_due_counts_for_users(user_ids: list, now=None) -> list:
+    """
+    Получает количество карточек к повторению для заданных пользователей.
+
+    Args:
+        user_ids: Список ID пользователей
+        now: Момент, на который считаются карточки (по умолчанию текущий)
+
+    Returns:
+        list: Список кортежей (user_id, telegram_id, количество карточек)
+            только для пользователей, у которых есть карточки
+    """
+    rows = (
+        Schedule.objects
+        .filter(next_review_at__lte=now or timezone.now(), card__user_id__in=user_ids)
+        .values('card__user_id', 'card__user__profile__telegram_id')
+        .annotate(due=Count('id'))
+        .order_by('card__user_id')
+    )
+    return [
+        (row['card__user_id'], row['card__user__profile__telegram_id'], row['due'])
+        for row in rows
+    ]
+
+
+def plan_shards(day, shard_size: int = None) -> list:
+    """
+    Создает шарды рассылки на день и возвращает незавершенные.
+
+    Шард покрывает фиксированный диапазон ID пользователей
+    [n * shard_size, (n + 1) * shard_size - 1], поэтому повторный вызов
+    в тот же день находит уже созданные шарды, а не плодит новые.
+
+    Args:
+        day: Дата рассылки
+        shard_size: Ширина диапазона ID пользователей в шарде
+
+    Returns:
+        list: ID незавершенных шардов
+    """
+    shard_size = shard_size or getattr(settings, 'REMINDER_SHARD_SIZE', 10000)
+    bounds = UserProfile.objects.filter(telegram_id__isnull=False).aggregate(
+        first=Min('user_id'), last=Max('user_id'),
+    )
+    if bounds['first'] is not None:
+        ReminderShard.objects.bulk_create([
+            ReminderShard(
+                date=day,
+                shard=number,
+                user_id_from=number * shard_size,
+                user_id_to=(number + 1) * shard_size - 1,
+                cursor=number * shard_size - 1,
+            )
+            for number in range(bounds['first'] // shard_size, bounds['last'] // shard_size + 1)
+        ], ignore_conflicts=True)
+
+    return list(
+        ReminderShard.objects
+        .filter(date=day, finished_at__isnull=True)
+        .order_by('shard')
+        .values_list('id', flat=True)
+    )
+
+
+def acquire_lease(shard_id: int, owner: str, duration: float = None) -> bool:
+    """
+    Берет (или продлевает) аренду шарда.
+
+    Аренду можно взять, если шард не завершен и она свободна, истекла
+    или уже принадлежит owner. Проверка и захват - один условный UPDATE.
+
+    Args:
+        shard_id: ID шарда
+        owner: Идентификатор обработчика (например, ID задачи Celery)
+        duration: Длительность аренды в секундах
+
+    Returns:
+        bool: Удалось ли взять аренду
+    """
+    duration = duration or getattr(settings, 'REMINDER_LEASE_SECONDS', 300)
+    now = timezone.now()
+    return bool(
+        ReminderShard.objects.filter(
+            Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now) | Q(lease_owner=owner),
+            pk=shard_id,
+            finished_at__isnull=True,
+        ).update(lease_owner=owner, lease_expires_at=now + timedelta(seconds=duration))
+    )
+
+
+def advance_shard(shard_id: int, owner: str, cursor: int, sent: int = 0, failed: int = 0,
+                  duration: float = None) -> bool:
+    """
+    Сдвигает курсор шарда после обработанной пачки и продлевает аренду.
+
+    Returns:
+        bool: False, если аренду перехватил другой обработчик
+    """
+    duration = duration or getattr(settings, 'REMINDER_LEASE_SECONDS', 300)
+    return bool(
+        ReminderShard.objects.filter(pk=shard_id, lease_owner=owner).update(
+            cursor=cursor,
+            sent=F('sent') + sent,
+            failed=F('failed') + failed,
+            lease_expires_at=timezone.now() + timedelta(seconds=duration),
+        )
+    )
+
+
+def finish_shard(shard_id: int, owner: str) -> bool:
+    """Помечает шард завершенным и освобождает аренду."""
+    return bool(
+        ReminderShard.objects.filter(pk=shard_id, lease_owner=owner).update(
+            finished_at=timezone.now(),
+            lease_owner='',
+            lease_expires_at=None,
+        )
+    )
+
+
+def reopen_shard(shard_id: int, owner: str) -> bool:
+    """
+    Возвращает курсор шарда в начало диапазона и освобождает аренду.
+
+    Нужен, когда шард пройден, но части пользователей напоминание
+    отправить не удалось: шард остается незавершенным, и повторный
+    запуск (plan_shards) снова выберет только их - остальные отмечены
+    датой напоминания.
+    """
+    return bool(
+        ReminderShard.objects.filter(pk=shard_id, lease_owner=owner).update(
+            cursor=F('user_id_from') - 1,
+            lease_owner='',
+            lease_expires_at=None,
+        )
+    )
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket: не более rate операций в секунду
+    с допустимым всплеском capacity.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Ждет, пока не освободится токен, и забирает его."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Останавливает выдачу токенов на seconds секунд (например, после retry_after)."""
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class PerChatLimiter:
+    """
+    Ограничение частоты сообщений в один чат.
+
+    Хранит время последней отправки только для недавних чатов,
+    поэтому память не растет с числом пользователей.
+    """
+
+    def __init__(self, interval: float = 1.0, max_size: int = 10000):
+        self.interval = interval
+        self.max_size = max_size
+        self._last_sent = {}
+
+    async def wait(self, chat_id: int):
+        """Ждет, пока в чат снова можно отправить сообщение."""
+        last_sent = self._last_sent.get(chat_id)
+        if last_sent is not None:
+            delay = last_sent + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._last_sent[chat_id] = time.monotonic()
+        if len(self._last_sent) > self.max_size:
+            self._prune()
+
+    def _prune(self):
+        threshold = time.monotonic() - self.interval
+        self._last_sent = {
+            chat_id: sent_at for chat_id, sent_at in self._last_sent.items()
+            if sent_at > threshold
+        }
+
+
+class ReminderSender:
+    """
+    Параллельная отправка напоминаний с ограничением частоты.
+
+    Соблюдает общий лимит Telegram (сообщений в секунду) и лимит на чат,
+    повторяет отправку после retry_after и использует одну HTTP-сессию бота.
+    """
+
+    MAX_RETRIES = 3
+
+    def __init__(self, bot, rate: float = None, concurrency: int = None,
+                 per_chat_interval: float = None):
+        self.bot = bot
+        self.bucket = TokenBucket(rate or getattr(settings, 'REMINDER_GLOBAL_RATE', 25))
+        self.chat_limiter = PerChatLimiter(per_chat_interval or getattr(settings, 'REMINDER_PER_CHAT_INTERVAL', 1.0))
+        self.semaphore = asyncio.Semaphore(concurrency or getattr(settings, 'REMINDER_CONCURRENCY', 20))
+        self.sent = 0
+        self.failed = 0
+        # Чаты, куда отправлять бесполезно (бот заблокирован, чат не найден):
+        # повтор не поможет, поэтому такие напоминания не возвращаются в очередь
+        self.undeliverable = set()
+
+    async def send(self, telegram_id: int, text: str) -> bool:
+        """
+        Отправляет одно сообщение с повторами при flood control.
+
+        Returns:
+            bool: Удалось ли отправить сообщение
+        """
+        async with self.semaphore:
+            for attempt in range(self.MAX_RETRIES + 1):
+                await self.chat_limiter.wait(telegram_id)
+                await self.bucket.acquire()
+                try:
+                    await self.bot.send_message(telegram_id, text)
+                    self.sent += 1
+                    return True
+                except TelegramRetryAfter as e:
+                    logger.warning(f"Flood control при отправке в {telegram_id}, ждем {e.retry_after} сек.")
+                    self.bucket.pause(e.retry_after)
+                    await asyncio.sleep(e.retry_after)
+                except TelegramNetworkError as e:
+                    if attempt == self.MAX_RETRIES:
+                        logger.error(f"Сетевая ошибка отправки в {telegram_id}: {e}")
+                        break
+                    await asyncio.sleep(2 ** attempt)
+                except (TelegramForbiddenError, TelegramBadRequest) as e:
+                    # Пользователь заблокировал бота, чат не найден и т.п. - не повторяем
+                    logger.info(f"Не удалось отправить напоминание в {telegram_id}: {e}")
+                    self.undeliverable.add(telegram_id)
+                    break
+                except TelegramAPIError as e:
+                    # Ошибка на стороне Telegram: повторит следующая рассылка
+                    logger.warning(f"Ошибка Telegram при отправке в {telegram_id}: {e}")
+                    break
+            self.failed += 1
+            return False
+
+    async def send_reminders(self, due_counts: list) -> list:
+        """
+        Отправляет напоминания пачке пользователей параллельно.
+
+        Args:
+            due_counts: Список кортежей (user_id, telegram_id, количество карточек)
+
+        Returns:
+            list: Результаты отправки (bool) в порядке due_counts
+        """
+        return await asyncio.gather(*(
+            self.send(telegram_id, REMINDER_TEXT.format(count=count))
+            for _, telegram_id, count in due_counts
+        ))
+
+
+async def send_shard_reminders(bot, shard_id: int, owner: str, chunk_size: int = None) -> str:
+    """
+    Рассылает напоминания пользователям одного шарда.
+
+    Пачки читаются начиная с курсора шарда, поэтому после падения воркера
+    рассылка продолжается с места остановки. Пользователи забираются
+    до отправки (claim_reminders); дата напоминания записывается только
+    тем, кому оно отправлено (или кому отправить невозможно), с остальных
+    захват снимается. Курсор сдвигается после каждой пачки. Если кому-то
+    отправить не удалось, шард в конце не завершается, а открывается
+    заново (reopen_shard), и повторный запуск рассылки их повторит.
+    HTTP-сессия бота закрывается в конце.
+
+    Args:
+        bot: Экземпляр aiogram Bot
+        shard_id: ID шарда
+        owner: Идентификатор обработчика для аренды
+        chunk_size: Размер пачки пользователей
+
+    Returns:
+        str: Итог обработки шарда
+    """
+    chunk_size = chunk_size or getattr(settings, 'REMINDER_CHUNK_SIZE', 1000)
+
+    if not await sync_to_async(acquire_lease)(shard_id, owner):
+        return f"Shard {shard_id} is leased by another worker or finished"
+
+    shard = await ReminderShard.objects.aget(pk=shard_id)
+    sender = ReminderSender(bot)
+    now = timezone.now()
+    cursor = shard.cursor
+    processed = 0
+    released = 0
+    finished = False
+
+    try:
+        while True:
+            chunk = await sync_to_async(get_due_counts_chunk)(
+                cursor, chunk_size, now, shard.user_id_to, shard.date
+            )
+            if not chunk:
+                finished = True
+                break
+            claimed = await sync_to_async(claim_reminders)(chunk, shard.date)
+            sent, failed = sender.sent, sender.failed
+            results = await sender.send_reminders(claimed)
+            retry_ids = {
+                user_id for (user_id, telegram_id, _), ok in zip(claimed, results)
+                if not ok and telegram_id not in sender.undeliverable
+            }
+            await sync_to_async(confirm_reminders)(
+                [row[0] for row in claimed if row[0] not in retry_ids], shard.date
+            )
+            await sync_to_async(release_reminders)(retry_ids)
+            processed += len(claimed)
+            released += len(retry_ids)
+            cursor = chunk[-1][0]
+            if not await sync_to_async(advance_shard)(
+                shard_id, owner, cursor, sender.sent - sent, sender.failed - failed
+            ):
+                logger.warning(f"Аренда шарда {shard_id} потеряна, останавливаемся")
+                break
+    finally:
+        await bot.session.close()
+
+    if finished and released:
+        await sync_to_async(reopen_shard)(shard_id, owner)
+    elif finished:
+        await sync_to_async(finish_shard)(shard_id, owner)
+
+    return (
+        f"Shard {shard.shard} ({shard.date}): processed {processed} users, "
+        f"sent {sender.sent} reminders, failed {sender.failed}, will retry {released}"
+    )
+
+
+async def send_due_reminders(bot, now=None, chunk_size: int = None) -> str:
+    """
+    Рассылает напоминания пользователям, у которых наступило их время.
+
+    Вызывается раз в минуту: пользователи забираются пачками по индексу
+    next_reminder_at (claim_due_profiles), поэтому нагрузка распределена
+    по суткам, а тик обрабатывает только пользователей своей минуты.
+    Напоминание переносится на следующий день только тем, кому оно
+    отправлено (или кому его отправить невозможно); с остальных захват
+    снимается в конце тика, и их забирает следующий тик.
+
+    Args:
+        bot: Экземпляр aiogram Bot
+        now: Текущий момент (по умолчанию timezone.now())
+        chunk_size: Размер пачки пользователей
+
+    Returns:
+        str: Итог рассылки
+    """
+    chunk_size = chunk_size or getattr(settings, 'REMINDER_CHUNK_SIZE', 1000)
+    now = now or timezone.now()
+    sender = ReminderSender(bot)
+    claimed_total = 0
+    retry_ids = []
+
+    try:
+        while True:
+            profiles = await sync_to_async(claim_due_profiles)(now, chunk_size)
+            if not profiles:
+                break
+            claimed_total += len(profiles)
+            due_counts = await sync_to_async(get_due_counts_for_users)(
+                [profile.user_id for profile in profiles], now
+            )
+            results = await sender.send_reminders(due_counts)
+            failed = {
+                user_id for (user_id, telegram_id, _), ok in zip(due_counts, results)
+                if not ok and telegram_id not in sender.undeliverable
+            }
+            # Пользователям без карточек к повторению напоминать не о чем - тоже переносим
+            await sync_to_async(confirm_due_profiles)(
+                [profile for profile in profiles if profile.user_id not in failed], now
+            )
+            retry_ids.extend(failed)
+    finally:
+        # Захват снимается после тика, иначе этот же тик забрал бы неудачных снова
+        if retry_ids:
+            await sync_to_async(release_reminders)(retry_ids)
+        await bot.session.close()
+
+    return (
+        f"Claimed {claimed_total} users, sent {sender.sent} reminders, "
+        f"failed {sender.failed}, will retry {len(retry_ids)}"
+    )
@@ -0,0 +1,116 @@
+"""
+Сессия теста в боте, хранящаяся в данных FSM.
+"""
+import time
+from django.conf import settings
+from cards.review import ReviewSession
+from schedules.services import SM2Service
+
+
+class BotReviewSession:
+    """
+    Пачка карточек к повторению, сохраненная в данных FSM пользователя.
+
+    При старте теста в FSM записываются id, слово, перевод и пример
+    нескольких ближайших карточек; показ ответа берет их оттуда без чтения
+    карточки из БД, а ответ только записывает результат. Когда пачка
+    заканчивается, она дочитывается одним запросом.
+    """
+
+    DATA_KEY = 'review'
+
+    def __init__(self, state, user, batch_size: int = None):
+        """
+        Args:
+            state: FSMContext пользователя
+            user: Пользователь Django
+            batch_size: Сколько карточек читать за раз
+        """
+        self.state = state
+        self.user = user
+        self.batch_size = batch_size or getattr(settings, 'BOT_REVIEW_BATCH_SIZE', 20)
+
+    async def start(self):
+        """
+        Начинает новую сессию со свежей пачкой карточек.
+
+        Returns:
+            dict или None: Первая карточка или None, если повторять нечего
+        """
+        data = {'cards': await self._load_batch(), 'current': None, 'shown_at': None}
+        return await self._show_next(data)
+
+    async def get_card(self, card_id: int):
+        """
+        Возвращает карточку из сессии без обращения к таблице карточек.
+
+        Returns:
+            dict или None: {'id', 'word', 'translation', 'example'} или None,
+                если карточки нет в текущей пачке
+        """
+        data = await self._get_data()
+        for card in data['cards']:
+            if card['id'] == card_id:
+                return card
+        return None
+
+    async def answer(self, card_id: int, quality: int, source: str = 'bot'):
+        """
+        Записывает ответ и переходит к следующей карточке.
+
+        Args:
+            card_id: ID карточки
+            quality: Качество ответа (0-5)
+            source: Источник ответа для журнала
+
+        Returns:
+            dict или None: Следующая карточка или None, если повторять больше нечего
+
+        Raises:
+            Card.DoesNotExist: Если карточка чужая или удалена
+        """
+        data = await self._get_data()
+        seconds = 0
+        if data['current'] == card_id and data['shown_at']:
+            seconds = int(min(max(time.time() - data['shown_at'], 0), ReviewSession.MAX_ANSWER_SECONDS))
+
+        await SM2Service.arecord_review(self.user, card_id, quality, source, seconds)
+
+        data['cards'] = [card for card in data['cards'] if card['id'] != card_id]
+        if not data['cards']:
+            data['cards'] = await self._load_batch()
+        return await self._show_next(data)
+
+    async def finish(self):
+        """Удаляет сессию из данных FSM."""
+        data = await self.state.get_data()
+        if self.DATA_KEY in data:
+            data.pop(self.DATA_KEY)
+            await self.state.set_data(data)
+
+    async def _show_next(self, data: dict):
+        """Делает первую карточку пачки текущей и запоминает время показа."""
+        if not data['cards']:
+            await self.finish()
+            return None
+        card = data['cards'][0]
+        data['current'] = card['id']
+        data['shown_at'] = time.time()
+        await self.state.update_data({self.DATA_KEY: data})
+        return card
+
+    async def _get_data(self) -> dict:
+        data = await self.state.get_data()
+        return data.get(self.DATA_KEY) or {'cards': [], 'current': None, 'shown_at': None}
+
+    async def _load_batch(self) -> list:
+        cards = await SM2Service.aget_due_queue(self.user, limit=self.batch_size)
+        return [
+            {
+                'id': card.pk,
+                'word': card.word,
+                'translation': card.translation,
+                'example': card.example or '',
+            }
+            for card in cards
+        ]
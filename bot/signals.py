@@ -0,0 +1,26 @@
+"""
+Сигналы Django для сброса кэша пользователей бота.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from stats.models import UserProfile
+from .user_cache import user_cache
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_cache_for_profile(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш для профиля (в том числе по старому Telegram ID, если он изменился).
+    """
+    user_cache.invalidate(telegram_id=instance.telegram_id, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache_for_user(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш при изменении или удалении пользователя.
+    """
+    user_cache.invalidate(user_id=instance.pk)
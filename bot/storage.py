@@ -0,0 +1,148 @@
+"""
+Хранилища состояний FSM бота, общие для нескольких процессов.
+
+Бэкенд выбирается настройкой BOT_FSM_STORAGE:
+    memory - MemoryStorage aiogram (только один процесс, теряется при перезапуске)
+    db     - таблица bot.FSMRecord в БД Django
+    redis  - RedisStorage aiogram (BOT_FSM_REDIS_URL), истечение через TTL Redis
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Mapping
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from linguatrack.async_db import run_in_db
+from .models import FSMRecord
+
+logger = logging.getLogger('bot')
+
+
+class DjangoStorage(BaseStorage):
+    """
+    Хранилище FSM в БД Django: одна строка (состояние + данные) на ключ.
+
+    Каждая запись продлевает срок жизни на ttl секунд; истекшие записи
+    не читаются и удаляются пачками функцией cleanup_expired. Пустые
+    записи (без состояния и данных) удаляются сразу, поэтому таблица
+    хранит только активные диалоги.
+    """
+
+    def __init__(self, ttl: int = None, key_builder=None):
+        self.ttl = ttl or getattr(settings, 'BOT_FSM_TTL', 86400)
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await run_in_db(self._save, self.key_builder.build(key), state=state)
+
+    async def get_state(self, key: StorageKey):
+        record = await run_in_db(self._load, self.key_builder.build(key))
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await run_in_db(self._save, self.key_builder.build(key), data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict:
+        record = await run_in_db(self._load, self.key_builder.build(key))
+        return dict(record.data) if record else {}
+
+    async def close(self) -> None:
+        pass
+
+    def _load(self, key: str):
+        return FSMRecord.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+
+    def _save(self, key: str, **fields):
+        """
+        Обновляет поля записи и продлевает ее срок жизни.
+
+        Запись читается и сохраняется в одной транзакции под блокировкой
+        строки, поэтому одновременные set_state и set_data одного чата
+        (например, из разных процессов webhook) не затирают друг друга.
+
+        Args:
+            key: Ключ записи
+            **fields: state и/или data
+        """
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    self._save_locked(key, fields)
+                return
+            except IntegrityError:
+                # Запись одновременно создал другой процесс: повторяем, блокируя ее
+                if attempt:
+                    raise
+
+    def _save_locked(self, key: str, fields: dict):
+        now = timezone.now()
+        record = FSMRecord.objects.select_for_update().filter(key=key).first()
+        created = record is None
+        if created:
+            record = FSMRecord(key=key, state=None, data={})
+        elif record.expires_at <= now:
+            # Истекшая запись равносильна отсутствующей
+            record.state, record.data = None, {}
+        for name, value in fields.items():
+            setattr(record, name, value)
+
+        if record.state is None and not record.data:
+            if not created:
+                record.delete()
+            return
+
+        record.expires_at = now + timedelta(seconds=self.ttl)
+        if created:
+            record.save(force_insert=True)
+        else:
+            record.save()
+
+
+def cleanup_expired(batch_size: int = 1000) -> int:
+    """
+    Удаляет истекшие записи FSM пачками, не блокируя таблицу надолго.
+
+    Args:
+        batch_size: Количество записей, удаляемых одним запросом
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(
+            FSMRecord.objects.filter(expires_at__lte=now).values_list('key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        deleted += FSMRecord.objects.filter(key__in=keys, expires_at__lte=now).delete()[0]
+
+
+def get_fsm_storage() -> BaseStorage:
+    """
+    Создает хранилище FSM по настройке BOT_FSM_STORAGE.
+
+    Returns:
+        BaseStorage: Хранилище для Dispatcher
+    """
+    backend = getattr(settings, 'BOT_FSM_STORAGE', 'db')
+    ttl = getattr(settings, 'BOT_FSM_TTL', 86400)
+
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'redis':
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(
+            getattr(settings, 'BOT_FSM_REDIS_URL', 'redis://localhost:6379/2'),
+            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=ttl,
+            data_ttl=ttl,
+        )
+    if backend != 'db':
+        logger.warning(f"Неизвестный BOT_FSM_STORAGE={backend}, используем db")
+    return DjangoStorage(ttl=ttl)
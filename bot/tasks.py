@@ -1,52 +1,87 @@
 """
 Celery задачи для Telegram-бота.
 """
+import asyncio
 import logging
 from celery import shared_task
 from django.utils import timezone
-from django.contrib.auth.models import User
-from schedules.services import SM2Service
-from stats.models import UserProfile
 
 logger = logging.getLogger('bot')
 
 
+@shared_task(ignore_result=True)
+def send_due_reminders():
+    """
+    Отправляет напоминания пользователям, чье время напоминания наступило.
+
+    Запускается Celery Beat раз в минуту и обрабатывает только
+    пользователей с next_reminder_at не позже текущего момента.
+    """
+    from bot.bot import bot
+    from bot.reminders import send_due_reminders as send_due
+
+    result = asyncio.run(send_due(bot))
+    logger.info(result)
+    return result
+
+
 @shared_task
 def send_daily_reminders():
     """
-    Отправляет напоминания пользователям о карточках на сегодня.
+    Раздает рассылку напоминаний всем пользователям сразу, по шардам.
+
+    Регулярная рассылка идет по времени пользователей (send_due_reminders);
+    эта задача нужна для ручной массовой рассылки.
+
+    Каждый шард (диапазон ID пользователей) обрабатывается отдельной задачей,
+    поэтому рассылка масштабируется числом воркеров. Повторный запуск в тот же
+    день ставит в очередь только незавершенные шарды.
+    """
+    from bot.reminders import plan_shards
+
+    shard_ids = plan_shards(timezone.localdate())
+    for shard_id in shard_ids:
+        send_reminder_shard.delay(shard_id)
+
+    result = f"Dispatched {len(shard_ids)} reminder shards"
+    logger.info(result)
+    return result
+
+
+@shared_task(bind=True, acks_late=True, max_retries=3, default_retry_delay=60)
+def send_reminder_shard(self, shard_id):
+    """
+    Отправляет напоминания пользователям одного шарда.
+
+    Задача подтверждается после выполнения (acks_late): если воркер упадет,
+    брокер отдаст ее другому воркеру, и тот продолжит с курсора шарда
+    после истечения аренды.
+
+    Args:
+        shard_id: ID шарда (bot.ReminderShard)
     """
-    import asyncio
     from bot.bot import bot
-    
-    async def send_reminders():
-        profiles = UserProfile.objects.filter(telegram_id__isnull=False)
-        processed = 0
-        sent = 0
-        
-        for profile in profiles:
-            cards = SM2Service.get_cards_for_today(profile.user)
-            if cards:
-                try:
-                    message = (
-                        f"📚 Напоминание!\n\n"
-                        f"У тебя {len(cards)} карточек для повторения сегодня.\n\n"
-                        f"Используй /today чтобы посмотреть список или /test для быстрого теста!"
-                    )
-                    await bot.send_message(profile.telegram_id, message)
-                    sent += 1
-                except Exception as e:
-                    logger.error(f"Ошибка отправки напоминания пользователю {profile.user.username}: {e}", exc_info=True)
-                processed += 1
-        
-        return f"Processed {processed} users, sent {sent} reminders"
-    
-    # Запускаем асинхронную функцию
+    from bot.reminders import send_shard_reminders
+
+    owner = self.request.id or f"shard-{shard_id}"
     try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(send_reminders())
+        result = asyncio.run(send_shard_reminders(bot, shard_id, owner))
+    except Exception as e:
+        logger.error(f"Ошибка рассылки шарда {shard_id}: {e}", exc_info=True)
+        raise self.retry(exc=e)
+
+    logger.info(result)
+    return result
+
+
+@shared_task(ignore_result=True)
+def cleanup_fsm_storage():
+    """
+    Удаляет истекшие состояния FSM бота (для BOT_FSM_STORAGE=db).
+    """
+    from bot.storage import cleanup_expired
 
+    deleted = cleanup_expired()
+    if deleted:
+        logger.info(f"Удалено истекших состояний FSM: {deleted}")
+    return deleted
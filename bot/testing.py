@@ -0,0 +1,153 @@
+"""
+Локальная замена Telegram Bot API для тестов и нагрузочных прогонов.
+
+Пример:
+    session = FakeTelegramSession()
+    bot = Bot(token='123456:TEST', session=session)
+    await bot.send_message(42, 'hi')
+    session.calls  # [('SendMessage', SendMessage(chat_id=42, text='hi', ...))]
+
+Обновления можно подавать в ASGI-приложение webhook без сети:
+    status = await post_update(app, make_message_update('/start'), secret_token='...')
+"""
+import itertools
+import json
+import time
+from typing import get_args
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Сессия aiogram, которая не ходит в сеть, а записывает вызовы API.
+
+    Ответы по умолчанию: True для методов, возвращающих bool, и сообщение
+    для методов, возвращающих Message. Для остальных методов (или чтобы
+    имитировать ошибку) ответ задается в responses: значение или функция
+    от метода; функция может бросить исключение aiogram, например
+    TelegramRetryAfter.
+    """
+
+    def __init__(self, responses: dict = None, **kwargs):
+        super().__init__(**kwargs)
+        self.responses = responses or {}
+        self.calls = []
+        self.closed = False
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout: int = None):
+        name = type(method).__name__
+        self.calls.append((name, method))
+
+        if name in self.responses:
+            response = self.responses[name]
+            return response(method) if callable(response) else response
+
+        returning = method.__returning__
+        if returning is bool:
+            return True
+        # Методы редактирования возвращают Message | bool
+        if returning is Message or Message in get_args(returning):
+            return self.make_message(method)
+        raise NotImplementedError(f"FakeTelegramSession: задайте ответ для {name} в responses")
+
+    def make_message(self, method, **fields) -> Message:
+        """
+        Создает сообщение-ответ на метод (удобно в функциях из responses).
+
+        Args:
+            method: Вызванный метод Bot API
+            **fields: Дополнительные поля Message (например, voice)
+        """
+        return Message(
+            message_id=next(self._message_ids),
+            date=int(time.time()),
+            chat=Chat(id=getattr(method, 'chat_id', 0), type='private'),
+            text=getattr(method, 'text', None),
+            **fields
+        )
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def close(self):
+        self.closed = True
+
+    def sent_messages(self) -> list:
+        """Список (chat_id, text) отправленных текстовых сообщений."""
+        return [
+            (method.chat_id, method.text)
+            for name, method in self.calls
+            if name == 'SendMessage'
+        ]
+
+
+_update_ids = itertools.count(1)
+
+
+def make_message_update(text: str, user_id: int = 1, username: str = 'tester') -> dict:
+    """
+    Создает JSON обновления Telegram с текстовым сообщением от пользователя.
+
+    Args:
+        text: Текст сообщения
+        user_id: Telegram ID пользователя (он же ID личного чата)
+        username: Username пользователя
+
+    Returns:
+        dict: Обновление в формате Bot API
+    """
+    update_id = next(_update_ids)
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'username': username},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': username, 'username': username},
+            'text': text,
+        },
+    }
+
+
+async def post_update(app, update: dict, secret_token: str = None, path: str = None) -> int:
+    """
+    Отправляет обновление в ASGI-приложение webhook в том же процессе.
+
+    Args:
+        app: ASGI-приложение (например, bot.webhook.app)
+        update: Обновление в формате Bot API
+        secret_token: Значение заголовка X-Telegram-Bot-Api-Secret-Token
+        path: Путь запроса (по умолчанию путь приложения)
+
+    Returns:
+        int: HTTP-статус ответа
+    """
+    body = json.dumps(update).encode()
+    headers = [(b'content-type', b'application/json')]
+    if secret_token is not None:
+        headers.append((b'x-telegram-bot-api-secret-token', secret_token.encode()))
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'path': path or app.path,
+        'headers': headers,
+    }
+    received = False
+    status = None
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {'type': 'http.disconnect'}
+        received = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
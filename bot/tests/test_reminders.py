@@ -0,0 +1,265 @@
+from datetime import date, timedelta, timezone as dt_timezone
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramServerError
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from bot.models import ReminderShard
+from bot.reminders import (
+    acquire_lease, advance_shard, claim_due_profiles, claim_reminders, confirm_due_profiles,
+    confirm_reminders, finish_shard, plan_shards, release_reminders, send_due_reminders,
+    send_shard_reminders,
+)
+from bot.testing import FakeTelegramSession
+from cards.models import Card
+from stats.models import UserProfile
+
+DAY = date(2026, 1, 15)
+
+
+@override_settings(TTS_PREWARM=False)
+class ClaimRemindersTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.profile = UserProfile.objects.create(user=self.user, telegram_id=1001)
+        self.row = (self.user.pk, 1001, 3)
+
+    def test_claim_is_pending_until_confirmed(self):
+        self.assertEqual(claim_reminders([self.row], DAY), [self.row])
+
+        self.profile.refresh_from_db()
+        self.assertIsNone(self.profile.last_reminder_date)
+        self.assertIsNotNone(self.profile.reminder_claimed_at)
+
+    def test_claimed_user_is_not_claimed_twice(self):
+        claim_reminders([self.row], DAY)
+        self.assertEqual(claim_reminders([self.row], DAY), [])
+
+    def test_abandoned_claim_expires(self):
+        now = timezone.now()
+        claim_reminders([self.row], DAY, now=now)
+
+        later = now + timedelta(seconds=301)
+        self.assertEqual(claim_reminders([self.row], DAY, now=later, lease_seconds=300), [self.row])
+
+    def test_confirmed_user_is_skipped_until_next_day(self):
+        claim_reminders([self.row], DAY)
+        confirm_reminders([self.user.pk], DAY)
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.last_reminder_date, DAY)
+        self.assertIsNone(self.profile.reminder_claimed_at)
+        self.assertEqual(claim_reminders([self.row], DAY), [])
+        self.assertEqual(claim_reminders([self.row], DAY + timedelta(days=1)), [self.row])
+
+    def test_released_user_can_be_claimed_again(self):
+        claim_reminders([self.row], DAY)
+        release_reminders([self.user.pk])
+
+        self.profile.refresh_from_db()
+        self.assertIsNone(self.profile.last_reminder_date)
+        self.assertEqual(claim_reminders([self.row], DAY), [self.row])
+
+
+@override_settings(TTS_PREWARM=False)
+class ShardLeaseTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('carol')
+        UserProfile.objects.create(user=user, telegram_id=3001)
+        self.shard_id, = plan_shards(DAY)
+
+    def test_lease_is_exclusive_until_expired(self):
+        self.assertTrue(acquire_lease(self.shard_id, 'a'))
+        self.assertFalse(acquire_lease(self.shard_id, 'b'))
+        self.assertTrue(acquire_lease(self.shard_id, 'a'))
+
+        ReminderShard.objects.filter(pk=self.shard_id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(acquire_lease(self.shard_id, 'b'))
+
+    def test_only_owner_advances_and_finishes(self):
+        acquire_lease(self.shard_id, 'a')
+
+        self.assertFalse(advance_shard(self.shard_id, 'b', cursor=10, sent=1))
+        self.assertTrue(advance_shard(self.shard_id, 'a', cursor=10, sent=2, failed=1))
+        self.assertFalse(finish_shard(self.shard_id, 'b'))
+        self.assertTrue(finish_shard(self.shard_id, 'a'))
+
+        shard = ReminderShard.objects.get(pk=self.shard_id)
+        self.assertEqual((shard.cursor, shard.sent, shard.failed, shard.lease_owner), (10, 2, 1, ''))
+        self.assertIsNotNone(shard.finished_at)
+
+    def test_finished_shard_is_not_planned_or_leased_again(self):
+        acquire_lease(self.shard_id, 'a')
+        finish_shard(self.shard_id, 'a')
+
+        self.assertEqual(plan_shards(DAY), [])
+        self.assertFalse(acquire_lease(self.shard_id, 'b'))
+
+
+@override_settings(TTS_PREWARM=False, REMINDER_GLOBAL_RATE=1000, REMINDER_PER_CHAT_INTERVAL=0.001)
+class SendShardRemindersTests(TestCase):
+
+    def setUp(self):
+        self.day = timezone.localdate()
+        for number, telegram_id in enumerate((2001, 2002)):
+            user = User.objects.create_user(f'user{number}')
+            UserProfile.objects.create(user=user, telegram_id=telegram_id)
+            Card.objects.create(user=user, word=f'word{number}', translation='x')
+
+    def make_bot(self, failing=(), blocked=()):
+        def send_message(method):
+            if method.chat_id in failing:
+                raise TelegramServerError(method=method, message='Internal Server Error')
+            if method.chat_id in blocked:
+                raise TelegramForbiddenError(method=method, message='bot was blocked by the user')
+            return session.make_message(method)
+
+        session = FakeTelegramSession(responses={'SendMessage': send_message})
+        return Bot('123456:TEST', session=session), session
+
+    async def send_all(self, bot, owner):
+        shard_ids = await sync_to_async(plan_shards)(self.day)
+        for shard_id in shard_ids:
+            await send_shard_reminders(bot, shard_id, owner)
+        return shard_ids
+
+    async def reminded(self) -> list:
+        reminded = UserProfile.objects.filter(last_reminder_date=self.day).order_by('telegram_id')
+        return [telegram_id async for telegram_id in reminded.values_list('telegram_id', flat=True)]
+
+    async def test_failed_send_is_retried_by_rerun(self):
+        bot, session = self.make_bot(failing={2002})
+        await self.send_all(bot, 'first')
+
+        self.assertEqual(sorted(chat for chat, _ in session.sent_messages()), [2001, 2002])
+        self.assertEqual(await self.reminded(), [2001])
+
+        bot, session = self.make_bot()
+        self.assertEqual(len(await self.send_all(bot, 'second')), 1)
+
+        self.assertEqual([chat for chat, _ in session.sent_messages()], [2002])
+        self.assertEqual(await self.reminded(), [2001, 2002])
+        self.assertEqual(await sync_to_async(plan_shards)(self.day), [])
+
+    async def test_blocked_user_does_not_keep_shard_open(self):
+        bot, session = self.make_bot(blocked={2002})
+        await self.send_all(bot, 'first')
+
+        self.assertEqual(await self.reminded(), [2001, 2002])
+        self.assertEqual(await sync_to_async(plan_shards)(self.day), [])
+
+
+def make_due_profile(username: str, telegram_id: int, now, cards: int = 1) -> UserProfile:
+    """Профиль, чье время напоминания (UTC) наступает ровно в now."""
+    user = User.objects.create_user(username)
+    for number in range(cards):
+        Card.objects.create(user=user, word=f'{username}{number}', translation='x')
+    profile = UserProfile.objects.create(
+        user=user, telegram_id=telegram_id, timezone='UTC',
+        reminder_time=now.astimezone(dt_timezone.utc).time(), next_reminder_at=now,
+    )
+    return profile
+
+
+@override_settings(TTS_PREWARM=False)
+class ClaimDueProfilesTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        self.profile = make_due_profile('dave', 4001, self.now)
+
+    def test_claim_does_not_move_reminder(self):
+        claimed = claim_due_profiles(self.now)
+
+        self.assertEqual([profile.pk for profile in claimed], [self.profile.pk])
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.next_reminder_at, self.now)
+        self.assertIsNone(self.profile.last_reminder_date)
+        self.assertEqual(self.profile.reminder_claimed_at, self.now)
+
+    def test_not_due_profile_is_not_claimed(self):
+        self.assertEqual(claim_due_profiles(self.now - timedelta(minutes=1)), [])
+
+    def test_claimed_profile_is_skipped_until_claim_expires(self):
+        claim_due_profiles(self.now)
+
+        self.assertEqual(claim_due_profiles(self.now), [])
+        later = self.now + timedelta(seconds=301)
+        self.assertEqual(len(claim_due_profiles(later, lease_seconds=300)), 1)
+
+    def test_confirm_moves_reminder_to_next_day(self):
+        confirm_due_profiles(claim_due_profiles(self.now), self.now)
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.next_reminder_at, self.now + timedelta(days=1))
+        self.assertEqual(self.profile.last_reminder_date, self.now.astimezone(dt_timezone.utc).date())
+        self.assertIsNone(self.profile.reminder_claimed_at)
+
+    def test_confirm_keeps_reminder_time_changed_meanwhile(self):
+        claimed = claim_due_profiles(self.now)
+        changed = self.now + timedelta(hours=2)
+        UserProfile.objects.filter(pk=self.profile.pk).update(next_reminder_at=changed)
+
+        confirm_due_profiles(claimed, self.now)
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.next_reminder_at, changed)
+        self.assertIsNone(self.profile.reminder_claimed_at)
+
+
+@override_settings(TTS_PREWARM=False, REMINDER_GLOBAL_RATE=1000, REMINDER_PER_CHAT_INTERVAL=0.001)
+class SendDueRemindersTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        self.ok = make_due_profile('erin', 4001, self.now)
+        self.flaky = make_due_profile('frank', 4002, self.now)
+        self.blocked = make_due_profile('grace', 4003, self.now)
+        self.idle = make_due_profile('heidi', 4004, self.now, cards=0)
+
+    def make_bot(self, failing=(), blocked=()):
+        def send_message(method):
+            if method.chat_id in failing:
+                raise TelegramServerError(method=method, message='Internal Server Error')
+            if method.chat_id in blocked:
+                raise TelegramForbiddenError(method=method, message='bot was blocked by the user')
+            return session.make_message(method)
+
+        session = FakeTelegramSession(responses={'SendMessage': send_message})
+        return Bot('123456:TEST', session=session), session
+
+    async def reminder_state(self) -> dict:
+        return {
+            telegram_id: (next_at, claimed_at)
+            async for telegram_id, next_at, claimed_at in UserProfile.objects.values_list(
+                'telegram_id', 'next_reminder_at', 'reminder_claimed_at'
+            )
+        }
+
+    async def test_failed_send_is_retried_by_next_tick(self):
+        bot, session = self.make_bot(failing={4002}, blocked={4003})
+        await send_due_reminders(bot, self.now)
+
+        self.assertEqual(sorted(chat for chat, _ in session.sent_messages()), [4001, 4002, 4003])
+        tomorrow = self.now + timedelta(days=1)
+        self.assertEqual(await self.reminder_state(), {
+            4001: (tomorrow, None),
+            4002: (self.now, None),
+            4003: (tomorrow, None),
+            4004: (tomorrow, None),
+        })
+
+        bot, session = self.make_bot()
+        await send_due_reminders(bot, self.now + timedelta(minutes=1))
+
+        self.assertEqual([chat for chat, _ in session.sent_messages()], [4002])
+        self.assertEqual((await self.reminder_state())[4002], (tomorrow, None))
+
+    async def test_tick_without_due_users_sends_nothing(self):
+        bot, session = self.make_bot()
+        await send_due_reminders(bot, self.now - timedelta(minutes=1))
+
+        self.assertEqual(session.calls, [])
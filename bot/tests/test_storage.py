@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from bot.models import FSMRecord
+from bot.storage import DjangoStorage, cleanup_expired
+
+
+class DjangoStorageTests(TestCase):
+
+    def setUp(self):
+        self.storage = DjangoStorage(ttl=60)
+
+    def test_state_and_data_are_saved_independently(self):
+        self.storage._save('chat', state='Form:word')
+        self.storage._save('chat', data={'word': 'cat'})
+
+        record = self.storage._load('chat')
+        self.assertEqual((record.state, record.data), ('Form:word', {'word': 'cat'}))
+
+    def test_expired_record_is_not_revived(self):
+        FSMRecord.objects.create(
+            key='chat', state='Form:word', data={'old': 1}, expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.storage._save('chat', data={'word': 'cat'})
+
+        record = self.storage._load('chat')
+        self.assertEqual((record.state, record.data), (None, {'word': 'cat'}))
+
+    def test_empty_record_is_deleted(self):
+        self.storage._save('chat', state='Form:word', data={'word': 'cat'})
+        self.storage._save('chat', state=None)
+        self.storage._save('chat', data={})
+
+        self.assertFalse(FSMRecord.objects.filter(key='chat').exists())
+
+    def test_cleanup_expired(self):
+        past = timezone.now() - timedelta(seconds=1)
+        for number in range(3):
+            FSMRecord.objects.create(key=f'old{number}', state='x', expires_at=past)
+        self.storage._save('fresh', state='x')
+
+        self.assertEqual(cleanup_expired(batch_size=2), 3)
+        self.assertEqual(list(FSMRecord.objects.values_list('key', flat=True)), ['fresh'])
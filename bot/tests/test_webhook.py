@@ -0,0 +1,65 @@
+from aiogram import Bot
+from django.test import TransactionTestCase, override_settings
+from bot.bot import dp
+from bot.testing import FakeTelegramSession, make_message_update, post_update
+from bot.webhook import MAX_BODY_SIZE, WebhookApp
+from stats.models import UserProfile
+
+SECRET = 's3cret'
+
+
+# TransactionTestCase: обработчики бота ходят в БД из потоков linguatrack.async_db
+@override_settings(TTS_PREWARM=False)
+class WebhookAppTests(TransactionTestCase):
+
+    def setUp(self):
+        self.session = FakeTelegramSession()
+        self.app = WebhookApp(Bot('123456:TEST', session=self.session), dp, secret_token=SECRET)
+
+    async def test_valid_secret_dispatches_update(self):
+        status = await post_update(self.app, make_message_update('/start', user_id=3001), secret_token=SECRET)
+
+        self.assertEqual(status, 200)
+        self.assertEqual([chat for chat, _ in self.session.sent_messages()], [3001])
+        self.assertTrue(await UserProfile.objects.filter(telegram_id=3001).aexists())
+
+    async def test_missing_secret_is_forbidden(self):
+        status = await post_update(self.app, make_message_update('/start'))
+
+        self.assertEqual(status, 403)
+        self.assertEqual(self.session.calls, [])
+
+    async def test_wrong_secret_is_forbidden(self):
+        status = await post_update(self.app, make_message_update('/start'), secret_token='wrong')
+
+        self.assertEqual(status, 403)
+        self.assertEqual(self.session.calls, [])
+
+    async def test_empty_secret_rejects_everything(self):
+        app = WebhookApp(self.app.bot, dp, secret_token='')
+
+        self.assertEqual(await post_update(app, make_message_update('/start'), secret_token=''), 403)
+        self.assertEqual(self.session.calls, [])
+
+    async def test_oversized_body_is_rejected(self):
+        update = make_message_update('x' * (MAX_BODY_SIZE + 1))
+
+        self.assertEqual(await post_update(self.app, update, secret_token=SECRET), 413)
+        self.assertEqual(self.session.calls, [])
+
+    async def test_invalid_update_is_bad_request(self):
+        self.assertEqual(await post_update(self.app, {'message': 'nope'}, secret_token=SECRET), 400)
+
+    async def test_startup_fails_without_secret(self):
+        app = WebhookApp(self.app.bot, dp, secret_token='')
+        sent = []
+
+        async def receive():
+            return {'type': 'lifespan.startup'}
+
+        async def send(message):
+            sent.append(message)
+
+        await app({'type': 'lifespan'}, receive, send)
+
+        self.assertEqual([message['type'] for message in sent], ['lifespan.startup.failed'])
@@ -0,0 +1,84 @@
+"""
+Кэш соответствия Telegram ID -> пользователь Django для обработчиков бота.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import User
+
+
+class UserCache:
+    """
+    LRU-кэш с TTL в памяти процесса.
+
+    Хранит облегченный объект User (только pk и username) - его достаточно
+    для фильтров и внешних ключей в сервисах. Записи сбрасываются сигналами
+    при изменении профиля или пользователя; TTL ограничивает устаревание,
+    если профиль изменили в другом процессе.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # telegram_id -> (User, истекает)
+        self._telegram_ids = {}  # user_id -> telegram_id
+        self._lock = threading.Lock()
+
+    def get(self, telegram_id: int):
+        """
+        Возвращает пользователя из кэша.
+
+        Returns:
+            User | None: Облегченный пользователь или None, если записи нет или она истекла
+        """
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(telegram_id)
+                return None
+            self._entries.move_to_end(telegram_id)
+            return user
+
+    def set(self, telegram_id: int, user: User) -> User:
+        """
+        Кладет пользователя в кэш, вытесняя самые давние записи.
+
+        Returns:
+            User: Облегченная копия пользователя, сохраненная в кэше
+        """
+        handle = User(pk=user.pk, username=user.username)
+        with self._lock:
+            self._remove(telegram_id)
+            self._entries[telegram_id] = (handle, time.monotonic() + self.ttl)
+            self._telegram_ids[user.pk] = telegram_id
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return handle
+
+    def invalidate(self, telegram_id: int = None, user_id: int = None):
+        """Удаляет запись по Telegram ID и/или ID пользователя."""
+        with self._lock:
+            if user_id is not None:
+                self._remove(self._telegram_ids.get(user_id))
+            if telegram_id is not None:
+                self._remove(telegram_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._telegram_ids.clear()
+
+    def _remove(self, telegram_id):
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None:
+            self._telegram_ids.pop(entry[0].pk, None)
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'BOT_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'BOT_USER_CACHE_TTL', 300),
+)
@@ -0,0 +1,73 @@
+"""
+Отправка озвучки слов в Telegram с повторным использованием file_id.
+"""
+import logging
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from django.conf import settings
+from cards.tts import TTSService
+from cards.tts_cache import cache_key
+from linguatrack.async_db import db_async
+from .models import VoiceFile
+
+logger = logging.getLogger('bot')
+
+
+@db_async
+def get_file_id(word: str, language: str):
+    """Получить сохраненный file_id озвучки слова."""
+    return VoiceFile.objects.filter(key=cache_key(word, language)).values_list('file_id', flat=True).first()
+
+
+@db_async
+def save_file_id(word: str, language: str, file_id: str):
+    """Сохранить file_id озвучки слова."""
+    VoiceFile.objects.update_or_create(
+        key=cache_key(word, language),
+        defaults={'word': word[:200], 'language': language, 'file_id': file_id}
+    )
+
+
+@db_async
+def forget_file_id(word: str, language: str):
+    """Удалить file_id, который Telegram больше не принимает."""
+    VoiceFile.objects.filter(key=cache_key(word, language)).delete()
+
+
+async def send_word_voice(message: types.Message, word: str, language: str = None) -> bool:
+    """
+    Отправляет озвучку слова в ответ на сообщение.
+
+    Если файл уже загружался, отправляет его по file_id без загрузки;
+    иначе синтезирует mp3, загружает и запоминает полученный file_id.
+
+    Args:
+        message: Сообщение, на которое отвечаем
+        word: Слово для озвучки
+        language: Язык (по умолчанию из настроек)
+
+    Returns:
+        bool: Удалось ли отправить озвучку
+    """
+    language = language or getattr(settings, 'TTS_LANGUAGE', 'en')
+
+    file_id = await get_file_id(word, language)
+    if file_id:
+        try:
+            await message.answer_voice(voice=file_id)
+            return True
+        except TelegramBadRequest as e:
+            # file_id устарел или выдан другому боту - загружаем заново
+            logger.info(f"file_id озвучки '{word}' не принят: {e}")
+            await forget_file_id(word, language)
+
+    audio = await TTSService.agenerate_audio(word, language)
+    if not audio:
+        return False
+
+    sent = await message.answer_voice(voice=types.BufferedInputFile(audio, filename='voice.mp3'))
+    # mp3 Telegram может сохранить как голос, аудио или документ
+    media = sent.voice or sent.audio or sent.document
+    if media:
+        await save_file_id(word, language, media.file_id)
+    return True
@@ -0,0 +1,127 @@
+"""
+ASGI-приложение для приема обновлений Telegram через webhook.
+
+Запуск: python manage.py run_bot --webhook (несколько процессов uvicorn
+за одним адресом) или напрямую: uvicorn bot.webhook:app --workers 4
+"""
+import hmac
+import json
+import logging
+from aiogram.types import Update
+from django.conf import settings
+from bot.bot import bot, dp
+
+logger = logging.getLogger('bot')
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+# Telegram присылает обновления не больше нескольких сотен КБ
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class WebhookApp:
+    """
+    Минимальное ASGI-приложение webhook.
+
+    Принимает POST на путь webhook, проверяет секретный токен
+    из заголовка X-Telegram-Bot-Api-Secret-Token и передает обновление
+    в диспетчер aiogram. Без настроенного секрета приложение не стартует
+    и отклоняет все обновления. Каждый процесс-воркер держит свой
+    экземпляр бота и свою HTTP-сессию.
+    """
+
+    def __init__(self, bot, dispatcher, path: str = None, secret_token: str = None):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.path = path or getattr(settings, 'TELEGRAM_WEBHOOK_PATH', '/telegram/webhook')
+        if secret_token is None:
+            secret_token = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
+        self.secret_token = secret_token.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if scope['path'] != self.path:
+            await self._respond(send, 404)
+            return
+        if scope['method'] != 'POST':
+            await self._respond(send, 405)
+            return
+        if not self._check_secret(scope):
+            logger.warning("Webhook: неверный секретный токен")
+            await self._respond(send, 403)
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            await self._respond(send, 413)
+            return
+
+        try:
+            update = Update.model_validate(json.loads(body), context={'bot': self.bot})
+        except ValueError:
+            await self._respond(send, 400)
+            return
+
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+        except Exception as e:
+            # Telegram повторяет обновление при ошибочном ответе - не провоцируем повторы
+            logger.error(f"Ошибка обработки обновления {update.update_id}: {e}", exc_info=True)
+        await self._respond(send, 200)
+
+    def _check_secret(self, scope) -> bool:
+        if not self.secret_token:
+            # Без секрета любой, кто достучится до адреса, подделает обновления
+            return False
+        for name, value in scope.get('headers', []):
+            if name == SECRET_HEADER:
+                return hmac.compare_digest(value, self.secret_token)
+        return False
+
+    async def _read_body(self, receive):
+        """Читает тело запроса; None, если оно больше MAX_BODY_SIZE."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if not self.secret_token:
+                    await send({
+                        'type': 'lifespan.startup.failed',
+                        'message': 'Не задан TELEGRAM_WEBHOOK_SECRET',
+                    })
+                    return
+                await self.dispatcher.emit_startup(bot=self.bot)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.dispatcher.emit_shutdown(bot=self.bot)
+                await self.bot.session.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _respond(send, status: int):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain'), (b'content-length', b'0')],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+app = WebhookApp(bot, dp)
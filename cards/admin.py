@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Card
+from .models import Card, ImportJob, TTSAudio
 
 
 @admin.register(Card)
@@ -9,3 +9,19 @@ class CardAdmin(admin.ModelAdmin):
     search_fields = ['word', 'translation']
     readonly_fields = ['created_at', 'updated_at']
 
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'file_name', 'status', 'rows_imported', 'rows_failed', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'file_name']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(TTSAudio)
+class TTSAudioAdmin(admin.ModelAdmin):
+    list_display = ['text', 'language', 'engine', 'size', 'last_accessed_at']
+    list_filter = ['language', 'engine']
+    search_fields = ['text', 'key']
+    readonly_fields = ['key', 'size', 'created_at', 'last_accessed_at']
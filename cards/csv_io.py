@@ -0,0 +1,305 @@
+"""
+Потоковый импорт и экспорт карточек в CSV.
+"""
+import csv
+import logging
+import zlib
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from schedules.models import Schedule
+from stats.services import StatsService
+from .models import Card
+from .tts_prewarm import schedule_prewarm
+
+logger = logging.getLogger('cards')
+
+
+# Маппинг уровней (поддерживаем и русские, и английские названия)
+LEVEL_MAPPING = {
+    'начальный': 'beginner',
+    'средний': 'intermediate',
+    'продвинутый': 'advanced',
+    'beginner': 'beginner',
+    'intermediate': 'intermediate',
+    'advanced': 'advanced',
+}
+
+MAX_FIELD_LENGTH = 200
+
+
+class CardImporter:
+    """
+    Потоковый импорт карточек из CSV-файла.
+
+    Файл декодируется построчно, без чтения целиком в память. Карточки
+    и их расписания вставляются пачками через bulk_create, а счетчик слов
+    пользователя растет вместе с каждой сохраненной пачкой, поэтому
+    прерванный импорт не расходится со статистикой.
+    """
+
+    CHUNK_SIZE = 500
+    # Сколько ошибок храним с текстом; остальные только считаем
+    MAX_REPORTED_ERRORS = 1000
+
+    def __init__(self, user, chunk_size: int = None, progress_callback=None):
+        """
+        Args:
+            user: Пользователь Django, которому принадлежат карточки
+            chunk_size: Размер пачки для bulk_create
+            progress_callback: Функция, вызываемая с импортером после каждой пачки
+        """
+        self.user = user
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.progress_callback = progress_callback
+        self.imported = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self.errors = []  # [(номер строки, сообщение), ...]
+        self._pending = []  # [(номер строки, Card), ...]
+        self._bad_lines = set()  # номера строк файла не в UTF-8
+
+    @property
+    def processed(self) -> int:
+        """Количество обработанных строк (сохраненных и с ошибками)."""
+        return self.imported + self.failed
+
+    def run(self, file) -> 'CardImporter':
+        """
+        Импортирует карточки из файла.
+
+        Args:
+            file: Загруженный файл (UploadedFile или django.core.files.File)
+
+        Returns:
+            CardImporter: Этот же импортер с заполненными счетчиками
+        """
+        try:
+            for line_number, row in self._iter_rows(file):
+                try:
+                    card = self._build_card(row)
+                except ValueError as e:
+                    self._add_error(line_number, str(e))
+                    continue
+
+                self._pending.append((line_number, card))
+                if len(self._pending) >= self.chunk_size:
+                    self._flush()
+        finally:
+            # Уже разобранные строки сохраняем, даже если чтение файла прервалось
+            self._flush()
+            self._report_progress()
+        return self
+
+    def _iter_rows(self, file):
+        """
+        Итерирует строки CSV вместе с номером строки в файле.
+
+        Записи со строками не в UTF-8 и ошибки разбора CSV попадают
+        в ошибки импорта со своим номером строки и не прерывают импорт.
+        """
+        reader = csv.DictReader(self._iter_lines(file))
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                self._bad_lines.clear()
+                self._add_error(reader.line_num, f'Ошибка разбора CSV: {e}')
+                continue
+
+            if self._bad_lines:
+                # csv читает строки файла без упреждения: все они относятся к этой записи
+                line_number = min(self._bad_lines)
+                self._bad_lines.clear()
+                self._add_error(line_number, 'Строка содержит символы не в кодировке UTF-8')
+                continue
+
+            yield reader.line_num, row
+
+    def _iter_lines(self, file):
+        """
+        Итерирует строки файла, считая прочитанный объем.
+
+        Каждая строка декодируется отдельно (UTF-8 не переносит символы
+        через перевод строки), BOM в начале файла (Excel) отбрасывается.
+        Номера строк с ошибкой декодирования запоминаются в _bad_lines.
+        """
+        encoding = 'utf-8-sig'
+        for line_number, line in enumerate(file, start=1):
+            self.bytes_read += len(line)
+            try:
+                text = line.decode(encoding)
+            except UnicodeDecodeError:
+                self._bad_lines.add(line_number)
+                text = line.decode(encoding, errors='replace')
+            encoding = 'utf-8'
+            yield text
+
+    def _build_card(self, row: dict) -> Card:
+        """Создает несохраненную карточку из строки CSV."""
+        word = (row.get('Слово') or '').strip()
+        translation = (row.get('Перевод') or '').strip()
+
+        if not word:
+            raise ValueError('Слово не может быть пустым')
+        if not translation:
+            raise ValueError('Перевод не может быть пустым')
+        if len(word) > MAX_FIELD_LENGTH:
+            raise ValueError(f'Слово не может быть длиннее {MAX_FIELD_LENGTH} символов')
+        if len(translation) > MAX_FIELD_LENGTH:
+            raise ValueError(f'Перевод не может быть длиннее {MAX_FIELD_LENGTH} символов')
+
+        level_str = (row.get('Уровень') or 'beginner').strip().lower()
+
+        return Card(
+            user=self.user,
+            word=word,
+            translation=translation,
+            example=(row.get('Пример') or '').strip(),
+            note=(row.get('Заметка') or '').strip(),
+            level=LEVEL_MAPPING.get(level_str, 'beginner'),
+        )
+
+    def _flush(self):
+        """Сохраняет накопленную пачку карточек вместе с расписаниями."""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        try:
+            with transaction.atomic():
+                cards = Card.objects.bulk_create([card for _, card in pending])
+                # bulk_create не вызывает post_save, поэтому расписания и прогрев озвучки делаем сами
+                now = timezone.now()
+                Schedule.objects.bulk_create([
+                    Schedule(card=card, next_review_at=now) for card in cards
+                ])
+                schedule_prewarm([card.word for card in cards])
+        except DatabaseError:
+            logger.warning("Пачка импорта не сохранилась, повторяем построчно", exc_info=True)
+            self._flush_row_by_row(pending)
+        else:
+            self._count_imported(len(cards))
+
+        self._report_progress()
+
+    def _flush_row_by_row(self, pending: list):
+        """Сохраняет карточки по одной, чтобы найти строки с ошибками."""
+        saved = 0
+        for line_number, card in pending:
+            card.pk = None
+            card._state.adding = True
+            try:
+                with transaction.atomic():
+                    # save() вызывает сигнал post_save, который создает расписание
+                    card.save()
+                saved += 1
+            except DatabaseError as e:
+                self._add_error(line_number, str(e))
+        self._count_imported(saved)
+
+    def _report_progress(self):
+        if self.progress_callback:
+            self.progress_callback(self)
+
+    def _add_error(self, line_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def _count_imported(self, count: int):
+        """Учитывает сохраненную пачку в счетчиках импорта и статистике пользователя."""
+        if not count:
+            return
+        self.imported += count
+        StatsService.adjust_total_words(self.user, count)
+        # bulk_create не вызывает сигналы, сбрасываем кэш статистики сами
+        StatsService.invalidate_cache(self.user.pk)
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку вместо хранения."""
+
+    def write(self, value):
+        return value
+
+
+class CardExporter:
+    """
+    Потоковый экспорт карточек в CSV.
+
+    Карточки читаются через iterator() пачками и только нужными колонками,
+    поэтому потребление памяти не зависит от размера колоды. Результат
+    можно сжимать в gzip на лету.
+    """
+
+    CHUNK_SIZE = 2000
+    HEADER = ['Слово', 'Перевод', 'Пример', 'Заметка', 'Уровень', 'Создано']
+    FIELDS = ['word', 'translation', 'example', 'note', 'level', 'created_at']
+
+    def __init__(self, user, chunk_size: int = None):
+        self.user = user
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def get_queryset(self):
+        """Проекция карточек пользователя в порядке первичного ключа."""
+        return Card.objects.filter(user=self.user).order_by('pk').values_list(*self.FIELDS)
+
+    def iter_rows(self):
+        """
+        Итерирует строки CSV (уже закодированные в текст).
+
+        Yields:
+            str: Строка CSV вместе с переводом строки
+        """
+        writer = csv.writer(_Echo())
+        level_display = dict(Card.LEVEL_CHOICES)
+
+        yield writer.writerow(self.HEADER)
+        queryset = self.get_queryset().iterator(chunk_size=self.chunk_size)
+        for word, translation, example, note, level, created_at in queryset:
+            yield writer.writerow([
+                word,
+                translation,
+                example or '',
+                note or '',
+                level_display.get(level, level),
+                created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            ])
+
+    def iter_bytes(self, compress: bool = False):
+        """
+        Итерирует содержимое CSV в байтах, опционально сжатое gzip.
+
+        Строки группируются в блоки, чтобы не отдавать клиенту
+        по одной маленькой записи.
+
+        Args:
+            compress: Сжимать ли поток в формат gzip
+
+        Yields:
+            bytes: Очередной блок данных
+        """
+        # wbits=31 - формат gzip (заголовок и контрольная сумма)
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        buffer = []
+        size = 0
+
+        for line in self.iter_rows():
+            data = line.encode('utf-8')
+            buffer.append(data)
+            size += len(data)
+            if size >= 64 * 1024:
+                block = b''.join(buffer)
+                buffer, size = [], 0
+                if compressor:
+                    block = compressor.compress(block)
+                if block:
+                    yield block
+
+        block = b''.join(buffer)
+        if compressor:
+            block = compressor.compress(block) + compressor.flush()
+        if block:
+            yield block
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Путь к файлу')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='Имя файла')),
+                ('file_size', models.BigIntegerField(default=0, verbose_name='Размер файла (байт)')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершен'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('bytes_processed', models.BigIntegerField(default=0, verbose_name='Обработано байт')),
+                ('rows_processed', models.IntegerField(default=0, verbose_name='Обработано строк')),
+                ('rows_imported', models.IntegerField(default=0, verbose_name='Импортировано')),
+                ('rows_failed', models.IntegerField(default=0, verbose_name='Ошибок')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Ошибки в строках')),
+                ('error_message', models.TextField(blank=True, verbose_name='Ошибка импорта')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Задача импорта',
+                'verbose_name_plural': 'Задачи импорта',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='cards_impor_user_id_b7a9c7_idx')],
+            },
+        ),
+    ]
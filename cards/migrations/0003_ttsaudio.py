@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TTSAudio',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('text', models.CharField(max_length=200, verbose_name='Текст')),
+                ('language', models.CharField(max_length=10, verbose_name='Язык')),
+                ('engine', models.CharField(max_length=20, verbose_name='Движок')),
+                ('size', models.PositiveIntegerField(verbose_name='Размер (байт)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('last_accessed_at', models.DateTimeField(db_index=True, verbose_name='Последнее обращение')),
+            ],
+            options={
+                'verbose_name': 'Аудио озвучки',
+                'verbose_name_plural': 'Аудио озвучки',
+            },
+        ),
+    ]
@@ -36,3 +36,106 @@ class Card(models.Model):
     def __str__(self):
         return f"{self.word} - {self.translation}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Слово из БД: прогрев озвучки при сохранении нужен, только если оно изменилось
+        instance._loaded_word = dict(zip(field_names, values)).get('word')
+        return instance
+
+
+
+class ImportJob(models.Model):
+    """
+    Фоновая задача импорта карточек из CSV.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершен'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    file_path = models.CharField(max_length=500, verbose_name='Путь к файлу')
+    file_name = models.CharField(max_length=255, blank=True, verbose_name='Имя файла')
+    file_size = models.BigIntegerField(default=0, verbose_name='Размер файла (байт)')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус'
+    )
+    bytes_processed = models.BigIntegerField(default=0, verbose_name='Обработано байт')
+    rows_processed = models.IntegerField(default=0, verbose_name='Обработано строк')
+    rows_imported = models.IntegerField(default=0, verbose_name='Импортировано')
+    rows_failed = models.IntegerField(default=0, verbose_name='Ошибок')
+    errors = models.JSONField(default=list, blank=True, verbose_name='Ошибки в строках')
+    error_message = models.TextField(blank=True, verbose_name='Ошибка импорта')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начато')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+
+    class Meta:
+        verbose_name = 'Задача импорта'
+        verbose_name_plural = 'Задачи импорта'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.get_status_display()}) for {self.user.username}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def progress(self):
+        """Процент выполнения по объему прочитанного файла."""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.file_size:
+            return 0
+        return min(100, round(self.bytes_processed / self.file_size * 100, 1))
+
+    @property
+    def eta_seconds(self):
+        """Оценка оставшегося времени в секундах (None, если оценить нельзя)."""
+        if self.status != self.STATUS_RUNNING or not self.started_at or not self.bytes_processed:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        rate = self.bytes_processed / elapsed if elapsed > 0 else 0
+        if rate <= 0:
+            return None
+        return round(max(0, self.file_size - self.bytes_processed) / rate)
+
+
+class TTSAudio(models.Model):
+    """
+    Индекс кэша озвучки: одна запись на аудиофайл.
+
+    Ключ - sha256 от нормализованного текста, языка и движка синтеза,
+    поэтому разные слова не делят один файл. Размер и время последнего
+    обращения нужны для вытеснения по LRU при превышении бюджета кэша.
+    """
+    key = models.CharField(max_length=64, primary_key=True, verbose_name='Ключ')
+    text = models.CharField(max_length=200, verbose_name='Текст')
+    language = models.CharField(max_length=10, verbose_name='Язык')
+    engine = models.CharField(max_length=20, verbose_name='Движок')
+    size = models.PositiveIntegerField(verbose_name='Размер (байт)')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    last_accessed_at = models.DateTimeField(db_index=True, verbose_name='Последнее обращение')
+
+    class Meta:
+        verbose_name = 'Аудио озвучки'
+        verbose_name_plural = 'Аудио озвучки'
+
+    def __str__(self):
+        return f"{self.text} ({self.language}, {self.engine})"
@@ -0,0 +1,119 @@
+"""
+Сессия повторения карточек для веб-теста.
+"""
+from datetime import datetime
+from django.utils import timezone
+from schedules.services import SM2Service
+from .models import Card
+
+
+class ReviewSession:
+    """
+    Очередь карточек на повторение, хранящаяся в сессии Django.
+
+    Список ID карточек к повторению вычисляется один раз при старте теста,
+    после чего каждый ответ просто снимает карточку с очереди. Карточки,
+    ставшие доступными позже, периодически дочитываются дешевым запросом
+    только по ID.
+    """
+
+    SESSION_KEY = 'review_session'
+    # Как часто (в секундах) проверять карточки, ставшие доступными после старта
+    REFRESH_INTERVAL = 60
+    # Ограничение времени на один ответ при подсчете времени занятий (секунды)
+    MAX_ANSWER_SECONDS = 300
+
+    def __init__(self, request):
+        self.session = request.session
+        self.user = request.user
+        self._data = self.session.get(self.SESSION_KEY)
+
+    @property
+    def active(self) -> bool:
+        return self._data is not None
+
+    def __len__(self):
+        return len(self._data['queue']) if self._data else 0
+
+    def start(self):
+        """Начинает новую сессию с текущим списком карточек к повторению."""
+        card_ids = SM2Service.get_due_card_ids(self.user)
+        # Очередь хранится в обратном порядке: следующая карточка в конце списка
+        self._data = {
+            'queue': card_ids[::-1],
+            'refreshed_at': timezone.now().isoformat(),
+        }
+        self._save()
+
+    def refresh(self, force: bool = False):
+        """Добавляет в конец очереди карточки, ставшие доступными после последней проверки."""
+        if not self._data:
+            return
+        refreshed_at = datetime.fromisoformat(self._data['refreshed_at'])
+        now = timezone.now()
+        if not force and (now - refreshed_at).total_seconds() < self.REFRESH_INTERVAL:
+            return
+
+        queued = set(self._data['queue'])
+        new_ids = [
+            card_id for card_id in SM2Service.get_due_card_ids(self.user, since=refreshed_at)
+            if card_id not in queued
+        ]
+        if new_ids:
+            self._data['queue'] = new_ids[::-1] + self._data['queue']
+        self._data['refreshed_at'] = now.isoformat()
+        self._save()
+
+    def next_card(self):
+        """
+        Возвращает следующую карточку очереди.
+
+        Карточки, удаленные или уже повторенные в другом месте (например, в боте),
+        пропускаются.
+
+        Returns:
+            Card или None, если очередь пуста
+        """
+        now = timezone.now()
+        while self._data and self._data['queue']:
+            card_id = self._data['queue'][-1]
+            card = Card.objects.filter(pk=card_id, user=self.user).select_related('schedule').first()
+            schedule = getattr(card, 'schedule', None) if card else None
+            if schedule and schedule.next_review_at <= now:
+                if self._data.get('current') != card_id:
+                    self._data['current'] = card_id
+                    self._data['shown_at'] = now.isoformat()
+                    self._save()
+                return card
+            self.pop(card_id)
+        return None
+
+    def elapsed_seconds(self, card_id: int) -> int:
+        """Сколько секунд прошло с показа карточки (0, если карточка не из сессии)."""
+        if not self._data or self._data.get('current') != card_id:
+            return 0
+        shown_at = datetime.fromisoformat(self._data['shown_at'])
+        elapsed = (timezone.now() - shown_at).total_seconds()
+        return int(min(max(elapsed, 0), self.MAX_ANSWER_SECONDS))
+
+    def pop(self, card_id: int):
+        """Убирает карточку из очереди после ответа."""
+        if not self._data:
+            return
+        queue = self._data['queue']
+        if queue and queue[-1] == card_id:
+            queue.pop()
+        elif card_id in queue:
+            queue.remove(card_id)
+        else:
+            return
+        self._save()
+
+    def finish(self):
+        """Завершает сессию."""
+        self._data = None
+        self.session.pop(self.SESSION_KEY, None)
+
+    def _save(self):
+        self.session[self.SESSION_KEY] = self._data
+        self.session.modified = True
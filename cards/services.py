@@ -1,11 +1,18 @@
 """
 Сервисы для работы с карточками.
 """
-from django.db import transaction
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.db import close_old_connections, transaction
 from django.contrib.auth.models import User
-from .models import Card
+from linguatrack.async_db import run_in_db
+from .models import Card, ImportJob
 from schedules.services import SM2Service
-from stats.models import Stats
+from stats.services import StatsService
 
 
 class CardService:
@@ -42,12 +49,16 @@ class CardService:
         # SM2Service.initialize_schedule(card)  # Убрано, т.к. есть сигнал
         
         # Обновляем статистику
-        stats, _ = Stats.objects.get_or_create(user=user)
-        stats.total_words += 1
-        stats.save()
+        StatsService.adjust_total_words(user, 1)
         
         return card
     
+    @staticmethod
+    async def acreate_card(user: User, word: str, translation: str, example: str = None,
+                           note: str = None, level: str = 'beginner') -> Card:
+        """Асинхронный вариант create_card (пул потоков БД)."""
+        return await run_in_db(CardService.create_card, user, word, translation, example, note, level)
+    
     @staticmethod
     def get_user_cards(user: User, level: str = None):
         """
@@ -78,7 +89,86 @@ class CardService:
         card.delete()
         
         # Обновляем статистику
-        stats, _ = Stats.objects.get_or_create(user=user)
-        stats.total_words = max(0, stats.total_words - 1)
-        stats.save()
+        StatsService.adjust_total_words(user, -1)
+
+
+
+_import_pool = None
+_import_pool_lock = threading.Lock()
+
+
+def get_import_pool() -> ThreadPoolExecutor:
+    """Возвращает пул потоков импорта без Celery (создается при первом обращении)."""
+    global _import_pool
+    with _import_pool_lock:
+        if _import_pool is None:
+            _import_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORT_WORKERS', 1),
+                thread_name_prefix='card-import',
+            )
+        return _import_pool
+
 
+def _import_in_thread(job_id: int):
+    from .tasks import process_import_job
+
+    # Поток пула живет дольше запроса: закрываем устаревшие соединения сами
+    close_old_connections()
+    try:
+        return process_import_job(job_id)
+    finally:
+        close_old_connections()
+
+
+class ImportJobService:
+    """Сервис для фонового импорта карточек."""
+    
+    @staticmethod
+    def create_job(user: User, uploaded_file) -> ImportJob:
+        """
+        Сохраняет загруженный файл на диск и ставит импорт в фон.
+        
+        Args:
+            user: Пользователь Django
+            uploaded_file: Загруженный CSV-файл
+        
+        Returns:
+            ImportJob: Созданная задача импорта
+        """
+        spool_dir = Path(getattr(settings, 'IMPORT_SPOOL_DIR', Path(settings.BASE_DIR) / 'spool' / 'imports'))
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        
+        fd, file_path = tempfile.mkstemp(suffix='.csv', dir=spool_dir)
+        size = 0
+        with os.fdopen(fd, 'wb') as fh:
+            for chunk in uploaded_file.chunks():
+                fh.write(chunk)
+                size += len(chunk)
+        
+        job = ImportJob.objects.create(
+            user=user,
+            file_path=file_path,
+            file_name=uploaded_file.name[:255],
+            file_size=size
+        )
+        transaction.on_commit(lambda: ImportJobService.dispatch(job.pk))
+        return job
+    
+    @staticmethod
+    def dispatch(job_id: int):
+        """
+        Запускает импорт в фоне, не задерживая ответ на загрузку файла.
+        
+        С Celery (USE_CELERY=True) импорт выполняет задача
+        cards.tasks.process_import_job в воркере; иначе - пул из IMPORT_WORKERS
+        потоков текущего процесса. Задача, не завершенная до перезапуска
+        процесса, в этом случае остается в статусе "в очереди".
+        
+        Args:
+            job_id: ID задачи импорта
+        """
+        if getattr(settings, 'USE_CELERY', False):
+            from .tasks import process_import_job
+            process_import_job.delay(job_id)
+        else:
+            get_import_pool().submit(_import_in_thread, job_id)
@@ -1,10 +1,12 @@
 """
-Сигналы Django для автоматического создания расписания при создании карточки.
+Сигналы Django для автоматического создания расписания при создании карточки
+и фоновой озвучки ее слова.
 """
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Card
 from schedules.services import SM2Service
+from .tts_prewarm import schedule_prewarm
 
 
 @receiver(post_save, sender=Card)
@@ -15,3 +17,15 @@ def create_schedule_for_card(sender, instance, created, **kwargs):
     if created:
         SM2Service.initialize_schedule(instance)
 
+
+@receiver(post_save, sender=Card)
+def prewarm_card_audio(sender, instance, created, **kwargs):
+    """
+    Заранее озвучивает слово новой карточки или карточки с измененным словом.
+
+    Правка перевода, заметки или уровня прогрев не запускает; слова,
+    которые уже есть в кэше, пропускаются при прогреве.
+    """
+    if created or instance.word != getattr(instance, '_loaded_word', None):
+        schedule_prewarm([instance.word])
+        instance._loaded_word = instance.word
@@ -0,0 +1,86 @@
+"""
+Celery задачи для карточек.
+"""
+import logging
+import os
+from celery import shared_task
+from django.core.files import File
+from django.utils import timezone
+from .csv_io import CardImporter
+from .models import ImportJob
+
+logger = logging.getLogger('cards')
+
+# Сколько ошибок в строках сохраняем в задаче импорта
+MAX_JOB_ERRORS = 100
+
+
+@shared_task
+def process_import_job(job_id: int):
+    """
+    Выполняет фоновый импорт карточек из сохраненного на диск CSV.
+    """
+    job = ImportJob.objects.select_related('user').get(pk=job_id)
+    if job.is_finished:
+        return f"Import job {job_id} already finished"
+
+    ImportJob.objects.filter(pk=job_id).update(
+        status=ImportJob.STATUS_RUNNING,
+        started_at=timezone.now()
+    )
+
+    def report_progress(importer):
+        ImportJob.objects.filter(pk=job_id).update(
+            bytes_processed=importer.bytes_read,
+            rows_processed=importer.processed,
+            rows_imported=importer.imported,
+            rows_failed=importer.failed,
+        )
+
+    try:
+        with open(job.file_path, 'rb') as fh:
+            importer = CardImporter(job.user, progress_callback=report_progress).run(File(fh))
+
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_DONE,
+            bytes_processed=job.file_size,
+            errors=[list(error) for error in importer.errors[:MAX_JOB_ERRORS]],
+            finished_at=timezone.now()
+        )
+        return f"Imported {importer.imported} cards, {importer.failed} errors"
+    except Exception as e:
+        logger.error(f"Ошибка фонового импорта #{job_id}: {e}", exc_info=True)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_FAILED,
+            error_message=str(e),
+            finished_at=timezone.now()
+        )
+        return f"Import job {job_id} failed: {e}"
+    finally:
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+
+
+@shared_task
+def compact_tts_cache():
+    """
+    Уплотняет кэш озвучки (для TTS_CACHE_BACKEND=pack).
+    """
+    from .tts_cache import get_tts_cache
+
+    return get_tts_cache().compact()
+
+
+@shared_task
+def prewarm_tts(items: list):
+    """
+    Заранее озвучивает пачку слов новых карточек.
+
+    Args:
+        items: Пары [слово, язык]
+    """
+    from .tts_prewarm import prewarm_words
+
+    return prewarm_words([tuple(item) for item in items])
@@ -0,0 +1,85 @@
+import io
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from cards.csv_io import CardImporter
+from cards.models import Card
+from schedules.models import Schedule
+from stats.models import Stats
+
+
+def make_file(*rows: bytes) -> File:
+    # BOM в начале, как у файлов из Excel
+    return File(io.BytesIO('Слово,Перевод\n'.encode('utf-8-sig') + b''.join(rows)))
+
+
+def rows(count: int) -> list:
+    return [f'word{i},слово{i}\n'.encode() for i in range(count)]
+
+
+class BrokenFile:
+    """Файл, чтение которого обрывается после заданных строк."""
+
+    def __init__(self, lines: list):
+        self.lines = lines
+
+    def __iter__(self):
+        yield from self.lines
+        raise OSError('disk error')
+
+
+@override_settings(TTS_PREWARM=False)
+class CardImporterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+
+    def total_words(self) -> int:
+        return Stats.objects.get(user=self.user).total_words
+
+    def test_rows_are_saved_in_chunks(self):
+        progress = []
+        importer = CardImporter(self.user, chunk_size=2, progress_callback=lambda i: progress.append(i.imported))
+
+        importer.run(make_file(*rows(5)))
+
+        self.assertEqual((importer.imported, importer.failed), (5, 0))
+        self.assertEqual(Card.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(Schedule.objects.filter(card__user=self.user).count(), 5)
+        self.assertEqual(progress, [2, 4, 5, 5])
+        self.assertEqual(self.total_words(), 5)
+
+    def test_failed_chunk_is_saved_row_by_row(self):
+        importer = CardImporter(self.user, chunk_size=10)
+
+        with mock.patch.object(Card.objects, 'bulk_create', side_effect=DatabaseError('locked')), \
+                self.assertLogs('cards', level='WARNING'):
+            importer.run(make_file(*rows(3)))
+
+        self.assertEqual(importer.imported, 3)
+        self.assertEqual(Schedule.objects.filter(card__user=self.user).count(), 3)
+        self.assertEqual(self.total_words(), 3)
+
+    def test_invalid_row_is_reported_with_line_number(self):
+        importer = CardImporter(self.user)
+
+        importer.run(make_file('cat,кот\n'.encode(), b'dog,\xff\xfe\n', b'fox,\n', 'owl,сова\n'.encode()))
+
+        self.assertEqual((importer.imported, importer.failed), (2, 2))
+        self.assertEqual([line for line, _ in importer.errors], [3, 4])
+        self.assertIn('UTF-8', importer.errors[0][1])
+        self.assertEqual(set(Card.objects.values_list('word', flat=True)), {'cat', 'owl'})
+        self.assertEqual(self.total_words(), 2)
+
+    def test_interrupted_import_keeps_stats_in_sync(self):
+        importer = CardImporter(self.user, chunk_size=2)
+        lines = make_file(*rows(3)).file.getvalue().splitlines(keepends=True)
+
+        with self.assertRaises(OSError):
+            importer.run(BrokenFile(lines))
+
+        self.assertEqual(importer.imported, 3)
+        self.assertEqual(Card.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.total_words(), 3)
@@ -0,0 +1,41 @@
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from cards.models import ImportJob
+from cards.services import ImportJobService, _import_in_thread
+
+
+class ImportJobDispatchTests(TestCase):
+
+    def setUp(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.settings_override = override_settings(IMPORT_SPOOL_DIR=spool.name, TTS_PREWARM=False)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user('alice')
+        self.upload = SimpleUploadedFile('cards.csv', 'Слово,Перевод\ncat,кот\n'.encode())
+
+    @override_settings(USE_CELERY=False)
+    def test_without_celery_import_runs_in_pool_after_commit(self):
+        with mock.patch('cards.services.get_import_pool') as get_pool, \
+                mock.patch('cards.tasks.process_import_job.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                job = ImportJobService.create_job(self.user, self.upload)
+                get_pool.assert_not_called()
+
+        get_pool.return_value.submit.assert_called_once_with(_import_in_thread, job.pk)
+        delay.assert_not_called()
+        self.assertEqual(ImportJob.objects.get(pk=job.pk).status, ImportJob.STATUS_PENDING)
+
+    @override_settings(USE_CELERY=True)
+    def test_with_celery_import_is_queued(self):
+        with mock.patch('cards.services.get_import_pool') as get_pool, \
+                mock.patch('cards.tasks.process_import_job.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                job = ImportJobService.create_job(self.user, self.upload)
+
+        delay.assert_called_once_with(job.pk)
+        get_pool.assert_not_called()
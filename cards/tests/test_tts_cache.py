@@ -0,0 +1,116 @@
+import tempfile
+import time
+from unittest import mock
+from django.test import TestCase
+from cards.models import TTSAudio
+from cards.tts_cache import PackTTSCache, cache_key
+
+
+class PackTTSCacheTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache = PackTTSCache(self.directory, max_bytes=1024 * 1024)
+
+    def other_instance(self, **kwargs) -> PackTTSCache:
+        """Экземпляр на том же каталоге, как в другом процессе."""
+        return PackTTSCache(self.directory, **{'max_bytes': self.cache.max_bytes, **kwargs})
+
+    def test_put_and_read(self):
+        self.cache.put('Hello', 'en', b'hello-mp3')
+
+        self.assertEqual(self.cache.read('hello', 'en'), b'hello-mp3')
+        self.assertIsNone(self.cache.read('hello', 'de'))
+        self.assertTrue(TTSAudio.objects.filter(key=cache_key('hello', 'en'), size=9).exists())
+
+    def test_second_instance_sees_appended_entries(self):
+        other = self.other_instance()
+        self.cache.put('hello', 'en', b'hello-mp3')
+
+        self.assertEqual(other.read('hello', 'en'), b'hello-mp3')
+
+    def test_evict_removes_oldest_entries_for_all_instances(self):
+        self.cache.max_bytes = 25
+        other = self.other_instance()
+        self.cache.put('a', 'en', b'a' * 10)
+        self.cache.put('b', 'en', b'b' * 10)
+        self.assertEqual(other.read('a', 'en'), b'a' * 10)
+
+        self.cache.put('c', 'en', b'c' * 10)
+
+        self.assertIsNone(self.cache.read('a', 'en'))
+        self.assertFalse(TTSAudio.objects.filter(key=cache_key('a', 'en')).exists())
+        other._refresh(force=True)
+        self.assertIsNone(other.read('a', 'en'))
+        self.assertEqual(other.read('c', 'en'), b'c' * 10)
+
+    def test_size_is_recounted_only_over_budget_or_when_stale(self):
+        self.cache.max_bytes = 25
+
+        with mock.patch.object(self.cache, 'evict', wraps=self.cache.evict) as evict:
+            self.cache.put('a', 'en', b'a' * 10)
+            self.cache.put('b', 'en', b'b' * 10)
+            self.assertEqual(evict.call_count, 1)
+
+            self.cache.put('c', 'en', b'c' * 10)
+            self.assertEqual(evict.call_count, 2)
+            self.assertIsNone(self.cache.read('a', 'en'))
+
+            self.cache._total_counted_at -= self.cache.TOTAL_REFRESH_INTERVAL
+            self.cache.put('d', 'en', b'd')
+            self.assertEqual(evict.call_count, 3)
+
+    def test_stale_read_does_not_reindex_evicted_entry(self):
+        other = self.other_instance()
+        self.cache.put('a', 'en', b'a' * 10)
+        other._refresh(force=True)
+
+        self.cache._remove_data([cache_key('a', 'en')])
+        TTSAudio.objects.all().delete()
+        # Индекс other еще не перечитан: данные отдаются, но строка TTSAudio не возвращается
+        other.read('a', 'en')
+
+        self.assertFalse(TTSAudio.objects.exists())
+
+    def test_compact_keeps_live_entries(self):
+        self.cache.put('a', 'en', b'a' * 10)
+        self.cache.put('b', 'en', b'b' * 10)
+        self.cache.put('a', 'en', b'A' * 10)
+        self.cache.evict()
+        self.cache._remove_data([cache_key('b', 'en')])
+        TTSAudio.objects.filter(key=cache_key('b', 'en')).delete()
+
+        self.assertEqual(self.cache.compact(), 20)
+
+        self.assertEqual(self.cache.read('a', 'en'), b'A' * 10)
+        self.assertIsNone(self.cache.read('b', 'en'))
+        self.assertFalse(self.cache._pack_path(0).exists())
+        self.assertEqual(self.cache._pack_path(1).stat().st_size, 10)
+
+    def test_reader_survives_compaction_by_other_instance(self):
+        reader = self.other_instance()
+        self.cache.put('a', 'en', b'a' * 10)
+        self.cache.put('b', 'en', b'b' * 10)
+        # reader знает смещения, но pack-файл еще не отображал
+        reader._refresh(force=True)
+        reader._checked_at = time.monotonic()
+
+        self.cache.compact()
+
+        self.assertEqual(reader.read('b', 'en'), b'b' * 10)
+        self.assertEqual(reader._generation, 1)
+
+    def test_evict_schedules_compaction_instead_of_running_it(self):
+        self.cache.COMPACT_MIN_BYTES = 0
+        self.cache.put('a', 'en', b'a' * 10)
+        self.cache.put('b', 'en', b'b' * 10)
+        self.cache._remove_data([cache_key('a', 'en'), cache_key('b', 'en')])
+        TTSAudio.objects.all().delete()
+
+        with mock.patch.object(self.cache, 'schedule_compaction') as schedule:
+            self.cache.evict()
+
+        schedule.assert_called_once_with()
+        self.assertEqual(self.cache._generation, 0)
@@ -0,0 +1,111 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from cards.tts_guard import CircuitBreaker, CircuitOpenError, remember_failure
+
+
+class ServiceError(Exception):
+    pass
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        patcher = mock.patch('cards.tts_guard.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, failure_exceptions=(ServiceError,))
+
+    def fail(self):
+        raise ServiceError()
+
+    def trip(self):
+        for _ in range(self.breaker.failure_threshold):
+            with self.assertRaises(ServiceError):
+                self.breaker.call(self.fail)
+
+    def test_opens_after_threshold_failures(self):
+        with self.assertRaises(ServiceError):
+            self.breaker.call(self.fail)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        with self.assertRaises(ServiceError):
+            self.breaker.call(self.fail)
+        self.assertEqual(self.breaker.snapshot(), {'state': CircuitBreaker.OPEN, 'failures': 2, 'retry_in': 30.0})
+
+    def test_open_breaker_rejects_without_calling(self):
+        self.trip()
+        func = mock.Mock()
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(func)
+        func.assert_not_called()
+
+    def test_successful_probe_closes(self):
+        self.trip()
+        self.now += 30
+
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.breaker.snapshot(), {'state': CircuitBreaker.CLOSED, 'failures': 0, 'retry_in': None})
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.now += 30
+
+        with self.assertRaises(ServiceError):
+            self.breaker.call(self.fail)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: 'ok')
+
+    def test_only_one_probe_at_a_time(self):
+        self.trip()
+        self.now += 30
+
+        def probe():
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.call(lambda: 'second')
+            return 'first'
+
+        self.assertEqual(self.breaker.call(probe), 'first')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_other_exceptions_do_not_count(self):
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.breaker.call(int, 'x')
+        self.assertEqual(self.breaker.snapshot()['failures'], 0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+@override_settings(TTS_NEGATIVE_TTL=120, TTS_BREAKER_RESET_TIMEOUT=30)
+class SayWordRetryAfterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('alice'))
+
+    def test_negative_cache_hit_uses_negative_ttl(self):
+        remember_failure('qwxz', 'en')
+
+        response = self.client.get(reverse('cards:say_word', args=['qwxz']))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '120')
+
+    def test_open_breaker_uses_time_until_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.state = CircuitBreaker.OPEN
+        breaker.opened_at = 1000.0
+
+        with mock.patch('cards.tts.get_circuit_breaker', return_value=breaker), \
+                mock.patch('cards.tts_guard.time.monotonic', return_value=1020.5), \
+                mock.patch('cards.tts.gTTS'):
+            response = self.client.get(reverse('cards:say_word', args=['qwxz']))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '10')
@@ -0,0 +1,63 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from cards.models import Card
+from cards.tts_prewarm import PrewarmBuffer
+
+
+class PrewarmSignalTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        patcher = mock.patch('cards.signals.schedule_prewarm')
+        self.schedule_prewarm = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_new_card_is_prewarmed(self):
+        Card.objects.create(user=self.user, word='cat', translation='кот')
+
+        self.schedule_prewarm.assert_called_once_with(['cat'])
+
+    def test_edit_without_new_word_is_not_prewarmed(self):
+        card = Card.objects.create(user=self.user, word='cat', translation='кот')
+        self.schedule_prewarm.reset_mock()
+
+        card = Card.objects.get(pk=card.pk)
+        card.translation = 'кошка'
+        card.save()
+
+        self.schedule_prewarm.assert_not_called()
+
+    def test_changed_word_is_prewarmed_once(self):
+        card = Card.objects.get(pk=Card.objects.create(user=self.user, word='cat', translation='кот').pk)
+        self.schedule_prewarm.reset_mock()
+
+        card.word = 'kitten'
+        card.save()
+        card.save()
+
+        self.schedule_prewarm.assert_called_once_with(['kitten'])
+
+
+class PrewarmBufferExitTests(SimpleTestCase):
+
+    @override_settings(USE_CELERY=False)
+    def test_exit_without_celery_drops_pending_words(self):
+        buffer = PrewarmBuffer(flush_interval=60, flush_threshold=100)
+        buffer.add('cat', 'en')
+
+        with mock.patch('cards.tts_prewarm.dispatch') as dispatch, self.assertLogs('cards', level='INFO'):
+            buffer._flush_at_exit()
+
+        dispatch.assert_not_called()
+        self.assertEqual(len(buffer), 0)
+
+    @override_settings(USE_CELERY=True)
+    def test_exit_with_celery_dispatches_pending_words(self):
+        buffer = PrewarmBuffer(flush_interval=60, flush_threshold=100)
+        buffer.add('cat', 'en')
+
+        with mock.patch('cards.tts_prewarm.dispatch') as dispatch:
+            buffer._flush_at_exit()
+
+        dispatch.assert_called_once_with([('cat', 'en')])
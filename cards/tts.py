@@ -1,69 +1,245 @@
 """
 Сервис для озвучки слов через gTTS.
 """
-import os
-from pathlib import Path
+import asyncio
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from gtts import gTTS
 from django.conf import settings
+from django.db import close_old_connections
+from .tts_cache import cache_key, get_tts_cache
+from .tts_guard import (
+    CircuitOpenError, get_circuit_breaker, record_metric, recently_failed, remember_failure
+)
+
+logger = logging.getLogger('cards')
+
+
+class TTSError(Exception):
+    """
+    Ошибка озвучки, о которой можно сообщить пользователю.
+
+    Args:
+        message: Текст для пользователя
+        retry_after: Через сколько секунд имеет смысл повторить запрос (None - неизвестно)
+    """
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TTSBusyError(TTSError):
+    """Очередь озвучки переполнена."""
+
+
+class TTSTimeoutError(TTSError):
+    """Озвучка не уложилась в отведенное время."""
+
+
+class TTSUnavailableError(TTSError):
+    """gTTS недоступен или не смог озвучить слово."""
 
 
 class TTSService:
     """Сервис для работы с текстовым озвучиванием."""
     
     @staticmethod
-    def get_audio_path(word: str, language: str = None) -> Path:
+    def synthesize(word: str, language: str) -> bytes:
         """
-        Получает путь к аудиофайлу для слова.
+        Синтезирует mp3 через gTTS без кэша.
+        
+        Язык, который gTTS не поддерживает, заменяется английским.
+        Запрос к API идет через предохранитель.
         
         Args:
             word: Слово для озвучки
-            language: Язык (по умолчанию из настроек)
+            language: Язык
         
         Returns:
-            Path: Путь к файлу
-        """
-        if language is None:
-            language = getattr(settings, 'TTS_LANGUAGE', 'en')
+            bytes: Содержимое mp3
         
-        # Создаем безопасное имя файла
-        safe_word = "".join(c for c in word if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_word = safe_word.replace(' ', '_')
-        filename = f"{safe_word}_{language}.mp3"
-        
-        cache_dir = getattr(settings, 'TTS_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'tts_cache')
-        cache_dir.mkdir(parents=True, exist_ok=True)
+        Raises:
+            CircuitOpenError: Если предохранитель разомкнут после серии ошибок
+        """
+        try:
+            tts = gTTS(text=word, lang=language, slow=False)
+        except ValueError:
+            if language == 'en':
+                raise
+            logger.warning(f"gTTS не поддерживает язык '{language}', озвучиваем '{word}' по-английски")
+            tts = gTTS(text=word, lang='en', slow=False)
         
-        return cache_dir / filename
+        buffer = io.BytesIO()
+        get_circuit_breaker().call(tts.write_to_fp, buffer)
+        return buffer.getvalue()
     
     @staticmethod
-    def generate_audio(word: str, language: str = None) -> Path:
+    def generate_audio(word: str, language: str = None) -> bytes:
         """
-        Генерирует аудиофайл для слова.
+        Генерирует озвучку слова.
+        
+        Готовая озвучка берется из кэша; новая сохраняется в кэш. Неудачная
+        озвучка запоминается на TTS_NEGATIVE_TTL секунд, и повторные запросы
+        того же слова до истечения срока сразу получают ошибку.
         
         Args:
             word: Слово для озвучки
             language: Язык (по умолчанию из настроек)
         
         Returns:
-            Path: Путь к созданному файлу
+            bytes: Содержимое mp3
+        
+        Raises:
+            TTSUnavailableError: Если озвучка не удалась сейчас или недавно
         """
         if language is None:
             language = getattr(settings, 'TTS_LANGUAGE', 'en')
         
-        audio_path = TTSService.get_audio_path(word, language)
+        cache = get_tts_cache()
+        data = cache.read(word, language)
+        if data is not None:
+            return data
         
-        # Если файл уже существует, возвращаем его
-        if audio_path.exists():
-            return audio_path
+        negative_ttl = getattr(settings, 'TTS_NEGATIVE_TTL', 300)
+        if recently_failed(word, language):
+            record_metric('negative_hits')
+            raise TTSUnavailableError(f"Не удалось озвучить '{word}', попробуйте позже", negative_ttl)
         
-        # Генерируем новый файл
         try:
-            tts = gTTS(text=word, lang=language, slow=False)
-            tts.save(str(audio_path))
-            return audio_path
+            data = TTSService.synthesize(word, language)
+        except CircuitOpenError as e:
+            # Слово не виновато - в негативный кэш не записываем
+            retry_in = get_circuit_breaker().snapshot()['retry_in']
+            if retry_in is None:
+                # Полуоткрыт: пробный запрос уже идет
+                retry_in = getattr(settings, 'TTS_BREAKER_RESET_TIMEOUT', 30)
+            raise TTSUnavailableError('Озвучка временно недоступна, попробуйте позже', retry_in) from e
         except Exception as e:
-            # Если не удалось создать, пробуем английский
-            if language != 'en':
-                return TTSService.generate_audio(word, 'en')
-            raise e
+            logger.warning(f"Ошибка озвучки '{word}' ({language}): {e}")
+            record_metric('failures')
+            remember_failure(word, language)
+            raise TTSUnavailableError(f"Не удалось озвучить '{word}', попробуйте позже", negative_ttl) from e
+        
+        record_metric('synthesized')
+        cache.put(word, language, data)
+        return data
+
+
+    @staticmethod
+    async def agenerate_audio(word: str, language: str = None, timeout: float = None) -> bytes:
+        """
+        Асинхронно генерирует озвучку, не блокируя цикл событий.
+        
+        Синтез выполняется в ограниченном пуле потоков; одновременные запросы
+        одного и того же слова ждут одну общую задачу.
+        
+        Args:
+            word: Слово для озвучки
+            language: Язык (по умолчанию из настроек)
+            timeout: Сколько секунд ждать результат (по умолчанию TTS_TIMEOUT)
+        
+        Returns:
+            bytes: Содержимое mp3
+        
+        Raises:
+            TTSBusyError: Если в очереди слишком много задач
+            TTSTimeoutError: Если синтез не уложился в timeout (задача
+                продолжает работу и заполнит кэш)
+        """
+        return await get_tts_executor().generate(word, language, timeout)
+
+
+class TTSExecutor:
+    """
+    Пул потоков для синтеза речи с объединением одинаковых запросов.
+
+    Задачи ключуются по ключу кэша (нормализованное слово и язык): пока
+    задача выполняется, новые запросы того же слова получают ее результат
+    (single-flight). Число задач в очереди ограничено max_pending,
+    а ожидание - timeout секундами.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, timeout: float = 15.0):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts')
+        self._inflight = {}  # ключ кэша -> concurrent.futures.Future
+        self._lock = threading.Lock()
+
+    def submit(self, word: str, language: str = None):
+        """
+        Ставит синтез в очередь или возвращает уже выполняющуюся задачу.
+
+        Returns:
+            concurrent.futures.Future: Задача с содержимым mp3 в результате
+
+        Raises:
+            TTSBusyError: Если в очереди уже max_pending задач
+        """
+        if language is None:
+            language = getattr(settings, 'TTS_LANGUAGE', 'en')
+        key = cache_key(word, language)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            if len(self._inflight) >= self.max_pending:
+                raise TTSBusyError('Слишком много запросов на озвучку, попробуйте позже')
+            future = self._pool.submit(self._generate_in_thread, word, language)
+            self._inflight[key] = future
+
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    async def generate(self, word: str, language: str = None, timeout: float = None) -> bytes:
+        """Асинхронно ждет результат синтеза (см. TTSService.agenerate_audio)."""
+        future = self.submit(word, language)
+        try:
+            # shield: отмена ожидания не отменяет общую задачу других запросов
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)),
+                timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Озвучка '{word}' не уложилась в {timeout or self.timeout} сек.")
+            raise TTSTimeoutError('Озвучка занимает слишком много времени, попробуйте позже')
+
+    @staticmethod
+    def _generate_in_thread(word: str, language: str) -> bytes:
+        # Поток пула живет дольше запроса, а кэш ходит в БД: закрываем устаревшие соединения сами
+        close_old_connections()
+        try:
+            return TTSService.generate_audio(word, language)
+        finally:
+            close_old_connections()
+
+    @property
+    def pending(self) -> int:
+        """Количество задач в очереди и в работе."""
+        return len(self._inflight)
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
 
+def get_tts_executor() -> TTSExecutor:
+    """Возвращает пул синтеза речи процесса (создается при первом обращении)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = TTSExecutor(
+                max_workers=getattr(settings, 'TTS_WORKERS', 4),
+                max_pending=getattr(settings, 'TTS_MAX_PENDING', 100),
+                timeout=getattr(settings, 'TTS_TIMEOUT', 15),
+            )
+        return _executor
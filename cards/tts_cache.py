@@ -0,0 +1,600 @@
+"""
+Кэш озвучки с адресацией по содержимому и ограничением размера.
+
+Два хранилища: отдельные mp3 в каталоге (files) и один pack-файл
+с отображением в память (pack), выбор - настройка TTS_CACHE_BACKEND.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import TTSAudio
+
+try:
+    import fcntl
+except ImportError:  # Windows: pack-файл недоступен
+    fcntl = None
+
+logger = logging.getLogger('cards')
+
+DEFAULT_ENGINE = 'gtts'
+
+
+def normalize_text(text: str) -> str:
+    """
+    Нормализует текст для ключа кэша: Unicode NFC, нижний регистр,
+    схлопнутые пробелы. Пунктуация сохраняется ("it's" и "its" - разные ключи).
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).lower().split())
+
+
+def cache_key(text: str, language: str, engine: str = DEFAULT_ENGINE) -> str:
+    """
+    Вычисляет ключ кэша: sha256 от нормализованного текста, языка и движка.
+
+    Returns:
+        str: 64 шестнадцатеричных символа
+    """
+    payload = '\0'.join([engine, language, normalize_text(text)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """
+    Базовый кэш озвучки с индексом в таблице TTSAudio.
+
+    Индекс хранит размер и время последнего обращения к каждой записи;
+    при превышении max_bytes давно не использованные записи удаляются.
+    Как хранить сами mp3, решают подклассы (_load_data, _store_data,
+    _remove_data).
+
+    Размер кэша не суммируется по индексу на каждую запись: процесс
+    прибавляет записанное к последней сумме и пересчитывает ее, только
+    когда бюджет превышен или сумма старше TOTAL_REFRESH_INTERVAL (кэш
+    пополняют и другие процессы).
+    """
+
+    # Время последнего обращения обновляем не чаще раза в этот интервал (секунды)
+    TOUCH_INTERVAL = 60
+    # После вытеснения кэш занимает не больше этой доли бюджета
+    EVICT_TARGET = 0.9
+    # Как часто пересчитывать размер кэша по индексу (секунды)
+    TOTAL_REFRESH_INTERVAL = 60
+
+    def __init__(self, directory, max_bytes: int, engine: str = DEFAULT_ENGINE):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.engine = engine
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # ключ -> time.monotonic() последнего обновления last_accessed_at этим процессом
+        self._touched = {}
+        # Размер кэша по последнему пересчету плюс записанное с тех пор этим процессом
+        self._total = None
+        self._total_counted_at = 0.0
+        self._total_lock = threading.Lock()
+
+    def read(self, text: str, language: str):
+        """
+        Возвращает содержимое закэшированной озвучки.
+
+        Returns:
+            bytes или None, если озвучки нет в кэше
+        """
+        key = cache_key(text, language, self.engine)
+        data = self._load_data(key)
+        if data is not None:
+            self._touch(key, text, language, len(data))
+        return data
+
+    def put(self, text: str, language: str, data: bytes):
+        """
+        Атомарно сохраняет озвучку и при необходимости вытесняет старые записи.
+
+        Args:
+            text: Озвученный текст
+            language: Язык
+            data: Содержимое mp3
+        """
+        key = cache_key(text, language, self.engine)
+        # Сначала индекс: уплотнение pack-файла сохраняет только записи с индексом,
+        # и данные, дописанные до появления строки TTSAudio, оно бы выбросило
+        self._index(key, text, language, len(data))
+        try:
+            self._store_data(key, data)
+        except BaseException:
+            TTSAudio.objects.filter(key=key).delete()
+            raise
+        self._touched[key] = time.monotonic()
+        if self._over_budget(len(data)):
+            self.evict()
+
+    def _over_budget(self, added: int) -> bool:
+        """Учитывает записанные байты; True, если пора пересчитать размер и вытеснять."""
+        with self._total_lock:
+            stale = time.monotonic() - self._total_counted_at >= self.TOTAL_REFRESH_INTERVAL
+            if self._total is None or stale:
+                return True
+            self._total += added
+            return self._total > self.max_bytes
+
+    def evict(self) -> int:
+        """
+        Удаляет давно не использованные записи, пока кэш больше бюджета.
+
+        Returns:
+            int: Количество освобожденных байт
+        """
+        total = TTSAudio.objects.filter(engine=self.engine).aggregate(total=Sum('size'))['total'] or 0
+        with self._total_lock:
+            self._total = total
+            self._total_counted_at = time.monotonic()
+        if total <= self.max_bytes:
+            return 0
+
+        target = total - int(self.max_bytes * self.EVICT_TARGET)
+        freed = 0
+        victims = (
+            TTSAudio.objects.filter(engine=self.engine)
+            .order_by('last_accessed_at')
+            .values_list('key', 'size')
+            .iterator(chunk_size=500)
+        )
+        keys = []
+        for key, size in victims:
+            keys.append(key)
+            freed += size
+            if freed >= target:
+                break
+
+        self._remove_data(keys)
+        for start in range(0, len(keys), 500):
+            TTSAudio.objects.filter(key__in=keys[start:start + 500]).delete()
+        with self._total_lock:
+            self._total = max(0, self._total - freed)
+        logger.info(f"Кэш озвучки: вытеснено {len(keys)} записей, {freed} байт")
+        return freed
+
+    def compact(self) -> int:
+        """
+        Освобождает место, занятое удаленными записями.
+
+        Returns:
+            int: Количество освобожденных байт (0, если уплотнять нечего)
+        """
+        return 0
+
+    def _load_data(self, key: str):
+        raise NotImplementedError
+
+    def _store_data(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    def _remove_data(self, keys: list):
+        raise NotImplementedError
+
+    def _has_data(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def _index(self, key: str, text: str, language: str, size: int):
+        now = timezone.now()
+        fields = {
+            'text': normalize_text(text)[:200],
+            'language': language,
+            'engine': self.engine,
+            'size': size,
+            'last_accessed_at': now,
+        }
+        if TTSAudio.objects.filter(key=key).update(**fields):
+            return
+        try:
+            with transaction.atomic():
+                TTSAudio.objects.create(key=key, **fields)
+        except IntegrityError:
+            TTSAudio.objects.filter(key=key).update(**fields)
+
+    def _touch(self, key: str, text: str, language: str, size: int):
+        """Обновляет время обращения (не чаще TOUCH_INTERVAL) или дописывает индекс."""
+        touched_at = self._touched.get(key)
+        if touched_at is not None and time.monotonic() - touched_at < self.TOUCH_INTERVAL:
+            return
+        if len(self._touched) > 100000:
+            self._touched.clear()
+        self._touched[key] = time.monotonic()
+
+        now = timezone.now()
+        updated = TTSAudio.objects.filter(
+            key=key, last_accessed_at__lt=now - timedelta(seconds=self.TOUCH_INTERVAL)
+        ).update(last_accessed_at=now)
+        if not updated and not TTSAudio.objects.filter(key=key).exists() and self._has_data(key):
+            # Данные есть, а записи нет (например, индекс очищали вручную).
+            # Перед дозаписью проверяем хранилище: запись могли только что вытеснить
+            self._index(key, text, language, size)
+
+
+class FileTTSCache(TTSCache):
+    """
+    Кэш озвучки в каталоге: один mp3 на ключ.
+
+    Файлы пишутся во временный файл того же каталога и переименовываются
+    (os.replace атомарен), поэтому веб и бот в разных процессах никогда
+    не читают недописанный mp3.
+    """
+
+    def path_for_key(self, key: str) -> Path:
+        return self.directory / f"{key}.mp3"
+
+    def path(self, text: str, language: str) -> Path:
+        """Путь к файлу озвучки (файла может еще не быть)."""
+        return self.path_for_key(cache_key(text, language, self.engine))
+
+    def _load_data(self, key: str):
+        try:
+            return self.path_for_key(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _store_data(self, key: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            # mkstemp создает файл с правами 0600, а читать его могут процессы других пользователей
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, self.path_for_key(key))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _remove_data(self, keys: list):
+        for key in keys:
+            try:
+                self.path_for_key(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _has_data(self, key: str) -> bool:
+        return self.path_for_key(key).exists()
+
+
+class PackTTSCache(TTSCache):
+    """
+    Кэш озвучки в одном pack-файле с компактным индексом смещений.
+
+    audio.<поколение>.pack - mp3, дописанные подряд; audio.idx - заголовок
+    с номером поколения и записи фиксированной длины (sha256, смещение,
+    длина). Запись дописывает данные, затем строку индекса под файловой
+    блокировкой, поэтому процессы веба и бота видят только целиком
+    записанные mp3. Чтение - срез mmap без открытия файлов. Вытеснение
+    дописывает в индекс надгробия (записи с длиной 0), и другие процессы
+    тоже перестают отдавать вытесненные mp3.
+
+    Уплотнение переписывает живые записи в pack-файл следующего поколения
+    и атомарно подменяет индекс; остальные процессы замечают новый индекс
+    не позже чем через REFRESH_INTERVAL секунд. Когда мертвых данных
+    становится много, вытеснение не уплотняет сразу, а ставит уплотнение
+    в фон: задачей Celery (USE_CELERY=True) или отдельным потоком процесса.
+    """
+
+    INDEX_NAME = 'audio.idx'
+    LOCK_NAME = 'audio.lock'
+    INDEX_MAGIC = b'LTI1'
+    INDEX_HEADER = struct.Struct('<4sI')   # магия, поколение
+    INDEX_ENTRY = struct.Struct('<32sQI')  # sha256, смещение, длина
+    # Как часто проверять, не дописали ли и не уплотнили ли кэш другие процессы (секунды)
+    REFRESH_INTERVAL = 5
+    # Уплотняем, когда мертвые данные больше живых и больше этого порога
+    COMPACT_MIN_BYTES = 16 * 1024 * 1024
+    # Повторно ставим уплотнение в очередь Celery не чаще раза в этот интервал (секунды)
+    COMPACT_SCHEDULE_INTERVAL = 300
+
+    def __init__(self, directory, max_bytes: int, engine: str = DEFAULT_ENGINE):
+        if fcntl is None:
+            raise ImproperlyConfigured('TTS_CACHE_BACKEND=pack поддерживается только в POSIX-системах')
+        super().__init__(directory, max_bytes, engine)
+        self.index_path = self.directory / self.INDEX_NAME
+        self._lock = threading.RLock()
+        self._entries = {}  # sha256 (bytes) -> (смещение, длина)
+        self._generation = None
+        self._index_inode = None
+        self._index_size = 0
+        self._mmap = None
+        self._checked_at = 0.0
+        self._compact_thread = None
+        self._compact_scheduled_at = None
+
+        with self._file_lock(), self._lock:
+            if not self.index_path.exists():
+                self._pack_path(0).touch()
+                self._write_index(0, [])
+            self._load()
+
+    def compact(self) -> int:
+        """
+        Переписывает pack-файл без вытесненных и замененных записей.
+
+        Файловая блокировка держится до конца копирования, поэтому записи
+        ждут уплотнения; чтение в этом процессе не блокируется - данные
+        копируются из отдельного отображения старого pack-файла.
+
+        Returns:
+            int: Количество освобожденных байт
+        """
+        with self._file_lock():
+            # Под файловой блокировкой индекс не меняется: снимок полный
+            with self._lock:
+                self._refresh(force=True)
+                old_generation = self._generation
+                current = sorted(self._entries.items(), key=lambda item: item[1][0])
+            live = {
+                bytes.fromhex(key)
+                for key in TTSAudio.objects.filter(engine=self.engine).values_list('key', flat=True)
+            }
+            old_pack = self._pack_path(old_generation)
+            generation = old_generation + 1
+            new_pack = self._pack_path(generation)
+
+            entries = []
+            offset = 0
+            with open(old_pack, 'rb') as source, open(new_pack, 'wb') as pack:
+                old_size = os.fstat(source.fileno()).st_size
+                if old_size:
+                    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        for raw_key, (start, length) in current:
+                            if raw_key not in live:
+                                continue
+                            pack.write(data[start:start + length])
+                            entries.append((raw_key, offset, length))
+                            offset += length
+                pack.flush()
+                os.fsync(pack.fileno())
+
+            self._write_index(generation, entries)
+            old_pack.unlink(missing_ok=True)
+            with self._lock:
+                self._load()
+
+        freed = old_size - offset
+        logger.info(f"Кэш озвучки: pack-файл уплотнен, {len(entries)} записей, освобождено {freed} байт")
+        return freed
+
+    def evict(self) -> int:
+        freed = super().evict()
+        if self._needs_compaction():
+            self.schedule_compaction()
+        return freed
+
+    def schedule_compaction(self):
+        """
+        Ставит уплотнение в фон, не задерживая запрос, который вытеснял записи.
+
+        С Celery (USE_CELERY=True) уплотняет задача cards.tasks.compact_tts_cache
+        (ее же раз в час запускает beat); без Celery - поток текущего процесса.
+        """
+        if getattr(settings, 'USE_CELERY', False):
+            now = time.monotonic()
+            scheduled_at = self._compact_scheduled_at
+            if scheduled_at is not None and now - scheduled_at < self.COMPACT_SCHEDULE_INTERVAL:
+                return
+            self._compact_scheduled_at = now
+            from .tasks import compact_tts_cache
+            compact_tts_cache.delay()
+            return
+
+        with self._lock:
+            if self._compact_thread is not None and self._compact_thread.is_alive():
+                return
+            self._compact_thread = threading.Thread(
+                target=self._compact_in_thread, name='tts-compact', daemon=True
+            )
+            self._compact_thread.start()
+
+    def _compact_in_thread(self):
+        # Поток не обслуживается Django: соединение с БД закрываем сами
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Ошибка уплотнения кэша озвучки: {e}", exc_info=True)
+        finally:
+            close_old_connections()
+
+    def _needs_compaction(self) -> bool:
+        """Мертвых данных больше живых и больше COMPACT_MIN_BYTES."""
+        with self._lock:
+            self._refresh(force=True)
+            try:
+                pack_size = self._pack_path(self._generation).stat().st_size
+            except FileNotFoundError:
+                return False
+            live = sum(length for _, length in self._entries.values())
+        return pack_size - live > max(self.COMPACT_MIN_BYTES, live)
+
+    def _pack_path(self, generation: int) -> Path:
+        return self.directory / f"audio.{generation}.pack"
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Межпроцессная блокировка записи (flock на отдельном файле).
+
+        Берется раньше self._lock: уплотнение держит ее долго, а self._lock - коротко.
+        """
+        with open(self.directory / self.LOCK_NAME, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_index(self, generation: int, entries: list):
+        """Атомарно записывает индекс нового поколения."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            # mkstemp создает файл с правами 0600, а читать его могут процессы других пользователей
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, generation))
+                for entry in entries:
+                    tmp.write(self.INDEX_ENTRY.pack(*entry))
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _load(self):
+        """Полностью перечитывает индекс и отображает pack-файл в память."""
+        try:
+            self._read_index()
+            self._map_pack()
+        except FileNotFoundError:
+            # Между чтением индекса и открытием pack-файла другой процесс
+            # уплотнил кэш и удалил прочитанное поколение: читаем новый индекс
+            self._read_index()
+            self._map_pack()
+        self._checked_at = time.monotonic()
+
+    def _read_index(self):
+        with open(self.index_path, 'rb') as index:
+            magic, generation = self.INDEX_HEADER.unpack(index.read(self.INDEX_HEADER.size))
+            if magic != self.INDEX_MAGIC:
+                raise ImproperlyConfigured(f"{self.index_path} не является индексом кэша озвучки")
+            self._index_inode = os.fstat(index.fileno()).st_ino
+            self._generation = generation
+            self._entries = {}
+            self._index_size = self.INDEX_HEADER.size
+            self._read_entries(index)
+
+    def _read_entries(self, index):
+        """Читает целые записи индекса с текущей позиции файла."""
+        data = index.read()
+        whole = len(data) - len(data) % self.INDEX_ENTRY.size
+        for raw_key, offset, length in self.INDEX_ENTRY.iter_unpack(data[:whole]):
+            if length:
+                self._entries[raw_key] = (offset, length)
+            else:
+                # Надгробие: запись вытеснена
+                self._entries.pop(raw_key, None)
+        self._index_size += whole
+
+    def _remap(self):
+        """Заново отображает pack-файл текущего поколения (он мог вырасти)."""
+        try:
+            self._map_pack()
+        except FileNotFoundError:
+            # Поколение удалено уплотнением в другом процессе
+            self._load()
+
+    def _map_pack(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        with open(self._pack_path(self._generation), 'rb') as pack:
+            if os.fstat(pack.fileno()).st_size:
+                self._mmap = mmap.mmap(pack.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _refresh(self, force: bool = False):
+        """Подхватывает записи других процессов и смену поколения после уплотнения."""
+        if not force and time.monotonic() - self._checked_at < self.REFRESH_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            with open(self.index_path, 'rb') as index:
+                stat = os.fstat(index.fileno())
+                if stat.st_ino == self._index_inode:
+                    if stat.st_size > self._index_size:
+                        index.seek(self._index_size)
+                        self._read_entries(index)
+                    return
+        except FileNotFoundError:
+            return
+        self._load()
+
+    def _load_data(self, key: str):
+        raw_key = bytes.fromhex(key)
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(raw_key)
+            if entry is None:
+                self._refresh(force=True)
+                entry = self._entries.get(raw_key)
+                if entry is None:
+                    return None
+            if self._mmap is None or entry[0] + entry[1] > len(self._mmap):
+                self._remap()
+                # После смены поколения у записи другое смещение (или ее уже нет)
+                entry = self._entries.get(raw_key)
+                if entry is None or self._mmap is None or entry[0] + entry[1] > len(self._mmap):
+                    return None
+            offset, length = entry
+            return self._mmap[offset:offset + length]
+
+    def _store_data(self, key: str, data: bytes):
+        raw_key = bytes.fromhex(key)
+        with self._file_lock(), self._lock:
+            self._refresh(force=True)
+            with open(self._pack_path(self._generation), 'ab') as pack:
+                offset = pack.seek(0, os.SEEK_END)
+                pack.write(data)
+            with open(self.index_path, 'ab') as index:
+                index.write(self.INDEX_ENTRY.pack(raw_key, offset, len(data)))
+            self._entries[raw_key] = (offset, len(data))
+            self._index_size += self.INDEX_ENTRY.size
+
+    def _remove_data(self, keys: list):
+        # Данные остаются в pack-файле до уплотнения, а в индекс дописываются
+        # надгробия, чтобы вытесненные записи перестали отдавать все процессы
+        raw_keys = [bytes.fromhex(key) for key in keys]
+        if not raw_keys:
+            return
+        with self._file_lock(), self._lock:
+            self._refresh(force=True)
+            with open(self.index_path, 'ab') as index:
+                index.write(b''.join(self.INDEX_ENTRY.pack(raw_key, 0, 0) for raw_key in raw_keys))
+            for raw_key in raw_keys:
+                self._entries.pop(raw_key, None)
+            self._index_size += self.INDEX_ENTRY.size * len(raw_keys)
+
+    def _has_data(self, key: str) -> bool:
+        with self._lock:
+            self._refresh(force=True)
+            return bytes.fromhex(key) in self._entries
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """Возвращает кэш озвучки процесса (создается при первом обращении)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = getattr(settings, 'TTS_CACHE_BACKEND', 'files')
+            if backend not in ('files', 'pack'):
+                logger.warning(f"Неизвестный TTS_CACHE_BACKEND={backend}, используем files")
+            cache_class = PackTTSCache if backend == 'pack' else FileTTSCache
+            _cache = cache_class(
+                directory=getattr(settings, 'TTS_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'tts_cache'),
+                max_bytes=getattr(settings, 'TTS_CACHE_MAX_BYTES', 500 * 1024 * 1024),
+            )
+        return _cache
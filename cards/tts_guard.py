@@ -0,0 +1,194 @@
+"""
+Защита озвучки от сбоев gTTS: негативный кэш, предохранитель и счетчики.
+"""
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from gtts.tts import gTTSError
+from .tts_cache import cache_key
+
+logger = logging.getLogger('cards')
+
+METRICS = (
+    'synthesized',         # успешные обращения к gTTS
+    'failures',            # ошибки синтеза
+    'negative_hits',       # запросы, отклоненные негативным кэшем
+    'breaker_trips',       # срабатывания предохранителя
+    'breaker_rejections',  # запросы, отклоненные открытым предохранителем
+)
+
+
+def _metric_key(name: str) -> str:
+    return f'tts:metrics:{name}'
+
+
+def record_metric(name: str):
+    """
+    Увеличивает счетчик озвучки в кэше Django.
+
+    С общим кэшем (CACHE_URL) счетчики суммируются по всем процессам;
+    с LocMemCache у каждого процесса (веб, бот, воркеры) свои счетчики.
+    """
+    key = _metric_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счетчика еще нет; если его успел создать другой процесс, add вернет False
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_metrics() -> dict:
+    """Возвращает счетчики озвучки."""
+    values = cache.get_many([_metric_key(name) for name in METRICS])
+    return {name: values.get(_metric_key(name), 0) for name in METRICS}
+
+
+def metrics_are_shared() -> bool:
+    """Видны ли счетчики всем процессам (кэш Django не в памяти процесса)."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def _failure_key(word: str, language: str) -> str:
+    return f'tts:fail:{cache_key(word, language)}'
+
+
+def remember_failure(word: str, language: str):
+    """Запоминает неудачную озвучку на TTS_NEGATIVE_TTL секунд."""
+    cache.set(_failure_key(word, language), True, getattr(settings, 'TTS_NEGATIVE_TTL', 300))
+
+
+def recently_failed(word: str, language: str) -> bool:
+    """Проверяет, не завершалась ли озвучка слова ошибкой недавно."""
+    return bool(cache.get(_failure_key(word, language)))
+
+
+class CircuitOpenError(Exception):
+    """Предохранитель открыт: обращения к сервису временно не выполняются."""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для обращений к внешнему сервису.
+
+    После failure_threshold ошибок подряд размыкается, и вызовы сразу
+    получают CircuitOpenError. Через reset_timeout секунд пропускает
+    один пробный вызов: успех замыкает предохранитель, ошибка снова
+    размыкает его на reset_timeout. Ошибками сервиса считаются только
+    исключения из failure_exceptions; остальные (например, неверный
+    ввод) состояние не меняют.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 failure_exceptions: tuple = (Exception,)):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Вызывает func через предохранитель.
+
+        Returns:
+            Результат func
+
+        Raises:
+            CircuitOpenError: Если предохранитель открыт
+        """
+        if not self._allow():
+            record_metric('breaker_rejections')
+            raise CircuitOpenError('Сервис озвучки временно недоступен')
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions:
+            self._on_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._on_success()
+        return result
+
+    def snapshot(self) -> dict:
+        """Состояние предохранителя для мониторинга."""
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, round(self.opened_at + self.reset_timeout - time.monotonic(), 1))
+            return {'state': self.state, 'failures': self.failures, 'retry_in': retry_in}
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            # Полуоткрыт: пропускаем только один пробный вызов
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def _on_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Предохранитель озвучки замкнут: пробный запрос успешен")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def _on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                tripped = True
+            else:
+                tripped = False
+            failures = self.failures
+        if tripped:
+            record_metric('breaker_trips')
+            logger.warning(
+                f"Предохранитель озвучки разомкнут после {failures} ошибок, "
+                f"повтор через {self.reset_timeout} сек."
+            )
+
+    def _release_probe(self):
+        with self._lock:
+            self._probing = False
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Возвращает предохранитель gTTS процесса (создается при первом обращении)."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=getattr(settings, 'TTS_BREAKER_THRESHOLD', 5),
+                reset_timeout=getattr(settings, 'TTS_BREAKER_RESET_TIMEOUT', 30),
+                # Сетевые ошибки и ответы API gTTS оборачивает в gTTSError
+                failure_exceptions=(gTTSError,),
+            )
+        return _breaker
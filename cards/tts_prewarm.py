@@ -0,0 +1,169 @@
+"""
+Фоновая озвучка слов новых карточек, чтобы первое прослушивание
+попадало в кэш.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from linguatrack.buffering import FlushBuffer
+from .models import TTSAudio
+from .tts import TTSService
+from .tts_cache import cache_key
+from .tts_guard import CircuitOpenError
+
+logger = logging.getLogger('cards')
+
+
+def prewarm_words(items) -> int:
+    """
+    Озвучивает слова, которых еще нет в кэше.
+
+    Наличие в кэше проверяется одним запросом к индексу TTSAudio на пачку.
+    Ошибки синтеза только логируются: прогрев не должен мешать работе.
+
+    Args:
+        items: Пары (слово, язык)
+
+    Returns:
+        int: Количество озвученных слов
+    """
+    by_key = {cache_key(word, language): (word, language) for word, language in items}
+    cached = set(TTSAudio.objects.filter(key__in=list(by_key)).values_list('key', flat=True))
+
+    generated = 0
+    for key, (word, language) in by_key.items():
+        if key in cached:
+            continue
+        try:
+            TTSService.generate_audio(word, language)
+            generated += 1
+        except Exception as e:
+            if isinstance(e.__cause__, CircuitOpenError):
+                # gTTS недоступен: остальные слова пачки не ждем
+                logger.warning(f"Прогрев озвучки прерван: {e}")
+                break
+            logger.warning(f"Не удалось заранее озвучить '{word}' ({language}): {e}")
+    return generated
+
+
+def _prewarm_in_thread(items):
+    # Поток пула живет дольше запроса: закрываем устаревшие соединения сами
+    close_old_connections()
+    try:
+        return prewarm_words(items)
+    finally:
+        close_old_connections()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ThreadPoolExecutor:
+    """Возвращает пул потоков прогрева (создается при первом обращении)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TTS_PREWARM_WORKERS', 2),
+                thread_name_prefix='tts-prewarm',
+            )
+        return _pool
+
+
+def dispatch(items: list):
+    """
+    Отправляет пачку слов на фоновую озвучку.
+
+    С Celery (USE_CELERY=True) пачка уходит задачей cards.tasks.prewarm_tts,
+    и параллельность ограничивают воркеры Celery; иначе - пулом из
+    TTS_PREWARM_WORKERS потоков в текущем процессе.
+
+    Args:
+        items: Пары (слово, язык)
+    """
+    if getattr(settings, 'USE_CELERY', False):
+        from .tasks import prewarm_tts
+        prewarm_tts.delay([list(item) for item in items])
+    else:
+        get_pool().submit(_prewarm_in_thread, items)
+
+
+class PrewarmBuffer(FlushBuffer):
+    """
+    Буфер слов для прогрева.
+
+    Слова нескольких карточек (например, пачки импорта) объединяются
+    без повторов и уходят на озвучку одной пачкой.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, flush_threshold: int = 50):
+        super().__init__(flush_interval, flush_threshold)
+        self._pending = set()
+
+    def _append(self, word: str, language: str):
+        self._pending.add((word, language))
+
+    def _drain(self):
+        pending, self._pending = self._pending, set()
+        return pending
+
+    def _write(self, pending: set):
+        dispatch(sorted(pending))
+
+    def _flush_at_exit(self):
+        # Пул потоков к atexit уже закрыт для новых задач. Прогрев - только
+        # ускорение: непрогретое слово озвучится при первом прослушивании
+        if getattr(settings, 'USE_CELERY', False):
+            self.flush()
+            return
+        with self._lock:
+            dropped = len(self._drain())
+            self._size = 0
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        if dropped:
+            logger.info(f"Прогрев озвучки {dropped} слов отменен при завершении процесса")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> PrewarmBuffer:
+    """Возвращает буфер прогрева процесса (создается при первом обращении)."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = PrewarmBuffer(
+                flush_threshold=getattr(settings, 'TTS_PREWARM_BATCH_SIZE', 50),
+            )
+        return _buffer
+
+
+def schedule_prewarm(words, language: str = None):
+    """
+    Ставит слова в очередь на фоновую озвучку после коммита транзакции.
+
+    Если транзакция откатится, слова не озвучиваются.
+
+    Args:
+        words: Слова карточек
+        language: Язык (по умолчанию из настроек)
+    """
+    if not getattr(settings, 'TTS_PREWARM', True):
+        return
+    language = language or getattr(settings, 'TTS_LANGUAGE', 'en')
+    words = {word.strip() for word in words if word and word.strip()}
+    if not words:
+        return
+
+    def enqueue():
+        buffer = get_buffer()
+        for word in words:
+            buffer.add(word, language)
+
+    transaction.on_commit(enqueue)
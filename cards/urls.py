@@ -17,6 +17,7 @@ urlpatterns = [
     path('test/<int:pk>/', views.test_mode, name='test_mode'),
     path('test/<int:pk>/submit/', views.submit_answer, name='submit_answer'),
     path('say/<str:word>/', views.say_word, name='say_word'),
+    path('tts/status/', views.tts_status, name='tts_status'),
     path('<int:pk>/schedule/', views.update_schedule, name='update_schedule'),
     path('test/multiple/', views.test_multiple_choice, name='test_multiple_choice'),
     path('test/multiple/<int:pk>/', views.test_multiple_choice, name='test_multiple_choice'),
@@ -24,5 +25,7 @@ urlpatterns = [
     path('test/matching/submit/', views.submit_matching, name='submit_matching'),
     path('export/', views.export_cards, name='export_cards'),
     path('import/', views.import_cards, name='import_cards'),
+    path('import/<int:pk>/', views.import_job, name='import_job'),
+    path('import/<int:pk>/status/', views.import_job_status, name='import_job_status'),
 ]
 
@@ -1,22 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.conf import settings
+from django.utils.http import content_disposition_header
 from django.views.decorators.http import require_http_methods
 from pathlib import Path
 import json
-import csv
 import logging
-from .models import Card
+import math
+from .models import Card, ImportJob
 from .forms import CardForm
-from .services import CardService
-from .tts import TTSService
+from .services import CardService, ImportJobService
+from .csv_io import CardExporter
+from .review import ReviewSession
+from .tts import TTSError, TTSService
+from .tts_guard import get_circuit_breaker, get_metrics, metrics_are_shared
 from schedules.services import SM2Service
 from schedules.forms import ScheduleUpdateForm
-from stats.models import Stats
+from stats.services import StatsService
 
 logger = logging.getLogger('cards')
 
@@ -138,16 +143,22 @@ def test_mode(request, pk=None):
         context = {'card': card, 'single': True}
         return render(request, 'cards/test_mode.html', context)
     else:
-        # Тест карточек на сегодня
-        cards = SM2Service.get_cards_for_today(request.user)
-        if not cards:
+        # Тест карточек на сегодня: очередь хранится в сессии
+        session = ReviewSession(request)
+        if session.active:
+            session.refresh()
+        else:
+            session.start()
+        
+        card = session.next_card()
+        if card is None:
+            session.finish()
             messages.info(request, 'Нет карточек для повторения сегодня!')
             return redirect('cards:card_list')
         
-        card = cards[0]  # Берем первую карточку
         context = {
             'card': card,
-            'remaining': len(cards) - 1,
+            'remaining': len(session) - 1,
             'single': False,
         }
         return render(request, 'cards/test_mode.html', context)
@@ -163,23 +174,30 @@ def submit_answer(request, pk):
         quality = max(0, min(5, quality))  # Ограничиваем 0-5
         
         # Обновляем расписание
-        SM2Service.update_schedule(card, quality)
+        schedule = SM2Service.update_schedule(card, quality)
         
         # Обновляем статистику
-        stats, _ = Stats.objects.get_or_create(user=request.user)
-        stats.total_reviews += 1
-        if quality < 3:
-            stats.wrong_answers += 1
-        stats.last_review_date = card.schedule.last_reviewed_at
-        stats.save()
+        session = ReviewSession(request)
+        StatsService.record_reviews(
+            request.user,
+            wrong=1 if quality < 3 else 0,
+            reviewed_at=schedule.last_reviewed_at,
+            seconds=session.elapsed_seconds(card.pk)
+        )
         
         messages.success(request, 'Ответ сохранен!')
         
-        # Получаем следующую карточку
-        cards = SM2Service.get_cards_for_today(request.user)
-        if cards:
-            return redirect('cards:test_mode', pk=cards[0].pk)
+        # Снимаем карточку с очереди сессии
+        if session.active:
+            session.pop(card.pk)
+            session.refresh()
+        else:
+            session.start()
+        
+        if len(session):
+            return redirect('cards:test_mode')
         else:
+            session.finish()
             messages.info(request, 'Все карточки на сегодня пройдены!')
             return redirect('cards:today_cards')
     
@@ -190,17 +208,34 @@ def submit_answer(request, pk):
 def say_word(request, word):
     """Озвучивание слова через TTS."""
     try:
-        audio_path = TTSService.generate_audio(word)
-        if audio_path.exists():
-            return FileResponse(
-                open(audio_path, 'rb'),
-                content_type='audio/mpeg',
-                filename=audio_path.name
-            )
-        else:
-            raise Http404("Audio file not found")
+        audio = TTSService.generate_audio(word)
+    except TTSError as e:
+        # gTTS недоступен: отвечаем сразу, браузер может повторить позже
+        response = HttpResponse(str(e), status=503, content_type='text/plain; charset=utf-8')
+        if e.retry_after is not None:
+            response['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response
     except Exception as e:
         raise Http404(f"Error generating audio: {str(e)}")
+    response = HttpResponse(audio, content_type='audio/mpeg')
+    response['Content-Disposition'] = content_disposition_header(False, f"{word}.mp3")
+    return response
+
+
+@staff_member_required
+def tts_status(request):
+    """
+    Счетчики ошибок озвучки и состояние предохранителя gTTS (JSON).
+
+    Счетчики общие для всех процессов только при общем кэше (CACHE_URL);
+    с кэшем в памяти (metrics_scope='process') они считают лишь процесс веба.
+    """
+    return JsonResponse({
+        'metrics': get_metrics(),
+        'metrics_scope': 'shared' if metrics_are_shared() else 'process',
+        # Предохранитель у каждого процесса свой, здесь - процесса веба
+        'breaker': get_circuit_breaker().snapshot(),
+    })
 
 
 @login_required
@@ -292,30 +327,31 @@ def test_matching(request):
 @require_http_methods(["POST"])
 def submit_matching(request):
     """Обработка ответа в режиме сопоставления."""
-    data = json.loads(request.body)
-    matches = data.get('matches', {})
+    try:
+        data = json.loads(request.body)
+        # Ответы приходят в виде {ID карточки: выбранный перевод}
+        matches = {int(card_id): translation for card_id, translation in data.get('matches', {}).items()}
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Неверный формат ответа'}, status=400)
     
-    correct = 0
-    total = len(matches)
+    translations = dict(
+        Card.objects.filter(user=request.user, pk__in=list(matches)).values_list('pk', 'translation')
+    )
     
-    for word, translation in matches.items():
-        try:
-            card = Card.objects.get(user=request.user, word=word)
-            if card.translation == translation:
-                correct += 1
-                # Обновляем расписание для правильных ответов
-                SM2Service.update_schedule(card, 5)
-            else:
-                # Обновляем для неправильных
-                SM2Service.update_schedule(card, 0)
-        except Card.DoesNotExist:
-            pass
+    # Правильные ответы - качество 5, неправильные - 0
+    qualities = {
+        card_id: 5 if translations[card_id] == translation else 0
+        for card_id, translation in matches.items()
+        if card_id in translations
+    }
+    SM2Service.update_schedules_bulk(request.user, qualities)
+    
+    total = len(qualities)
+    correct = sum(1 for quality in qualities.values() if quality >= 3)
     
     # Обновляем статистику
-    stats, _ = Stats.objects.get_or_create(user=request.user)
-    stats.total_reviews += total
-    stats.wrong_answers += (total - correct)
-    stats.save()
+    if total:
+        StatsService.record_reviews(request.user, total=total, wrong=total - correct)
     
     return JsonResponse({
         'correct': correct,
@@ -326,74 +362,55 @@ def submit_matching(request):
 
 @login_required
 def export_cards(request):
-    """Экспорт карточек в CSV."""
-    cards = Card.objects.filter(user=request.user)
+    """Экспорт карточек в CSV (потоковый, опционально со сжатием gzip)."""
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+    exporter = CardExporter(request.user)
     
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="cards_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Слово', 'Перевод', 'Пример', 'Заметка', 'Уровень', 'Создано'])
-    
-    for card in cards:
-        writer.writerow([
-            card.word,
-            card.translation,
-            card.example or '',
-            card.note or '',
-            card.get_level_display(),
-            card.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
+    if compress:
+        response = StreamingHttpResponse(exporter.iter_bytes(compress=True), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="cards_export.csv.gz"'
+    else:
+        response = StreamingHttpResponse(exporter.iter_bytes(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="cards_export.csv"'
     
     return response
 
 
 @login_required
 def import_cards(request):
-    """Импорт карточек из CSV."""
+    """Импорт карточек из CSV (выполняется в фоне задачей Celery)."""
     if request.method == 'POST' and request.FILES.get('file'):
         file = request.FILES['file']
         try:
-            decoded_file = file.read().decode('utf-8').splitlines()
-            reader = csv.DictReader(decoded_file)
-            
-            imported = 0
-            errors = []
-            
-            # Маппинг уровней
-            level_mapping = {
-                'начальный': 'beginner',
-                'средний': 'intermediate',
-                'продвинутый': 'advanced',
-                'beginner': 'beginner',
-                'intermediate': 'intermediate',
-                'advanced': 'advanced',
-            }
-            
-            for row in reader:
-                try:
-                    level_str = row.get('Уровень', 'beginner').strip().lower()
-                    level = level_mapping.get(level_str, 'beginner')
-                    
-                    CardService.create_card(
-                        user=request.user,
-                        word=row.get('Слово', '').strip(),
-                        translation=row.get('Перевод', '').strip(),
-                        example=row.get('Пример', '').strip() or None,
-                        note=row.get('Заметка', '').strip() or None,
-                        level=level
-                    )
-                    imported += 1
-                except Exception as e:
-                    errors.append(f"Ошибка в строке: {str(e)}")
-            
-            messages.success(request, f'Импортировано {imported} карточек!')
-            if errors:
-                messages.warning(request, f'Ошибок: {len(errors)}')
-            
-            return redirect('cards:card_list')
+            job = ImportJobService.create_job(request.user, file)
+            return redirect('cards:import_job', pk=job.pk)
         except Exception as e:
+            logger.error(f"Ошибка импорта: {e}", exc_info=True)
             messages.error(request, f'Ошибка импорта: {str(e)}')
     
     return render(request, 'cards/import_cards.html')
 
+
+@login_required
+def import_job(request, pk):
+    """Страница прогресса фонового импорта."""
+    job = get_object_or_404(ImportJob, pk=pk, user=request.user)
+    return render(request, 'cards/import_job.html', {'job': job})
+
+
+@login_required
+def import_job_status(request, pk):
+    """Статус фонового импорта в JSON (для опроса со страницы)."""
+    job = get_object_or_404(ImportJob, pk=pk, user=request.user)
+    return JsonResponse({
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'progress': job.progress,
+        'eta_seconds': job.eta_seconds,
+        'rows_processed': job.rows_processed,
+        'rows_imported': job.rows_imported,
+        'rows_failed': job.rows_failed,
+        'errors': job.errors[:20],
+        'error_message': job.error_message,
+    })
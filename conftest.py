@@ -0,0 +1,28 @@
+"""
+Настройка pytest: Django и тестовая база данных.
+
+Тесты написаны на django.test.TestCase, поэтому их запускает и
+python manage.py test, и python -m pytest.
+"""
+import os
+import django
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'linguatrack.settings')
+# Бот создается при импорте bot.bot и проверяет формат токена
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST-token-for-tests')
+django.setup()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def django_test_databases():
+    """Создает тестовые базы данных на время прогона."""
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
@@ -0,0 +1,62 @@
+"""
+Выполнение синхронного кода с ORM из asyncio в ограниченном пуле потоков.
+
+sync_to_async по умолчанию (thread_sensitive=True) выполняет все вызовы
+в одном потоке, поэтому один медленный запрос задерживает все чаты бота.
+Пул из DB_EXECUTOR_WORKERS потоков позволяет независимым корутинам
+работать с БД параллельно и при этом ограничивает число соединений.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Возвращает пул потоков для работы с БД (создается при первом обращении)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DB_EXECUTOR_WORKERS', 4),
+                thread_name_prefix='db',
+            )
+        return _executor
+
+
+def _call(func, args, kwargs):
+    # Как в начале и конце HTTP-запроса: закрываем устаревшие и сломанные соединения
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db(func, *args, **kwargs):
+    """
+    Выполняет синхронную функцию в пуле потоков БД.
+
+    Args:
+        func: Функция, работающая с ORM
+        *args, **kwargs: Аргументы функции
+
+    Returns:
+        Результат func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _call, func, args, kwargs)
+
+
+def db_async(func):
+    """Декоратор: превращает синхронную функцию с ORM в корутину на пуле БД."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db(func, *args, **kwargs)
+    wrapper.func = func
+    return wrapper
@@ -0,0 +1,85 @@
+"""
+Буферы отложенной записи с пакетным сбросом в БД.
+"""
+import atexit
+import logging
+import threading
+from django.db import connections
+
+logger = logging.getLogger('linguatrack')
+
+
+class FlushBuffer:
+    """
+    Базовый буфер: копит записи в памяти процесса и сбрасывает их пачкой -
+    по достижении порога или по истечении интервала с момента первой записи.
+
+    Подклассы реализуют _append (под блокировкой), _drain (под блокировкой,
+    забирает накопленное) и _write (вне блокировки, пишет пачку в БД).
+    """
+
+    def __init__(self, flush_interval: float = 5.0, flush_threshold: int = 100):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._size = 0
+        self._timer = None
+        atexit.register(self._flush_at_exit)
+
+    def add(self, *args, **kwargs):
+        """Добавляет запись в буфер."""
+        with self._lock:
+            self._append(*args, **kwargs)
+            self._size += 1
+            should_flush = self._size >= self.flush_threshold
+            if not should_flush:
+                self._schedule_flush()
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные данные в БД."""
+        with self._lock:
+            batch = self._drain()
+            self._size = 0
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+        if batch:
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Ошибка сброса буфера {type(self).__name__}: {e}", exc_info=True)
+
+    def __len__(self):
+        return self._size
+
+    def _schedule_flush(self):
+        """Запускает таймер периодической записи (вызывается под блокировкой)."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_in_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Каждый таймер - новый поток со своим соединением с БД: закрываем его,
+            # иначе соединения завершившихся потоков копятся до сборки мусора
+            connections.close_all()
+
+    def _flush_at_exit(self):
+        """Сбрасывает остаток при завершении процесса (подклассы могут отказаться)."""
+        self.flush()
+
+    def _append(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def _drain(self):
+        raise NotImplementedError
+
+    def _write(self, batch):
+        raise NotImplementedError
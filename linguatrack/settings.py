@@ -83,6 +83,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+if os.getenv('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -145,6 +163,10 @@ else:
     # Используем memory broker для разработки (не требует Redis)
     CELERY_BROKER_URL = 'memory://'
     CELERY_RESULT_BACKEND = 'cache+memory://'
+    # Воркера с memory broker нет, поэтому задачи, вызванные через delay (например,
+    # вручную из shell), выполняются сразу в вызывающем процессе. Запросы веба
+    # на них не полагаются: импорт CSV и прогрев озвучки без Celery идут в потоках
+    CELERY_TASK_ALWAYS_EAGER = True
 
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
@@ -155,20 +177,115 @@ CELERY_TIMEZONE = TIME_ZONE
 if USE_CELERY:
     from celery.schedules import crontab
     CELERY_BEAT_SCHEDULE = {
-        'send-daily-reminders': {
-            'task': 'bot.tasks.send_daily_reminders',
-            'schedule': crontab(hour=9, minute=0),  # Каждый день в 9:00
+        'send-due-reminders': {
+            'task': 'bot.tasks.send_due_reminders',
+            'schedule': crontab(),  # Каждую минуту: пользователи, чье время напоминания наступило
+        },
+        'cleanup-fsm-storage': {
+            'task': 'bot.tasks.cleanup_fsm_storage',
+            'schedule': crontab(minute=0),  # Каждый час: истекшие состояния FSM
+        },
+        'compact-tts-cache': {
+            'task': 'cards.tasks.compact_tts_cache',
+            'schedule': crontab(minute=30),  # Каждый час: уплотнение pack-файла озвучки
         },
     }
 else:
     CELERY_BEAT_SCHEDULE = {}
 
+# Счетчики статистики: при STATS_WRITE_BEHIND=True приращения копятся в памяти
+# процесса и записываются пачкой по порогу или по интервалу (в секундах)
+STATS_WRITE_BEHIND = os.getenv('STATS_WRITE_BEHIND', 'False').lower() == 'true'
+STATS_FLUSH_INTERVAL = float(os.getenv('STATS_FLUSH_INTERVAL', '5'))
+STATS_FLUSH_THRESHOLD = int(os.getenv('STATS_FLUSH_THRESHOLD', '100'))
+
+# Кэш агрегатов статистики (секунды). Для нескольких процессов (веб + бот)
+# лучше общий кэш: задайте CACHE_URL, например redis://localhost:6379/1
+STATS_CACHE_TIMEOUT = int(os.getenv('STATS_CACHE_TIMEOUT', '60'))
+
+# Журнал повторений пишется групповым коммитом: пачкой по REVIEW_LOG_BATCH_SIZE
+# записей или не реже раза в REVIEW_LOG_FLUSH_INTERVAL секунд
+REVIEW_LOG_BATCH_SIZE = int(os.getenv('REVIEW_LOG_BATCH_SIZE', '50'))
+REVIEW_LOG_FLUSH_INTERVAL = float(os.getenv('REVIEW_LOG_FLUSH_INTERVAL', '1'))
+
+# Импорт карточек: загруженные CSV сохраняются сюда до обработки задачей Celery
+# или (без Celery) одним из IMPORT_WORKERS потоков процесса веба
+IMPORT_SPOOL_DIR = BASE_DIR / 'spool' / 'imports'
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '1'))
+
 # Telegram Bot
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 
+# Хранилище состояний FSM бота: db (общая БД, по умолчанию), redis или memory
+# (только один процесс). Неактивные диалоги истекают через BOT_FSM_TTL секунд
+BOT_FSM_STORAGE = os.getenv('BOT_FSM_STORAGE', 'db')
+BOT_FSM_TTL = int(os.getenv('BOT_FSM_TTL', '86400'))
+BOT_FSM_REDIS_URL = os.getenv('BOT_FSM_REDIS_URL', 'redis://localhost:6379/2')
+
+# Размер пула потоков для запросов к БД из асинхронного кода бота
+# (linguatrack.async_db): чаты работают с БД параллельно, но не больше
+# DB_EXECUTOR_WORKERS соединений на процесс
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', '4'))
+
+# Сколько карточек тест в боте держит в данных FSM (дочитываются по мере ответов)
+BOT_REVIEW_BATCH_SIZE = int(os.getenv('BOT_REVIEW_BATCH_SIZE', '20'))
+
+# Кэш Telegram ID -> пользователь в процессе бота: размер (записей) и TTL (секунды)
+BOT_USER_CACHE_SIZE = int(os.getenv('BOT_USER_CACHE_SIZE', '10000'))
+BOT_USER_CACHE_TTL = int(os.getenv('BOT_USER_CACHE_TTL', '300'))
+
+# Режим webhook (manage.py run_bot --webhook): публичный адрес, путь, секретный
+# токен для заголовка X-Telegram-Bot-Api-Secret-Token (обязателен, символы A-Z, a-z,
+# 0-9, _ и -) и параметры ASGI-сервера
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL', '')
+TELEGRAM_WEBHOOK_PATH = os.getenv('TELEGRAM_WEBHOOK_PATH', '/telegram/webhook')
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+TELEGRAM_WEBHOOK_HOST = os.getenv('TELEGRAM_WEBHOOK_HOST', '0.0.0.0')
+TELEGRAM_WEBHOOK_PORT = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8081'))
+TELEGRAM_WEBHOOK_WORKERS = int(os.getenv('TELEGRAM_WEBHOOK_WORKERS', str(os.cpu_count() or 1)))
+
+# Рассылка напоминаний: общий лимит Telegram (сообщений в секунду), минимальный
+# интервал между сообщениями в один чат, число параллельных отправок и размер
+# пачки пользователей, читаемой из БД
+REMINDER_GLOBAL_RATE = float(os.getenv('REMINDER_GLOBAL_RATE', '25'))
+REMINDER_PER_CHAT_INTERVAL = float(os.getenv('REMINDER_PER_CHAT_INTERVAL', '1'))
+REMINDER_CONCURRENCY = int(os.getenv('REMINDER_CONCURRENCY', '20'))
+REMINDER_CHUNK_SIZE = int(os.getenv('REMINDER_CHUNK_SIZE', '1000'))
+# Рассылка делится на шарды по диапазонам ID пользователей (ширина диапазона);
+# шард обрабатывается одной задачей под арендой на REMINDER_LEASE_SECONDS секунд;
+# столько же держится захват пользователя, которому напоминание еще не отправлено
+REMINDER_SHARD_SIZE = int(os.getenv('REMINDER_SHARD_SIZE', '10000'))
+REMINDER_LEASE_SECONDS = int(os.getenv('REMINDER_LEASE_SECONDS', '300'))
+
 # TTS Settings
 TTS_LANGUAGE = os.getenv('TTS_LANGUAGE', 'en')
 TTS_CACHE_DIR = BASE_DIR / 'media' / 'tts_cache'
+# Бюджет кэша озвучки в байтах; при превышении вытесняются давно не использованные файлы
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+# Хранилище кэша озвучки: files (mp3 на слово) или pack (один файл с индексом,
+# чтение через mmap; только POSIX). Pack-файл уплотняется в фоне, когда вытесненных
+# данных становится больше живых: задачей Celery или (без Celery) потоком процесса;
+# с Celery beat еще и раз в час
+TTS_CACHE_BACKEND = os.getenv('TTS_CACHE_BACKEND', 'files')
+# Слова новых карточек озвучиваются заранее в фоне: пачками по TTS_PREWARM_BATCH_SIZE
+# через Celery или (без Celery) в TTS_PREWARM_WORKERS потоках процесса
+TTS_PREWARM = os.getenv('TTS_PREWARM', 'True').lower() == 'true'
+TTS_PREWARM_BATCH_SIZE = int(os.getenv('TTS_PREWARM_BATCH_SIZE', '50'))
+TTS_PREWARM_WORKERS = int(os.getenv('TTS_PREWARM_WORKERS', '2'))
+
+# Асинхронная озвучка в боте: потоков синтеза, максимум задач в очереди
+# и сколько секунд ждать результат
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', '4'))
+TTS_MAX_PENDING = int(os.getenv('TTS_MAX_PENDING', '100'))
+TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', '15'))
+
+# Ошибки gTTS: неудачное слово не озвучивается повторно TTS_NEGATIVE_TTL секунд;
+# после TTS_BREAKER_THRESHOLD ошибок подряд запросы к gTTS не выполняются
+# TTS_BREAKER_RESET_TIMEOUT секунд, затем пробный запрос. Счетчики на /tts/status/
+# общие для веба, бота и воркеров только при общем кэше (CACHE_URL)
+TTS_NEGATIVE_TTL = int(os.getenv('TTS_NEGATIVE_TTL', '300'))
+TTS_BREAKER_THRESHOLD = int(os.getenv('TTS_BREAKER_THRESHOLD', '5'))
+TTS_BREAKER_RESET_TIMEOUT = float(os.getenv('TTS_BREAKER_RESET_TIMEOUT', '30'))
 
 # Create TTS cache directory if it doesn't exist
 TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
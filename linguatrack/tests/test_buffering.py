@@ -0,0 +1,85 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from linguatrack.buffering import FlushBuffer
+
+
+class ListBuffer(FlushBuffer):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = []
+        self.batches = []
+        self.written = threading.Event()
+
+    def _append(self, item):
+        self.items.append(item)
+
+    def _drain(self):
+        items, self.items = self.items, []
+        return items
+
+    def _write(self, batch):
+        self.batches.append(batch)
+        self.written.set()
+
+
+class FlushBufferTests(SimpleTestCase):
+
+    def make_buffer(self, **kwargs) -> ListBuffer:
+        buffer = ListBuffer(**kwargs)
+        self.addCleanup(buffer.flush)
+        return buffer
+
+    def test_flushes_when_threshold_reached(self):
+        buffer = self.make_buffer(flush_interval=60, flush_threshold=3)
+        buffer.add(1)
+        buffer.add(2)
+        self.assertEqual((len(buffer), buffer.batches), (2, []))
+
+        buffer.add(3)
+
+        self.assertEqual((len(buffer), buffer.batches), (0, [[1, 2, 3]]))
+        self.assertIsNone(buffer._timer)
+
+    def test_flushes_after_interval(self):
+        buffer = self.make_buffer(flush_interval=0.05, flush_threshold=100)
+        buffer.add(1)
+
+        self.assertTrue(buffer.written.wait(5))
+        self.assertEqual(buffer.batches, [[1]])
+
+    def test_timer_flush_closes_its_connections(self):
+        closed = threading.Event()
+        buffer = self.make_buffer(flush_interval=0.05, flush_threshold=100)
+
+        with mock.patch('linguatrack.buffering.connections') as connections:
+            connections.close_all.side_effect = closed.set
+            buffer.add(1)
+            self.assertTrue(closed.wait(5))
+
+        self.assertEqual(buffer.batches, [[1]])
+
+    def test_threshold_flush_keeps_caller_connections(self):
+        buffer = self.make_buffer(flush_interval=60, flush_threshold=1)
+
+        with mock.patch('linguatrack.buffering.connections') as connections:
+            buffer.add(1)
+
+        connections.close_all.assert_not_called()
+
+    def test_empty_flush_writes_nothing(self):
+        buffer = self.make_buffer()
+        buffer.flush()
+
+        self.assertEqual(buffer.batches, [])
+
+    def test_write_error_is_logged_and_buffer_stays_usable(self):
+        buffer = self.make_buffer(flush_interval=60, flush_threshold=1)
+
+        with mock.patch.object(buffer, '_write', side_effect=RuntimeError('db down')), \
+                self.assertLogs('linguatrack', level='ERROR'):
+            buffer.add(1)
+        buffer.add(2)
+
+        self.assertEqual(buffer.batches, [[2]])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Schedule
+from .models import ReviewLog, Schedule
 
 
 @admin.register(Schedule)
@@ -9,3 +9,11 @@ class ScheduleAdmin(admin.ModelAdmin):
     search_fields = ['card__word', 'card__translation']
     readonly_fields = ['last_reviewed_at']
 
+
+
+@admin.register(ReviewLog)
+class ReviewLogAdmin(admin.ModelAdmin):
+    list_display = ['card', 'user', 'quality', 'prev_interval', 'new_interval', 'source', 'reviewed_at']
+    list_filter = ['source', 'quality', 'reviewed_at']
+    search_fields = ['card__word', 'user__username']
+    raw_id_fields = ['card', 'user']
@@ -0,0 +1,59 @@
+"""
+Django management команда для сравнения скалярного и векторизованного SM-2.
+"""
+import time
+from types import SimpleNamespace
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from schedules.services import SM2Service
+
+
+class Command(BaseCommand):
+    """Бенчмарк SM2Service.calculate_next_review_batch против цикла по calculate_next_review"""
+    help = 'Сравнивает скорость и результаты скалярного и векторизованного SM-2'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100_000, help='Количество повторений')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора случайных чисел')
+    
+    def handle(self, *args, **options):
+        size = options['size']
+        rng = np.random.default_rng(options['seed'])
+        
+        qualities = rng.integers(0, 6, size)
+        intervals = rng.integers(1, 365, size)
+        repetitions = rng.integers(0, 10, size)
+        easiness_factors = np.round(rng.uniform(1.3, 3.0, size), 2)
+        
+        # Скалярный путь: по одному объекту расписания на повторение
+        schedules = [
+            SimpleNamespace(interval=int(i), repetitions=int(r), easiness_factor=float(ef))
+            for i, r, ef in zip(intervals, repetitions, easiness_factors)
+        ]
+        started = time.perf_counter()
+        scalar = [
+            SM2Service.calculate_next_review(int(q), schedule)
+            for q, schedule in zip(qualities, schedules)
+        ]
+        scalar_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        new_intervals, new_efs, new_repetitions = SM2Service.calculate_next_review_batch(
+            qualities, intervals, repetitions, easiness_factors
+        )
+        batch_time = time.perf_counter() - started
+        
+        scalar_intervals, scalar_efs, scalar_repetitions = (np.array(column) for column in zip(*scalar))
+        if not (
+            np.array_equal(scalar_intervals, new_intervals)
+            and np.array_equal(scalar_efs, new_efs)
+            and np.array_equal(scalar_repetitions, new_repetitions)
+        ):
+            raise CommandError('Результаты скалярного и векторизованного SM-2 не совпадают')
+        
+        self.stdout.write(f'Повторений: {size}')
+        self.stdout.write(f'Скалярный цикл: {scalar_time * 1000:.1f} мс')
+        self.stdout.write(f'NumPy batch:    {batch_time * 1000:.1f} мс')
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты совпадают, ускорение x{scalar_time / batch_time:.1f}'
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0002_importjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schedules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quality', models.PositiveSmallIntegerField(verbose_name='Качество ответа')),
+                ('prev_interval', models.IntegerField(verbose_name='Интервал до (дни)')),
+                ('new_interval', models.IntegerField(verbose_name='Интервал после (дни)')),
+                ('prev_easiness_factor', models.FloatField(verbose_name='Фактор легкости до')),
+                ('new_easiness_factor', models.FloatField(verbose_name='Фактор легкости после')),
+                ('source', models.CharField(choices=[('web', 'Веб'), ('bot', 'Telegram-бот'), ('matching', 'Сопоставление')], default='web', max_length=20, verbose_name='Источник')),
+                ('reviewed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время ответа')),
+                ('card', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='review_logs', to='cards.card', verbose_name='Карточка')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись журнала повторений',
+                'verbose_name_plural': 'Журнал повторений',
+                'ordering': ['-reviewed_at'],
+                'indexes': [models.Index(fields=['user', 'reviewed_at'], name='schedules_r_user_id_725791_idx'), models.Index(fields=['card', 'reviewed_at'], name='schedules_r_card_id_2444d3_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.auth.models import User
 from django.utils import timezone
 from cards.models import Card
 
@@ -47,3 +48,52 @@ class Schedule(models.Model):
     def __str__(self):
         return f"Schedule for {self.card.word} - Next: {self.next_review_at}"
 
+
+
+class ReviewLog(models.Model):
+    """
+    Журнал повторений: одна запись на каждый ответ, только добавление.
+    """
+    SOURCE_CHOICES = [
+        ('web', 'Веб'),
+        ('bot', 'Telegram-бот'),
+        ('matching', 'Сопоставление'),
+    ]
+
+    card = models.ForeignKey(
+        Card,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='review_logs',
+        verbose_name='Карточка'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='review_logs',
+        verbose_name='Пользователь'
+    )
+    quality = models.PositiveSmallIntegerField(verbose_name='Качество ответа')
+    prev_interval = models.IntegerField(verbose_name='Интервал до (дни)')
+    new_interval = models.IntegerField(verbose_name='Интервал после (дни)')
+    prev_easiness_factor = models.FloatField(verbose_name='Фактор легкости до')
+    new_easiness_factor = models.FloatField(verbose_name='Фактор легкости после')
+    source = models.CharField(
+        max_length=20,
+        choices=SOURCE_CHOICES,
+        default='web',
+        verbose_name='Источник'
+    )
+    reviewed_at = models.DateTimeField(default=timezone.now, verbose_name='Время ответа')
+
+    class Meta:
+        verbose_name = 'Запись журнала повторений'
+        verbose_name_plural = 'Журнал повторений'
+        ordering = ['-reviewed_at']
+        indexes = [
+            models.Index(fields=['user', 'reviewed_at']),
+            models.Index(fields=['card', 'reviewed_at']),
+        ]
+
+    def __str__(self):
+        return f"Review of card {self.card_id} by user {self.user_id}: {self.quality}"
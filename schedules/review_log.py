@@ -0,0 +1,95 @@
+"""
+Запись журнала повторений через групповой коммит.
+"""
+import logging
+import threading
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from cards.models import Card
+from linguatrack.buffering import FlushBuffer
+from .models import ReviewLog
+
+logger = logging.getLogger('cards')
+
+
+class ReviewLogWriter(FlushBuffer):
+    """
+    Групповая запись журнала повторений.
+
+    Записи копятся в памяти процесса и вставляются одним bulk_create,
+    поэтому стоимость ответа почти не зависит от журнала. Карточка
+    может быть удалена между ответом и записью: такие записи сохраняются
+    без карточки, как после on_delete=SET_NULL, а не отбрасывают пачку.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, flush_threshold: int = 50):
+        super().__init__(flush_interval, flush_threshold)
+        self._pending = []
+
+    def _append(self, entry: ReviewLog):
+        self._pending.append(entry)
+
+    def _drain(self):
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _write(self, entries: list):
+        card_ids = {entry.card_id for entry in entries if entry.card_id is not None}
+        existing = set(Card.objects.filter(pk__in=card_ids).values_list('pk', flat=True))
+        for entry in entries:
+            if entry.card_id not in existing:
+                entry.card_id = None
+
+        try:
+            with transaction.atomic():
+                ReviewLog.objects.bulk_create(entries)
+        except IntegrityError:
+            # Карточку или пользователя удалили уже после проверки: пишем по одной
+            for entry in entries:
+                self._write_one(entry)
+
+    @staticmethod
+    def _write_one(entry: ReviewLog):
+        entry.pk = None
+        try:
+            with transaction.atomic():
+                entry.save(force_insert=True)
+        except IntegrityError:
+            if entry.card_id is None:
+                # Удален пользователь - его журнал удален вместе с ним
+                logger.warning(f"Запись журнала пользователя {entry.user_id} пропущена: {entry}")
+                return
+            entry.card_id = None
+            ReviewLogWriter._write_one(entry)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> ReviewLogWriter:
+    """Возвращает писатель журнала процесса (создается при первом обращении)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ReviewLogWriter(
+                flush_interval=getattr(settings, 'REVIEW_LOG_FLUSH_INTERVAL', 1.0),
+                flush_threshold=getattr(settings, 'REVIEW_LOG_BATCH_SIZE', 50),
+            )
+        return _writer
+
+
+def log_reviews(entries: list):
+    """
+    Ставит записи журнала в очередь на запись после коммита транзакции.
+
+    Args:
+        entries: Несохраненные объекты ReviewLog
+    """
+    def enqueue():
+        writer = get_writer()
+        for entry in entries:
+            writer.add(entry)
+
+    if entries:
+        transaction.on_commit(enqueue)
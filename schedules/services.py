@@ -2,10 +2,14 @@
 Сервис для работы с интервальным повторением по алгоритму SM-2.
 """
 from datetime import timedelta
+import numpy as np
 from django.utils import timezone
 from django.db import transaction
-from .models import Schedule
+from .models import ReviewLog, Schedule
+from .review_log import log_reviews
 from cards.models import Card
+from linguatrack.async_db import run_in_db
+from stats.services import StatsService
 
 
 class SM2Service:
@@ -55,42 +59,219 @@ class SM2Service:
         
         return new_interval, new_easiness_factor, new_repetitions
     
+    @staticmethod
+    def calculate_next_review_batch(qualities, intervals, repetitions, easiness_factors) -> tuple:
+        """
+        Векторизованный вариант calculate_next_review для массивов повторений.
+        
+        Дает те же результаты, что и скалярный вариант: минимальный
+        easiness_factor 1.3 и отбрасывание дробной части интервала.
+        
+        Args:
+            qualities: Качества ответов (0-5)
+            intervals: Текущие интервалы (дни)
+            repetitions: Текущие количества повторений
+            easiness_factors: Текущие easiness_factor
+        
+        Returns:
+            tuple: (массив новых интервалов, массив новых easiness_factor,
+                    массив новых repetitions)
+        """
+        quality = np.asarray(qualities, dtype=np.int64)
+        interval = np.asarray(intervals, dtype=np.int64)
+        reps = np.asarray(repetitions, dtype=np.int64)
+        ef = np.asarray(easiness_factors, dtype=np.float64)
+        
+        correct = quality >= 3
+        
+        # Интервал: 1 и 6 для первых двух повторений, затем interval * EF
+        # (astype отбрасывает дробную часть так же, как int())
+        grown_interval = (interval * ef).astype(np.int64)
+        new_interval = np.where(
+            correct,
+            np.where(reps == 0, 1, np.where(reps == 1, 6, grown_interval)),
+            1
+        )
+        new_repetitions = np.where(correct, reps + 1, 0)
+        
+        diff = 5 - quality
+        new_easiness_factor = np.maximum(1.3, np.where(
+            correct,
+            ef + (0.1 - diff * (0.08 + diff * 0.02)),
+            ef - 0.2
+        ))
+        
+        return new_interval, new_easiness_factor, new_repetitions
+    
     @staticmethod
     @transaction.atomic
-    def update_schedule(card: Card, quality: int) -> Schedule:
+    def update_schedule(card: Card, quality: int, source: str = 'web') -> Schedule:
         """
-        Обновляет расписание карточки после повторения.
+        Обновляет расписание карточки после повторения и пишет ответ в журнал.
         
         Args:
             card: Объект Card
             quality: Качество ответа (0-5)
+            source: Источник ответа для журнала ('web', 'bot', 'matching')
         
         Returns:
             Schedule: Обновленный объект Schedule
         """
-        schedule, created = Schedule.objects.get_or_create(
-            card=card,
-            defaults={
-                'next_review_at': timezone.now(),
-                'interval': 1,
-                'repetitions': 0,
-                'easiness_factor': 2.5,
-            }
-        )
+        try:
+            # Без запроса, если расписание загружено через select_related('schedule')
+            schedule = card.schedule
+        except Schedule.DoesNotExist:
+            schedule, created = Schedule.objects.get_or_create(
+                card=card,
+                defaults={
+                    'next_review_at': timezone.now(),
+                    'interval': 1,
+                    'repetitions': 0,
+                    'easiness_factor': 2.5,
+                }
+            )
+        schedule.card = card
         
         new_interval, new_easiness_factor, new_repetitions = SM2Service.calculate_next_review(
             quality, schedule
         )
         
+        now = timezone.now()
+        log_entry = ReviewLog(
+            card_id=card.pk,
+            user_id=card.user_id,
+            quality=quality,
+            prev_interval=schedule.interval,
+            new_interval=new_interval,
+            prev_easiness_factor=schedule.easiness_factor,
+            new_easiness_factor=new_easiness_factor,
+            source=source,
+            reviewed_at=now,
+        )
+        
         schedule.interval = new_interval
         schedule.easiness_factor = new_easiness_factor
         schedule.repetitions = new_repetitions
-        schedule.next_review_at = timezone.now() + timedelta(days=new_interval)
-        schedule.last_reviewed_at = timezone.now()
+        schedule.next_review_at = now + timedelta(days=new_interval)
+        schedule.last_reviewed_at = now
         schedule.save()
         
+        log_reviews([log_entry])
+        
+        return schedule
+    
+    @staticmethod
+    @transaction.atomic
+    def record_review(user, card_id: int, quality: int, source: str = 'bot',
+                      seconds: int = 0) -> Schedule:
+        """
+        Учитывает ответ на карточку: расписание, журнал и счетчики статистики.
+        
+        Args:
+            user: Пользователь Django
+            card_id: ID карточки
+            quality: Качество ответа (0-5)
+            source: Источник ответа для журнала
+            seconds: Время, потраченное на ответ (секунды)
+        
+        Returns:
+            Schedule: Обновленное расписание
+        
+        Raises:
+            Card.DoesNotExist: Если карточки нет или она принадлежит другому пользователю
+        """
+        card = Card.objects.select_related('schedule').get(pk=card_id, user=user)
+        schedule = SM2Service.update_schedule(card, quality, source)
+        StatsService.record_reviews(
+            user,
+            wrong=1 if quality < 3 else 0,
+            reviewed_at=schedule.last_reviewed_at,
+            seconds=seconds
+        )
         return schedule
     
+    @staticmethod
+    async def arecord_review(user, card_id: int, quality: int, source: str = 'bot',
+                             seconds: int = 0) -> Schedule:
+        """Асинхронный вариант record_review (пул потоков БД)."""
+        return await run_in_db(SM2Service.record_review, user, card_id, quality, source, seconds)
+    
+    @staticmethod
+    @transaction.atomic
+    def update_schedules_bulk(user, qualities: dict, source: str = 'matching') -> list:
+        """
+        Обновляет расписания нескольких карточек за один проход.
+        
+        Карточки выбираются одним запросом, новое состояние считается
+        векторно, а сохраняется через bulk_update в одной транзакции.
+        Карточки, не принадлежащие пользователю, пропускаются.
+        
+        Args:
+            user: Пользователь Django
+            qualities: Словарь {ID карточки: качество ответа (0-5)}
+            source: Источник ответов для журнала
+        
+        Returns:
+            list: Обновленные объекты Schedule
+        """
+        if not qualities:
+            return []
+        
+        cards = list(
+            Card.objects.filter(user=user, pk__in=list(qualities)).select_related('schedule')
+        )
+        
+        now = timezone.now()
+        schedules = []
+        missing = []
+        for card in cards:
+            schedule = getattr(card, 'schedule', None)
+            if schedule is None:
+                schedule = Schedule(card=card, next_review_at=now)
+                missing.append(schedule)
+            schedules.append(schedule)
+        if missing:
+            Schedule.objects.bulk_create(missing)
+        if not schedules:
+            return []
+        
+        new_intervals, new_easiness_factors, new_repetitions = SM2Service.calculate_next_review_batch(
+            [qualities[schedule.card_id] for schedule in schedules],
+            [schedule.interval for schedule in schedules],
+            [schedule.repetitions for schedule in schedules],
+            [schedule.easiness_factor for schedule in schedules],
+        )
+        
+        log_entries = []
+        for schedule, interval, easiness_factor, repetitions in zip(
+            schedules, new_intervals.tolist(), new_easiness_factors.tolist(), new_repetitions.tolist()
+        ):
+            log_entries.append(ReviewLog(
+                card_id=schedule.card_id,
+                user_id=user.pk,
+                quality=qualities[schedule.card_id],
+                prev_interval=schedule.interval,
+                new_interval=interval,
+                prev_easiness_factor=schedule.easiness_factor,
+                new_easiness_factor=easiness_factor,
+                source=source,
+                reviewed_at=now,
+            ))
+            schedule.interval = interval
+            schedule.easiness_factor = easiness_factor
+            schedule.repetitions = repetitions
+            schedule.next_review_at = now + timedelta(days=interval)
+            schedule.last_reviewed_at = now
+        
+        Schedule.objects.bulk_update(
+            schedules,
+            ['interval', 'easiness_factor', 'repetitions', 'next_review_at', 'last_reviewed_at']
+        )
+        log_reviews(log_entries)
+        # bulk_update не вызывает сигналы, сбрасываем кэш статистики сами
+        StatsService.invalidate_cache(user.pk)
+        return schedules
+    
     @staticmethod
     def get_cards_for_today(user) -> list:
         """
@@ -102,14 +283,54 @@ class SM2Service:
         Returns:
             list: Список карточек Card
         """
-        now = timezone.now()
+        return SM2Service.get_due_queue(user)
+    
+    @staticmethod
+    def get_due_queue(user, limit: int = None) -> list:
+        """
+        Получает карточки к повторению, отсортированные по сроку.
+        
+        Args:
+            user: Пользователь Django
+            limit: Максимальное количество карточек (по умолчанию все)
+        
+        Returns:
+            list: Список карточек Card с загруженным расписанием
+        """
         cards = Card.objects.filter(
             user=user,
-            schedule__next_review_at__lte=now
+            schedule__next_review_at__lte=timezone.now()
         ).select_related('schedule').order_by('schedule__next_review_at')
-        
+        if limit is not None:
+            cards = cards[:limit]
         return list(cards)
     
+    @staticmethod
+    async def aget_due_queue(user, limit: int = None) -> list:
+        """Асинхронный вариант get_due_queue (пул потоков БД)."""
+        return await run_in_db(SM2Service.get_due_queue, user, limit)
+    
+    @staticmethod
+    def get_due_card_ids(user, since=None) -> list:
+        """
+        Получает ID карточек для повторения, отсортированные по сроку.
+        
+        Args:
+            user: Пользователь Django
+            since: Если указано, только карточки, ставшие доступными после этого момента
+        
+        Returns:
+            list: Список ID карточек
+        """
+        schedules = Schedule.objects.filter(
+            card__user=user,
+            next_review_at__lte=timezone.now()
+        )
+        if since is not None:
+            schedules = schedules.filter(next_review_at__gt=since)
+        
+        return list(schedules.order_by('next_review_at').values_list('card_id', flat=True))
+    
     @staticmethod
     def initialize_schedule(card: Card) -> Schedule:
         """
@@ -0,0 +1,48 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import TestCase
+from cards.models import Card
+from schedules.models import ReviewLog
+from schedules.review_log import ReviewLogWriter
+
+
+def make_entry(user, card_id, quality=4) -> ReviewLog:
+    return ReviewLog(
+        card_id=card_id,
+        user_id=user.pk,
+        quality=quality,
+        prev_interval=1,
+        new_interval=6,
+        prev_easiness_factor=2.5,
+        new_easiness_factor=2.5,
+    )
+
+
+class ReviewLogWriterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.kept = Card.objects.create(user=self.user, word='cat', translation='кот')
+        self.deleted = Card.objects.create(user=self.user, word='dog', translation='собака')
+        self.writer = ReviewLogWriter(flush_interval=60, flush_threshold=100)
+        self.addCleanup(self.writer.flush)
+
+    def test_entry_of_deleted_card_is_kept_without_card(self):
+        self.writer.add(make_entry(self.user, self.kept.pk, quality=5))
+        self.writer.add(make_entry(self.user, self.deleted.pk, quality=2))
+        self.deleted.delete()
+
+        self.writer.flush()
+
+        logs = ReviewLog.objects.order_by('quality')
+        self.assertEqual([(log.card_id, log.quality) for log in logs], [(None, 2), (self.kept.pk, 5)])
+
+    def test_failed_batch_is_written_row_by_row(self):
+        self.writer.add(make_entry(self.user, self.kept.pk, quality=5))
+        self.writer.add(make_entry(self.user, self.deleted.pk, quality=2))
+
+        with mock.patch.object(ReviewLog.objects, 'bulk_create', side_effect=IntegrityError('FOREIGN KEY')):
+            self.writer.flush()
+
+        self.assertEqual(ReviewLog.objects.filter(user=self.user).count(), 2)
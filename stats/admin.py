@@ -1,12 +1,18 @@
 from django.contrib import admin
-from .models import Stats, UserProfile
+from .models import DailyActivity, Stats, UserProfile
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'telegram_id', 'telegram_username', 'created_at']
+    list_display = ['user', 'telegram_id', 'telegram_username', 'reminder_time', 'timezone', 'next_reminder_at', 'created_at']
     search_fields = ['user__username', 'telegram_username', 'telegram_id']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'next_reminder_at', 'last_reminder_date', 'reminder_claimed_at']
+
+    def save_model(self, request, obj, form, change):
+        # Новое время или часовой пояс - пересчитываем следующее напоминание
+        if {'reminder_time', 'timezone'} & set(form.changed_data):
+            obj.next_reminder_at = None
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(Stats)
@@ -15,3 +21,10 @@ class StatsAdmin(admin.ModelAdmin):
     search_fields = ['user__username']
     readonly_fields = ['created_at', 'updated_at', 'success_rate']
 
+
+
+@admin.register(DailyActivity)
+class DailyActivityAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'reviews', 'correct', 'new_cards', 'time_studied']
+    list_filter = ['date']
+    search_fields = ['user__username']
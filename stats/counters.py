@@ -0,0 +1,178 @@
+"""
+Атомарные счетчики статистики и дневной активности с опциональной
+отложенной записью.
+"""
+import logging
+import threading
+from collections import Counter
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from linguatrack.buffering import FlushBuffer
+from .models import DailyActivity, Stats
+
+logger = logging.getLogger('stats')
+
+COUNTER_FIELDS = ('total_words', 'total_reviews', 'wrong_answers')
+DAILY_FIELDS = ('reviews', 'correct', 'new_cards', 'time_studied')
+
+
+def apply_deltas(user_id: int, deltas: dict, last_review_date=None):
+    """
+    Применяет приращения счетчиков одним UPDATE без чтения строки.
+
+    Счетчики не опускаются ниже нуля. Если строки статистики еще нет,
+    она создается.
+
+    Args:
+        user_id: ID пользователя Django
+        deltas: Словарь {поле счетчика: приращение}
+        last_review_date: Время последнего повторения (опционально)
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas and last_review_date is None:
+        return
+
+    updates = {
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+    }
+    if last_review_date is not None:
+        updates['last_review_date'] = last_review_date
+    # update() не трогает auto_now, выставляем вручную
+    updates['updated_at'] = timezone.now()
+
+    if Stats.objects.filter(user_id=user_id).update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            Stats.objects.create(
+                user_id=user_id,
+                last_review_date=last_review_date,
+                **{field: max(0, delta) for field, delta in deltas.items()}
+            )
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        Stats.objects.filter(user_id=user_id).update(**updates)
+
+
+def apply_daily_deltas(user_id: int, day, deltas: dict):
+    """
+    Применяет приращения к строке дневной активности (создает ее при необходимости).
+
+    Args:
+        user_id: ID пользователя Django
+        day: Дата (date)
+        deltas: Словарь {поле DailyActivity: приращение}
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if DailyActivity.objects.filter(user_id=user_id, date=day).update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyActivity.objects.create(user_id=user_id, date=day, **deltas)
+    except IntegrityError:
+        DailyActivity.objects.filter(user_id=user_id, date=day).update(**updates)
+
+
+class CounterBuffer(FlushBuffer):
+    """
+    Буфер отложенной записи счетчиков.
+
+    Приращения накапливаются в памяти процесса и объединяются по ключу
+    (пользователь или пользователь + день), а в БД записываются одним UPDATE
+    на ключ - по достижении порога или по истечении интервала.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, flush_threshold: int = 100):
+        super().__init__(flush_interval, flush_threshold)
+        # ('stats', user_id) или ('daily', user_id, date) ->
+        # {'deltas': Counter, 'last_review_date': datetime}
+        self._pending = {}
+
+    def _append(self, key: tuple, deltas: dict, last_review_date=None):
+        entry = self._pending.setdefault(key, {'deltas': Counter(), 'last_review_date': None})
+        entry['deltas'].update(deltas)
+        if last_review_date is not None and (
+            entry['last_review_date'] is None or last_review_date > entry['last_review_date']
+        ):
+            entry['last_review_date'] = last_review_date
+
+    def _drain(self):
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def _write(self, pending: dict):
+        for key, entry in pending.items():
+            try:
+                if key[0] == 'daily':
+                    apply_daily_deltas(key[1], key[2], entry['deltas'])
+                else:
+                    apply_deltas(key[1], entry['deltas'], entry['last_review_date'])
+            except Exception as e:
+                logger.error(f"Ошибка записи счетчиков {key}: {e}", exc_info=True)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> CounterBuffer:
+    """Возвращает буфер отложенной записи процесса (создается при первом обращении)."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = CounterBuffer(
+                flush_interval=getattr(settings, 'STATS_FLUSH_INTERVAL', 5.0),
+                flush_threshold=getattr(settings, 'STATS_FLUSH_THRESHOLD', 100),
+            )
+        return _buffer
+
+
+def increment(user_id: int, last_review_date=None, **deltas):
+    """
+    Увеличивает счетчики статистики пользователя.
+
+    При STATS_WRITE_BEHIND=True приращения идут через буфер отложенной записи,
+    иначе сразу применяются атомарным UPDATE.
+
+    Args:
+        user_id: ID пользователя Django
+        last_review_date: Время последнего повторения (опционально)
+        **deltas: Приращения счетчиков (total_words, total_reviews, wrong_answers)
+    """
+    unknown = set(deltas) - set(COUNTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Неизвестные счетчики: {', '.join(sorted(unknown))}")
+
+    if getattr(settings, 'STATS_WRITE_BEHIND', False):
+        get_buffer().add(('stats', user_id), deltas, last_review_date)
+    else:
+        apply_deltas(user_id, deltas, last_review_date)
+
+
+def increment_daily(user_id: int, day, **deltas):
+    """
+    Увеличивает счетчики дневной активности пользователя.
+
+    Args:
+        user_id: ID пользователя Django
+        day: Дата (date)
+        **deltas: Приращения (reviews, correct, new_cards, time_studied)
+    """
+    unknown = set(deltas) - set(DAILY_FIELDS)
+    if unknown:
+        raise ValueError(f"Неизвестные счетчики: {', '.join(sorted(unknown))}")
+
+    if getattr(settings, 'STATS_WRITE_BEHIND', False):
+        get_buffer().add(('daily', user_id, day), deltas)
+    else:
+        apply_daily_deltas(user_id, day, deltas)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0002_dailyactivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_reminder_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Последнее напоминание'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:50
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from django.db import migrations, models
+from django.utils import timezone
+import stats.models
+
+
+def set_next_reminder_at(apps, schema_editor):
+    """Заполняет next_reminder_at для профилей с Telegram (по умолчанию 9:00)."""
+    UserProfile = apps.get_model('stats', 'UserProfile')
+    now = timezone.now()
+    for profile in UserProfile.objects.filter(telegram_id__isnull=False):
+        tz = ZoneInfo(profile.timezone)
+        local = now.astimezone(tz)
+        next_at = datetime.combine(local.date(), profile.reminder_time, tzinfo=tz)
+        if next_at <= local:
+            next_at += timedelta(days=1)
+        profile.next_reminder_at = next_at
+        profile.save(update_fields=['next_reminder_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0003_userprofile_last_reminder_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='next_reminder_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующее напоминание'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='reminder_time',
+            field=models.TimeField(default=stats.models.default_reminder_time, verbose_name='Время напоминания'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='timezone',
+            field=models.CharField(default=stats.models.default_timezone, max_length=64, validators=[stats.models.validate_timezone], verbose_name='Часовой пояс'),
+        ),
+        migrations.RunPython(set_next_reminder_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0004_userprofile_reminder_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='reminder_claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Напоминание отправляется с'),
+        ),
+    ]
@@ -1,8 +1,28 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
+def default_reminder_time():
+    return time(9, 0)
+
+
+def default_timezone():
+    return settings.TIME_ZONE
+
+
+def validate_timezone(value):
+    """Проверяет, что value - имя часового пояса IANA (например, Europe/Moscow)."""
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f'Неизвестный часовой пояс: {value}')
+
+
 class UserProfile(models.Model):
     """
     Расширенный профиль пользователя с Telegram ID.
@@ -25,6 +45,34 @@ class UserProfile(models.Model):
         null=True,
         verbose_name='Telegram Username'
     )
+    last_reminder_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Последнее напоминание'
+    )
+    # Напоминание забрано воркером, но еще не отправлено; захват истекает
+    # через REMINDER_LEASE_SECONDS, если воркер упал до отправки
+    reminder_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Напоминание отправляется с'
+    )
+    reminder_time = models.TimeField(
+        default=default_reminder_time,
+        verbose_name='Время напоминания'
+    )
+    timezone = models.CharField(
+        max_length=64,
+        default=default_timezone,
+        validators=[validate_timezone],
+        verbose_name='Часовой пояс'
+    )
+    next_reminder_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Следующее напоминание'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
 
@@ -38,6 +86,31 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"Profile for {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        # Профилю с Telegram нужен момент следующего напоминания
+        if self.telegram_id and self.next_reminder_at is None:
+            self.next_reminder_at = self.get_next_reminder_at()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'next_reminder_at'}
+        super().save(*args, **kwargs)
+
+    def get_next_reminder_at(self, after=None):
+        """
+        Вычисляет ближайший момент напоминания после after.
+
+        Args:
+            after: Момент, после которого ищется напоминание (по умолчанию текущий)
+
+        Returns:
+            datetime: Время reminder_time в часовом поясе пользователя
+        """
+        tz = ZoneInfo(self.timezone)
+        local = (after or timezone.now()).astimezone(tz)
+        next_at = datetime.combine(local.date(), self.reminder_time, tzinfo=tz)
+        if next_at <= local:
+            next_at = datetime.combine(local.date() + timedelta(days=1), self.reminder_time, tzinfo=tz)
+        return next_at
+
 
 class Stats(models.Model):
     """
@@ -78,3 +151,31 @@ class Stats(models.Model):
             return 0
         correct = self.total_reviews - self.wrong_answers
         return round((correct / self.total_reviews) * 100, 2)
+
+
+class DailyActivity(models.Model):
+    """
+    Агрегаты активности пользователя за день (обновляются инкрементально).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_activity',
+        verbose_name='Пользователь'
+    )
+    date = models.DateField(verbose_name='Дата')
+    reviews = models.IntegerField(default=0, verbose_name='Повторений')
+    correct = models.IntegerField(default=0, verbose_name='Правильных ответов')
+    new_cards = models.IntegerField(default=0, verbose_name='Новых карточек')
+    time_studied = models.IntegerField(default=0, verbose_name='Время занятий (сек)')
+
+    class Meta:
+        verbose_name = 'Активность за день'
+        verbose_name_plural = 'Активность по дням'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='stats_daily_activity_user_date'),
+        ]
+
+    def __str__(self):
+        return f"Activity of {self.user_id} on {self.date}: {self.reviews}"
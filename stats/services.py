@@ -1,98 +1,238 @@
 """
 Сервисы для работы со статистикой.
 """
-from django.db.models import Count, Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth.models import User
 from cards.models import Card
-from schedules.models import Schedule
-from .models import Stats
+from linguatrack.async_db import run_in_db
+from . import counters
+from .models import DailyActivity, Stats
 
 
 class StatsService:
     """Сервис для работы со статистикой."""
     
     @staticmethod
-    def get_user_stats(user: User) -> dict:
+    def record_reviews(user: User, total: int = 1, wrong: int = 0, reviewed_at=None, seconds: int = 0):
         """
-        Получает полную статистику пользователя.
+        Учитывает ответы пользователя в статистике и дневной активности.
         
         Args:
             user: Пользователь Django
+            total: Количество ответов
+            wrong: Количество неправильных ответов
+            reviewed_at: Время повторения (по умолчанию текущее)
+            seconds: Время, потраченное на ответы (секунды)
+        """
+        reviewed_at = reviewed_at or timezone.now()
+        counters.increment(
+            user.pk,
+            total_reviews=total,
+            wrong_answers=wrong,
+            last_review_date=reviewed_at
+        )
+        counters.increment_daily(
+            user.pk,
+            timezone.localdate(reviewed_at),
+            reviews=total,
+            correct=total - wrong,
+            time_studied=seconds
+        )
+    
+    @staticmethod
+    def adjust_total_words(user: User, delta: int):
+        """
+        Изменяет счетчик слов пользователя.
         
-        Returns:
-            dict: Словарь со статистикой
+        Args:
+            user: Пользователь Django
+            delta: Приращение (отрицательное при удалении карточек)
+        """
+        counters.increment(user.pk, total_words=delta)
+        if delta > 0:
+            counters.increment_daily(user.pk, timezone.localdate(), new_cards=delta)
+    
+    @staticmethod
+    def _cache_key(user_id: int) -> str:
+        return f'stats:user:{user_id}:counts'
+    
+    @staticmethod
+    def invalidate_cache(user_id: int):
         """
-        stats, _ = Stats.objects.get_or_create(user=user)
+        Сбрасывает кэш агрегатов статистики пользователя.
         
-        # Подсчитываем изученные слова (с повторениями > 3)
-        learned_count = Schedule.objects.filter(
-            card__user=user,
-            repetitions__gte=3
-        ).count()
+        Внутри транзакции сброс откладывается до коммита, чтобы параллельный
+        запрос не закэшировал незафиксированное состояние.
         
-        stats.learned_words = learned_count
-        stats.save()
+        Args:
+            user_id: ID пользователя Django
+        """
+        key = StatsService._cache_key(user_id)
+        transaction.on_commit(lambda: cache.delete(key))
+    
+    @staticmethod
+    def get_card_counts(user: User) -> dict:
+        """
+        Получает агрегаты по карточкам пользователя одним запросом (с кэшем).
         
-        # Статистика по уровням
-        level_stats = Card.objects.filter(user=user).values('level').annotate(
-            count=Count('id')
+        Args:
+            user: Пользователь Django
+        
+        Returns:
+            dict: Количества карточек: learned, today, recent, по уровням
+                  и "непроработанных" карточек начального и среднего уровня
+        """
+        key = StatsService._cache_key(user.pk)
+        counts = cache.get(key)
+        if counts is not None:
+            return counts
+        
+        now = timezone.now()
+        counts = Card.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            # Изученные слова (с повторениями >= 3)
+            learned=Count('id', filter=Q(schedule__repetitions__gte=3)),
+            today=Count('id', filter=Q(schedule__next_review_at__lte=now)),
+            beginner=Count('id', filter=Q(level='beginner')),
+            intermediate=Count('id', filter=Q(level='intermediate')),
+            advanced=Count('id', filter=Q(level='advanced')),
+            beginner_pending=Count('id', filter=Q(level='beginner') & ~Q(schedule__repetitions__gte=3)),
+            intermediate_pending=Count('id', filter=Q(level='intermediate') & ~Q(schedule__repetitions__gte=5)),
         )
+        # Повторения за последние 7 дней (включая сегодня) - из дневных агрегатов
+        week_start = timezone.localdate() - timedelta(days=6)
+        counts['recent'] = DailyActivity.objects.filter(
+            user=user,
+            date__gte=week_start
+        ).aggregate(total=Sum('reviews'))['total'] or 0
+        cache.set(key, counts, getattr(settings, 'STATS_CACHE_TIMEOUT', 60))
+        return counts
+    
+    @staticmethod
+    def get_activity(user: User, days: int = 365) -> dict:
+        """
+        Получает дневную активность пользователя для тепловой карты и графиков.
+        
+        Args:
+            user: Пользователь Django
+            days: Количество дней, включая сегодняшний
         
-        # Карточки для повторения сегодня
-        today_cards = Schedule.objects.filter(
-            card__user=user,
-            next_review_at__lte=timezone.now()
-        ).count()
+        Returns:
+            dict: Дни (по порядку, включая дни без активности), текущая
+                  и самая длинная серия дней с повторениями
+        """
+        today = timezone.localdate()
+        start = today - timedelta(days=days - 1)
+        rows = {
+            row['date']: row
+            for row in DailyActivity.objects.filter(user=user, date__gte=start).values(
+                'date', 'reviews', 'correct', 'new_cards', 'time_studied'
+            )
+        }
         
-        # Статистика за последние 7 дней
-        week_ago = timezone.now() - timedelta(days=7)
-        recent_reviews = Schedule.objects.filter(
-            card__user=user,
-            last_reviewed_at__gte=week_ago
-        ).count()
+        result = []
+        longest_streak = 0
+        streak = 0
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = rows.get(day)
+            result.append({
+                'date': day.isoformat(),
+                'reviews': row['reviews'] if row else 0,
+                'correct': row['correct'] if row else 0,
+                'new_cards': row['new_cards'] if row else 0,
+                'time_studied': row['time_studied'] if row else 0,
+            })
+            streak = streak + 1 if row and row['reviews'] else 0
+            longest_streak = max(longest_streak, streak)
+        
+        # Текущая серия не прерывается, если сегодня еще не было повторений
+        current_streak = 0
+        for item in reversed(result[:-1] if not result[-1]['reviews'] else result):
+            if not item['reviews']:
+                break
+            current_streak += 1
+        
+        return {
+            'days': result,
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+        }
+    
+    @staticmethod
+    def get_user_stats(user: User) -> dict:
+        """
+        Получает полную статистику пользователя.
+        
+        Только читает данные: счетчики берутся из строки Stats,
+        агрегаты по карточкам - из get_card_counts.
+        
+        Args:
+            user: Пользователь Django
+        
+        Returns:
+            dict: Словарь со статистикой
+        """
+        stats = Stats.objects.filter(user=user).first() or Stats(user=user)
+        counts = StatsService.get_card_counts(user)
+        
+        # Подставляем актуальное значение без сохранения в БД
+        stats.learned_words = counts['learned']
         
         return {
             'stats': stats,
-            'level_stats': {item['level']: item['count'] for item in level_stats},
-            'today_cards': today_cards,
-            'recent_reviews': recent_reviews,
+            'level_stats': {
+                level: counts[level]
+                for level, _ in Card.LEVEL_CHOICES
+                if counts[level]
+            },
+            'today_cards': counts['today'],
+            'recent_reviews': counts['recent'],
             'success_rate': stats.success_rate,
+            'counts': counts,
         }
     
     @staticmethod
-    def get_recommendations(user: User) -> list:
+    async def aget_user_stats(user: User) -> dict:
+        """Асинхронный вариант get_user_stats (пул потоков БД)."""
+        return await run_in_db(StatsService.get_user_stats, user)
+    
+    @staticmethod
+    def get_recommendations(user: User, stats: dict = None) -> list:
         """
         Получает рекомендации для пользователя.
         
         Args:
             user: Пользователь Django
+            stats: Результат get_user_stats, если уже получен
         
         Returns:
             list: Список рекомендаций
         """
         recommendations = []
-        stats = StatsService.get_user_stats(user)
+        if stats is None:
+            stats = StatsService.get_user_stats(user)
+        counts = stats['counts']
         
         # Рекомендация по начальным словам
-        beginner_cards = Card.objects.filter(user=user, level='beginner')
-        beginner_without_schedule = beginner_cards.exclude(schedule__repetitions__gte=3)
-        if beginner_without_schedule.exists():
+        if counts['beginner_pending']:
             recommendations.append({
                 'type': 'beginner',
-                'message': f'Повтори {beginner_without_schedule.count()} начальных слов',
-                'count': beginner_without_schedule.count()
+                'message': f'Повтори {counts["beginner_pending"]} начальных слов',
+                'count': counts['beginner_pending']
             })
         
         # Рекомендация по среднему уровню
-        intermediate_cards = Card.objects.filter(user=user, level='intermediate')
-        intermediate_without_schedule = intermediate_cards.exclude(schedule__repetitions__gte=5)
-        if intermediate_without_schedule.exists():
+        if counts['intermediate_pending']:
             recommendations.append({
                 'type': 'intermediate',
-                'message': f'Удели внимание {intermediate_without_schedule.count()} словам среднего уровня',
-                'count': intermediate_without_schedule.count()
+                'message': f'Удели внимание {counts["intermediate_pending"]} словам среднего уровня',
+                'count': counts['intermediate_pending']
             })
         
         # Рекомендация по карточкам на сегодня
@@ -112,4 +252,3 @@ class StatsService:
             })
         
         return recommendations
-
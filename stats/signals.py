@@ -0,0 +1,31 @@
+"""
+Сигналы Django для сброса кэша статистики при изменении карточек и расписаний.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from cards.models import Card
+from schedules.models import Schedule
+from .services import StatsService
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def invalidate_stats_for_card(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш статистики владельца карточки.
+    """
+    StatsService.invalidate_cache(instance.user_id)
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def invalidate_stats_for_schedule(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш статистики владельца карточки расписания.
+    """
+    if Schedule._meta.get_field('card').is_cached(instance):
+        user_id = instance.card.user_id
+    else:
+        user_id = Card.objects.filter(pk=instance.card_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        StatsService.invalidate_cache(user_id)
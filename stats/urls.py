@@ -5,5 +5,6 @@ app_name = 'stats'
 
 urlpatterns = [
     path('', views.progress, name='progress'),
+    path('activity/', views.activity, name='activity'),
 ]
 
@@ -1,5 +1,6 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from .services import StatsService
 
 
@@ -7,12 +8,28 @@ from .services import StatsService
 def progress(request):
     """Страница прогресса и статистики."""
     stats_data = StatsService.get_user_stats(request.user)
-    recommendations = StatsService.get_recommendations(request.user)
+    recommendations = StatsService.get_recommendations(request.user, stats_data)
+    activity = StatsService.get_activity(request.user)
+    last_30_days = activity['days'][-30:]
     
     context = {
         **stats_data,
         'recommendations': recommendations,
+        'activity': activity,
+        'last_30_days': last_30_days,
+        'max_daily_reviews': max([day['reviews'] for day in last_30_days] + [1]),
+        'minutes_last_30_days': sum(day['time_studied'] for day in last_30_days) // 60,
     }
     
     return render(request, 'stats/progress.html', context)
 
+
+
+@login_required
+def activity(request):
+    """Дневная активность в JSON (тепловая карта, серии)."""
+    try:
+        days = max(1, min(int(request.GET.get('days', 365)), 366))
+    except ValueError:
+        days = 365
+    return JsonResponse(StatsService.get_activity(request.user, days=days))